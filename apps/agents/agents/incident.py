@@ -28,6 +28,9 @@ class IncidentAgent(BaseAgent):
     - Auto-escalation
     """
     
+    # The same failure window is re-analyzed every run until it changes
+    llm_cache_ttl = 900.0
+    
     def __init__(self, **kwargs):
         super().__init__(AgentType.INCIDENT, **kwargs)
         self.anomaly_thresholds = {
@@ -64,23 +67,26 @@ class IncidentAgent(BaseAgent):
             incidents_created = []
             incidents_updated = []
             
+            # Each step is a journaled phase, so a resumed task neither repeats
+            # LLM analyses nor creates the same incidents twice
+            
             # 1. Analyze recent health checks for patterns
-            health_incidents = await self._analyze_health_data(context.tenant_id)
+            health_incidents = await self.phase("health", lambda: self._analyze_health_data(context.tenant_id))
             incidents_created.extend(health_incidents)
             
             # 2. Analyze metrics for anomalies
-            metric_incidents = await self._analyze_metrics(context.tenant_id)
+            metric_incidents = await self.phase("metrics", lambda: self._analyze_metrics(context.tenant_id))
             incidents_created.extend(metric_incidents)
             
             # 3. Correlate and deduplicate incidents
-            correlated = await self._correlate_incidents(incidents_created)
+            correlated = await self.phase("correlate", lambda: self._correlate_incidents(incidents_created))
             
             # 4. Update existing incidents with new information
-            updated = await self._update_existing_incidents(context.tenant_id)
+            updated = await self.phase("update", lambda: self._update_existing_incidents(context.tenant_id))
             incidents_updated.extend(updated)
             
             # 5. Auto-resolve stale incidents
-            resolved = await self._auto_resolve_incidents(context.tenant_id)
+            resolved = await self.phase("resolve", lambda: self._auto_resolve_incidents(context.tenant_id))
             
             return AgentResult(
                 success=True,
@@ -260,7 +266,7 @@ class IncidentAgent(BaseAgent):
 async def run_incident_agent(tenant_id: str):
     agent = IncidentAgent()
     context = AgentContext(tenant_id=tenant_id, trigger="scheduled")
-    return await agent.execute(context)
+    return await agent.run(context)
 
 
 if __name__ == "__main__":
@@ -4,8 +4,14 @@ Continuously monitors websites and infrastructure for health issues
 """
 
 import asyncio
+import os
+import socket
+import ssl
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import httpcore
 import httpx
 
 from core.base_agent import (
@@ -14,6 +20,281 @@ from core.base_agent import (
     AgentContext,
     AgentResult,
 )
+from core.baseline import BaselineStore
+from core.batching import AsyncBatcher
+
+
+# httpcore trace steps timed as a whole; ttfb runs from sending the request
+# headers to receiving the response headers. dns and connect are timed by
+# _ResolvingBackend inside connect_tcp.
+_TRACE_PHASES = {
+    "start_tls": "tls",
+    "receive_response_body": "body",
+}
+
+
+def _utc(timestamp: Optional[str]) -> Optional[str]:
+    """Mark a naive utcnow() isoformat as UTC for the API"""
+    return f"{timestamp}Z" if timestamp else None
+
+
+class _PhaseTrace:
+    """httpx trace hook summing monotonic time per phase over redirect hops"""
+    
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.in_progress: Dict[str, float] = {}
+        self.failed: Optional[str] = None
+    
+    def start(self, phase: str):
+        self.in_progress[phase] = time.monotonic()
+    
+    def finish(self, phase: str, failed: bool = False):
+        if failed:
+            self.failed = phase
+        started = self.in_progress.pop(phase, None)
+        if started is not None:
+            self.timings[phase] = self.timings.get(phase, 0.0) + time.monotonic() - started
+    
+    async def __call__(self, event: str, info: Dict[str, Any]):
+        # e.g. "connection.start_tls.complete", "http11.receive_response_headers.started"
+        step, _, state = event.rpartition(".")
+        step = step.rpartition(".")[2]
+        if step == "send_request_headers" and state == "started":
+            self.start("ttfb")
+        elif step == "receive_response_headers" and state != "started":
+            self.finish("ttfb", state == "failed")
+        elif step in _TRACE_PHASES:
+            if state == "started":
+                self.start(_TRACE_PHASES[step])
+            else:
+                self.finish(_TRACE_PHASES[step], state == "failed")
+    
+    def milliseconds(self) -> Dict[str, int]:
+        return {phase: int(seconds * 1000) for phase, seconds in self.timings.items()}
+
+
+class _KeyedSlots:
+    """Semaphore per key (host, address), dropped once nobody uses or awaits it"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        # key -> [semaphore, holders and waiters]
+        self._slots: Dict[str, list] = {}
+    
+    async def acquire(self, key: str):
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = [asyncio.Semaphore(self.limit), 0]
+        slot[1] += 1
+        try:
+            await slot[0].acquire()
+        except BaseException:
+            self._leave(key, slot)
+            raise
+    
+    def release(self, key: str):
+        slot = self._slots[key]
+        slot[0].release()
+        self._leave(key, slot)
+    
+    def _leave(self, key: str, slot: list):
+        slot[1] -= 1
+        if slot[1] == 0:
+            del self._slots[key]
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class _SlotStream(httpcore.AsyncNetworkStream):
+    """Network stream that gives its address slot back when closed"""
+    
+    def __init__(self, stream: httpcore.AsyncNetworkStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+    
+    async def read(self, max_bytes, timeout=None):
+        return await self._stream.read(max_bytes, timeout=timeout)
+    
+    async def write(self, buffer, timeout=None):
+        await self._stream.write(buffer, timeout=timeout)
+    
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+    
+    async def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        try:
+            stream = await self._stream.start_tls(ssl_context, server_hostname=server_hostname, timeout=timeout)
+        except BaseException:
+            # httpcore closes the plain stream itself, bypassing aclose() here
+            self._release()
+            raise
+        return _SlotStream(stream, self._release)
+    
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+
+class _ResolvingBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend that resolves the host itself and connects to the
+    resolved address, so DNS and TCP connect are separate phases of one
+    lookup. Both share the connect timeout.
+    
+    Connections also take a slot per resolved address, held until they
+    close, so virtual hosts sharing an origin IP are capped together. One
+    check holds at most one slot per address (e.g. across redirects).
+    """
+    
+    def __init__(self, trace: _PhaseTrace, address_slots: _KeyedSlots):
+        self.trace = trace
+        self.address_slots = address_slots
+        self._held: Dict[str, int] = {}
+        self._backend = httpcore.AnyIOBackend()
+    
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        dns_started = time.monotonic()
+        self.trace.start("dns")
+        try:
+            addresses = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            raise httpcore.ConnectTimeout(f"DNS lookup for {host} timed out")
+        except OSError as e:
+            raise httpcore.ConnectError(str(e))
+        self.trace.finish("dns")
+        # Waiting for an address slot is queueing, not network time
+        budget = None if timeout is None else timeout - (time.monotonic() - dns_started)
+        
+        error: Optional[Exception] = None
+        for *_, sockaddr in addresses:
+            address = sockaddr[0]
+            await self._hold(address)
+            # Phases left in progress when this raises are marked failed by the caller
+            self.trace.start("connect")
+            deadline = None if budget is None else time.monotonic() + max(0.0, budget)
+            try:
+                stream = await self._backend.connect_tcp(
+                    address, port, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()),
+                    local_address=local_address, socket_options=socket_options,
+                )
+            except BaseException as e:
+                self._unhold(address)
+                if not isinstance(e, httpcore.ConnectError):
+                    raise
+                error = e
+                continue
+            self.trace.finish("connect")
+            return _SlotStream(stream, self._releaser(address))
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+    
+    def _releaser(self, address: str) -> Callable[[], None]:
+        """Gives a connection's address slot back once, however often it is called"""
+        released = False
+        
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._unhold(address)
+        return release
+    
+    async def _hold(self, address: str):
+        if not self._held.get(address):
+            await self.address_slots.acquire(address)
+        self._held[address] = self._held.get(address, 0) + 1
+    
+    def _unhold(self, address: str):
+        self._held[address] -= 1
+        if not self._held[address]:
+            del self._held[address]
+            self.address_slots.release(address)
+    
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+    
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+# httpcore errors, raised to callers as the httpx error of the same name
+_HTTPCORE_ERRORS = (
+    "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout", "ConnectError",
+    "ReadError", "WriteError", "RemoteProtocolError", "LocalProtocolError",
+    "ProxyError", "UnsupportedProtocol", "ProtocolError", "NetworkError", "TimeoutException",
+)
+
+
+def _httpx_error(error: Exception, request: httpx.Request) -> Exception:
+    for cls in type(error).__mro__:
+        if cls.__module__.startswith("httpcore") and cls.__name__ in _HTTPCORE_ERRORS:
+            return getattr(httpx, cls.__name__)(str(error), request=request)
+    return error
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, request: httpx.Request):
+        self._stream = stream
+        self._request = request
+    
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            mapped = _httpx_error(e, self._request)
+            if mapped is e:
+                raise
+            raise mapped from e
+    
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class _CheckTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport over an httpcore pool of our own, as httpx takes no
+    network backend for its transport
+    """
+    
+    def __init__(self, pool: httpcore.AsyncConnectionPool):
+        self.pool = pool
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        try:
+            response = await self.pool.handle_async_request(core_request)
+        except Exception as e:
+            mapped = _httpx_error(e, request)
+            if mapped is e:
+                raise
+            raise mapped from e
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream, request),
+            extensions=response.extensions,
+        )
+    
+    async def aclose(self):
+        await self.pool.aclose()
 
 
 class MonitoringAgent(BaseAgent):
@@ -28,6 +309,9 @@ class MonitoringAgent(BaseAgent):
     - Anomaly detection
     """
     
+    # Sweeps repeat every minute; reuse analyses of unchanged results
+    llm_cache_ttl = 120.0
+    
     def __init__(self, **kwargs):
         super().__init__(AgentType.MONITORING, **kwargs)
         self.check_timeout = 30.0
@@ -36,7 +320,42 @@ class MonitoringAgent(BaseAgent):
             "response_time_critical": 5000,  # ms
             "uptime_warning": 99.0,  # %
             "ssl_expiry_warning": 30,  # days
+            # ms per phase; the phase furthest over its limit is reported
+            # as the one that degraded
+            "phase_warning": {"dns": 200, "connect": 300, "tls": 500, "ttfb": 800, "body": 1000},
         }
+        
+        # Checks run concurrently, capped overall, per host and per resolved
+        # address (across all runs of this agent) so shared origins are not
+        # hammered, including many virtual hosts on one IP
+        self.max_concurrent_checks = int(os.getenv("MONITORING_MAX_CONCURRENT_CHECKS", "50"))
+        self.max_checks_per_host = int(os.getenv("MONITORING_MAX_CHECKS_PER_HOST", "2"))
+        self.max_checks_per_address = int(os.getenv("MONITORING_MAX_CHECKS_PER_IP", "4"))
+        self._check_slots = asyncio.Semaphore(self.max_concurrent_checks)
+        self._host_slots = _KeyedSlots(self.max_checks_per_host)
+        self._address_slots = _KeyedSlots(self.max_checks_per_address)
+        
+        # Certificates are re-inspected hourly (sooner if about to expire);
+        # host:port -> (recheck at, monotonic; certificate info), oldest first
+        self.cert_recheck_interval = 3600.0
+        self.max_cached_certs = int(os.getenv("MONITORING_MAX_CACHED_CERTS", "10000"))
+        self._cert_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        
+        # Per-website latency and error-rate baselines; the LLM only sees
+        # sweeps with a statistically significant deviation
+        self.baselines = BaselineStore(
+            z_threshold=float(os.getenv("MONITORING_ANOMALY_Z", "4")),
+        )
+        
+        # Health check results are sent in bulk, by count or age
+        self.rejected_health_checks = 0
+        self._health_checks = AsyncBatcher(
+            self._send_health_checks,
+            max_batch=int(os.getenv("MONITORING_HEALTH_BATCH_SIZE", "200")),
+            max_delay=float(os.getenv("MONITORING_HEALTH_FLUSH_MS", "1000")) / 1000,
+            name="HealthCheckBatcher",
+        )
     
     @property
     def name(self) -> str:
@@ -76,49 +395,43 @@ class MonitoringAgent(BaseAgent):
             results = []
             issues_detected = []
             
-            for website in websites:
-                self.log_info(f"Checking {website['name']} ({website['url']})")
-                check_result = await self._check_website(website)
-                results.append(check_result)
-                
-                # Detect issues
-                if check_result["status"] == "down":
-                    issues_detected.append({
-                        "website": website["name"],
-                        "issue": "Website is down",
-                        "severity": "critical",
-                    })
-                elif check_result["status"] == "degraded":
-                    issues_detected.append({
-                        "website": website["name"],
-                        "issue": f"High response time: {check_result['response_time']}ms",
-                        "severity": "high",
-                    })
-                
-                if check_result.get("ssl_days_until_expiry") and check_result["ssl_days_until_expiry"] < self.thresholds["ssl_expiry_warning"]:
-                    issues_detected.append({
-                        "website": website["name"],
-                        "issue": f"SSL expires in {check_result['ssl_days_until_expiry']} days",
-                        "severity": "medium" if check_result["ssl_days_until_expiry"] > 7 else "high",
-                    })
-                
-                # Store health check result
-                await self._store_health_check(website["id"], check_result)
+            # Check concurrently and handle each result as soon as it is in,
+            # so a sweep takes about as long as its slowest check
+            checks = [asyncio.ensure_future(self._probe(website)) for website in websites]
+            try:
+                for finished in asyncio.as_completed(checks):
+                    website, check_result = await finished
+                    results.append(check_result)
+                    issues_detected.extend(self._detect_issues(website, check_result))
+                    
+                    # Store health check result
+                    self._store_health_check(website["id"], check_result)
+            finally:
+                for check in checks:
+                    check.cancel()
+            
+            # Back in website order, so unchanged sweeps hit the analysis cache
+            order = {website["id"]: i for i, website in enumerate(websites)}
+            results.sort(key=lambda r: order.get(r["website_id"], len(order)))
             
             # If there are issues, create incidents
             for issue in issues_detected:
                 await self._create_incident_for_issue(context.tenant_id, issue)
             
-            # Use AI to analyze patterns if we have history
+            # Use AI to analyze patterns only when something deviates from baseline
+            anomalies = self._score_anomalies(results)
             analysis = None
-            if len(results) > 0:
-                analysis = await self._analyze_health_patterns(results)
+            if anomalies:
+                analysis = await self._analyze_health_patterns(results, anomalies)
+            else:
+                self.log_debug("All checks within baseline, skipping AI analysis")
             
             return AgentResult(
                 success=True,
                 output={
                     "websites_checked": len(websites),
                     "issues_detected": len(issues_detected),
+                    "anomalies": anomalies,
                     "results": results,
                     "analysis": analysis,
                 },
@@ -137,7 +450,10 @@ class MonitoringAgent(BaseAgent):
     async def _get_websites(self, context: AgentContext) -> List[Dict[str, Any]]:
         """Get websites for the tenant"""
         try:
-            if context.website_id:
+            if context.input_data.get("websites"):
+                # Scheduled sweeps carry the rows of the websites that are due
+                return context.input_data["websites"]
+            elif context.website_id:
                 # Check specific website
                 response = await self.call_api("GET", f"/api/websites/{context.website_id}")
                 return [response["website"]] if response.get("website") else []
@@ -149,32 +465,82 @@ class MonitoringAgent(BaseAgent):
             self.log_error(f"Failed to get websites: {e}")
             return []
     
+    async def _probe(self, website: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Check one website once a host slot and a global slot are free"""
+        host = (urlparse(website["url"]).netloc or website["url"]).lower()
+        # Host first, so checks queued behind a busy host hold no global slot;
+        # the address slot is taken when the check connects
+        await self._host_slots.acquire(host)
+        try:
+            async with self._check_slots:
+                self.log_info(f"Checking {website['name']} ({website['url']})")
+                return website, await self._check_website(website)
+        finally:
+            self._host_slots.release(host)
+    
+    def _detect_issues(self, website: Dict[str, Any], check_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Issues worth an incident in one check result"""
+        issues = []
+        if check_result["status"] == "down":
+            issues.append({
+                "website": website["name"],
+                "issue": "Website is down",
+                "severity": "critical",
+            })
+        elif check_result["status"] == "degraded":
+            slow_phase = check_result.get("slow_phase")
+            detail = f" ({slow_phase} {check_result['timings'][slow_phase]}ms)" if slow_phase else ""
+            issues.append({
+                "website": website["name"],
+                "issue": f"High response time: {check_result['response_time']}ms{detail}",
+                "severity": "high",
+            })
+        if issues and check_result.get("slow_phase"):
+            issues[0]["phase"] = check_result["slow_phase"]
+            issues[0]["timings"] = check_result.get("timings")
+        
+        if check_result.get("ssl_days_until_expiry") and check_result["ssl_days_until_expiry"] < self.thresholds["ssl_expiry_warning"]:
+            issues.append({
+                "website": website["name"],
+                "issue": f"SSL expires in {check_result['ssl_days_until_expiry']} days",
+                "severity": "medium" if check_result["ssl_days_until_expiry"] > 7 else "high",
+            })
+        return issues
+    
     async def _check_website(self, website: Dict[str, Any]) -> Dict[str, Any]:
-        """Perform health check on a website"""
+        """
+        Perform health check on a website. Phase timings (dns, connect, tls,
+        ttfb, body) are taken on the monotonic clock from httpx trace events
+        and the check's network backend.
+        """
         url = website["url"]
-        start_time = datetime.utcnow()
+        started = time.monotonic()
+        trace = _PhaseTrace()
         
         result = {
             "website_id": website["id"],
             "url": url,
-            "checked_at": start_time.isoformat(),
+            "checked_at": datetime.utcnow().isoformat(),
             "status": "unknown",
             "response_time": None,
             "status_code": None,
             "error": None,
             "ssl_valid": None,
             "ssl_days_until_expiry": None,
+            "ssl_expires_at": None,
+            "timings": None,
+            "slow_phase": None,
         }
         
         try:
-            async with httpx.AsyncClient(verify=True, follow_redirects=True) as client:
-                response = await client.get(url, timeout=self.check_timeout)
-                
-                end_time = datetime.utcnow()
-                response_time = int((end_time - start_time).total_seconds() * 1000)
+            async with httpx.AsyncClient(transport=self._check_transport(trace), follow_redirects=True) as client:
+                response = await client.get(url, timeout=self.check_timeout, extensions={"trace": trace})
                 
+                response_time = int((time.monotonic() - started) * 1000)
                 result["response_time"] = response_time
                 result["status_code"] = response.status_code
+                result["timings"] = trace.milliseconds()
+                result["slow_phase"] = self._slow_phase(result["timings"])
                 
                 # Determine status
                 if response.status_code >= 500:
@@ -183,18 +549,19 @@ class MonitoringAgent(BaseAgent):
                     result["status"] = "error"
                 elif response_time > self.thresholds["response_time_critical"]:
                     result["status"] = "degraded"
-                elif response_time > self.thresholds["response_time_warning"]:
+                elif response_time > self.thresholds["response_time_warning"] or result["slow_phase"]:
                     result["status"] = "slow"
                 else:
                     result["status"] = "up"
                 
                 # Check SSL if HTTPS
                 if url.startswith("https://"):
-                    ssl_info = await self._check_ssl(url)
+                    ssl_info = await self._check_ssl(url, response)
                     result["ssl_valid"] = ssl_info.get("valid")
                     result["ssl_days_until_expiry"] = ssl_info.get("days_until_expiry")
+                    result["ssl_expires_at"] = ssl_info.get("expires_at")
                 
-        except httpx.TimeoutException:
+        except (httpx.TimeoutException, asyncio.TimeoutError):
             result["status"] = "down"
             result["error"] = "Connection timed out"
         except httpx.ConnectError as e:
@@ -204,49 +571,139 @@ class MonitoringAgent(BaseAgent):
             result["status"] = "error"
             result["error"] = str(e)
         
+        if result["error"] is not None:
+            # The phase still running when the check failed is the one that broke
+            for phase in list(trace.in_progress):
+                trace.finish(phase, failed=True)
+            failed_phase = trace.failed
+            result["response_time"] = int((time.monotonic() - started) * 1000)
+            result["timings"] = trace.milliseconds()
+            result["slow_phase"] = failed_phase or self._slow_phase(result["timings"])
+            if failed_phase:
+                result["error"] += f" during {failed_phase}"
+        
         return result
     
-    async def _check_ssl(self, url: str) -> Dict[str, Any]:
-        """Check SSL certificate validity and expiration"""
-        import ssl
-        import socket
-        from urllib.parse import urlparse
+    def _slow_phase(self, timings: Dict[str, int]) -> Optional[str]:
+        """Phase furthest over its warning threshold, if any is over"""
+        limits = self.thresholds["phase_warning"]
+        over = {phase: ms / limits[phase] for phase, ms in timings.items() if phase in limits and ms > limits[phase]}
+        return max(over, key=over.get) if over else None
+    
+    def _check_transport(self, trace: _PhaseTrace) -> "_CheckTransport":
+        """Transport for one check, resolving and connecting through `trace`"""
+        return _CheckTransport(httpcore.AsyncConnectionPool(
+            ssl_context=self._get_ssl_context(),
+            network_backend=_ResolvingBackend(trace, self._address_slots),
+        ))
+    
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        """Verifying context built once; loading CA certificates blocks"""
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+    
+    async def _check_ssl(self, url: str, response: Optional[httpx.Response] = None) -> Dict[str, Any]:
+        """
+        Check SSL certificate validity and expiration. The certificate comes
+        from the connection `response` used when possible, otherwise from a
+        non-blocking TLS connect, and is cached per host until recheck.
+        """
+        parsed = urlparse(url)
+        hostname = parsed.hostname
+        port = parsed.port or 443
+        key = f"{hostname}:{port}"
         
-        try:
-            parsed = urlparse(url)
-            hostname = parsed.hostname
-            port = parsed.port or 443
-            
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, port), timeout=10) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    cert = ssock.getpeercert()
-                    
-                    # Get expiry date
-                    not_after = datetime.strptime(cert["notAfter"], "%b %d %H:%M:%S %Y %Z")
-                    days_until_expiry = (not_after - datetime.utcnow()).days
-                    
-                    return {
-                        "valid": True,
-                        "days_until_expiry": days_until_expiry,
-                        "issuer": dict(x[0] for x in cert.get("issuer", [])),
-                    }
-        except Exception as e:
-            return {"valid": False, "error": str(e)}
+        cached = self._cert_cache.get(key)
+        if cached is None or time.monotonic() >= cached[0]:
+            cert = None
+            if response is not None:
+                try:
+                    cert = self._peer_cert(response, hostname, port)
+                except Exception as e:
+                    # e.g. a transport without network_stream; connect instead
+                    self.log_debug(f"No certificate from the response for {key}: {e}")
+            try:
+                if cert is None:
+                    cert = await self._fetch_cert(hostname, port)
+                expires = ssl.cert_time_to_seconds(cert["notAfter"])
+            except Exception as e:
+                return {"valid": False, "error": str(e)}
+            info = {
+                "expires": expires,
+                "issuer": dict(x[0] for x in cert.get("issuer", [])),
+            }
+            recheck = min(self.cert_recheck_interval, max(0.0, expires - time.time()))
+            cached = (time.monotonic() + recheck, info)
+            self._cache_cert(key, cached)
+        
+        info = cached[1]
+        return {
+            "valid": info["expires"] > time.time(),
+            "days_until_expiry": int((info["expires"] - time.time()) // 86400),
+            "expires_at": datetime.utcfromtimestamp(info["expires"]).isoformat(),
+            "issuer": info["issuer"],
+        }
+    
+    def _cache_cert(self, key: str, entry: Tuple[float, Dict[str, Any]]):
+        """Store a certificate, evicting expired entries (then the oldest) when full"""
+        self._cert_cache.pop(key, None)
+        if len(self._cert_cache) >= self.max_cached_certs:
+            now = time.monotonic()
+            for stale in [k for k, (recheck_at, _) in self._cert_cache.items() if recheck_at <= now]:
+                del self._cert_cache[stale]
+            while len(self._cert_cache) >= self.max_cached_certs:
+                del self._cert_cache[next(iter(self._cert_cache))]
+        self._cert_cache[key] = entry
+    
+    def _peer_cert(self, response: httpx.Response, hostname: str, port: int) -> Optional[Dict[str, Any]]:
+        """Certificate of the connection a response (or a redirect before it) came over"""
+        for hop in [*response.history, response]:
+            if hop.url.host != hostname or (hop.url.port or 443) != port:
+                continue
+            stream = hop.extensions.get("network_stream")
+            ssl_object = stream.get_extra_info("ssl_object") if stream is not None else None
+            cert = ssl_object.getpeercert() if ssl_object is not None else None
+            if cert:
+                return cert
+        return None
     
-    async def _store_health_check(self, website_id: str, result: Dict[str, Any]):
-        """Store health check result in database"""
+    async def _fetch_cert(self, hostname: str, port: int) -> Dict[str, Any]:
+        """Verified peer certificate from an asyncio TLS connection"""
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(hostname, port, ssl=self._get_ssl_context(), server_hostname=hostname),
+            timeout=10,
+        )
         try:
-            await self.call_api("POST", f"/api/websites/{website_id}/health-checks", {
-                "status": result["status"],
-                "statusCode": result["status_code"],
-                "responseTime": result["response_time"],
-                "errorMessage": result.get("error"),
-                "sslValid": result.get("ssl_valid"),
-                "sslExpiresAt": None,  # Would calculate from days_until_expiry
-            })
-        except Exception as e:
-            self.log_warn(f"Failed to store health check: {e}")
+            return writer.get_extra_info("peercert")
+        finally:
+            writer.close()
+    
+    def _store_health_check(self, website_id: str, result: Dict[str, Any]):
+        """Queue a health check result for the next bulk insert"""
+        self._health_checks.add({
+            "websiteId": website_id,
+            "status": result["status"],
+            "statusCode": result["status_code"],
+            "responseTime": result["response_time"],
+            "errorMessage": result.get("error"),
+            "sslValid": result.get("ssl_valid"),
+            "sslExpiresAt": _utc(result.get("ssl_expires_at")),
+            "timings": result.get("timings"),
+            "checkedAt": _utc(result["checked_at"]),
+        })
+    
+    async def _send_health_checks(self, checks: List[Dict[str, Any]]):
+        response = await self.call_api("POST", "/api/health-checks/bulk", {"checks": checks})
+        for row in response.get("results", []):
+            if not row.get("ok"):
+                # Invalid rows are not retried
+                self.rejected_health_checks += 1
+                self.log_warn(f"Health check for website {row.get('websiteId')} rejected: {row.get('error')}")
+    
+    async def flush(self):
+        """Send queued health checks now"""
+        await self._health_checks.flush()
     
     async def _create_incident_for_issue(self, tenant_id: str, issue: Dict[str, Any]):
         """Create an incident for a detected issue"""
@@ -263,11 +720,26 @@ class MonitoringAgent(BaseAgent):
         except Exception as e:
             self.log_error(f"Failed to create incident: {e}")
     
-    async def _analyze_health_patterns(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _score_anomalies(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score a sweep against each website's baseline and fold it in"""
+        anomalies = self.baselines.observe(
+            [r["website_id"] for r in results],
+            [r["response_time"] if r["response_time"] is not None else float("nan") for r in results],
+            [r["status"] in ("down", "error") for r in results],
+        )
+        for anomaly in anomalies:
+            anomaly["website_id"] = anomaly.pop("key")
+        return anomalies
+    
+    async def _analyze_health_patterns(
+        self,
+        results: List[Dict[str, Any]],
+        anomalies: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
         """Use AI to analyze health patterns and detect anomalies"""
         try:
             analysis = await self.analyze_with_llm(
-                data={"health_checks": results},
+                data={"health_checks": results, "baseline_anomalies": anomalies or []},
                 analysis_type="website health monitoring",
                 context="Analyze these health check results for patterns, anomalies, and potential issues.",
             )
@@ -286,7 +758,7 @@ async def run_monitoring_agent(tenant_id: str, website_id: Optional[str] = None)
         website_id=website_id,
         trigger="scheduled",
     )
-    result = await agent.execute(context)
+    result = await agent.run(context)
     return result
 
 
@@ -14,6 +14,7 @@ from core.base_agent import (
     AgentContext,
     AgentResult,
 )
+from core.json_stream import extract_json
 
 
 class RCAAgent(BaseAgent):
@@ -28,6 +29,8 @@ class RCAAgent(BaseAgent):
     - Generate actionable insights
     """
     
+    llm_cache_ttl = 3600.0
+    
     def __init__(self, **kwargs):
         super().__init__(AgentType.RCA, **kwargs)
     
@@ -69,22 +72,28 @@ class RCAAgent(BaseAgent):
                 return AgentResult(success=False, output={}, error="Incident not found")
             
             # 2. Gather contextual data
-            timeline = await self._build_timeline(context.tenant_id, incident)
-            deployments = await self._get_recent_deployments(context.tenant_id, incident)
-            logs = await self._get_relevant_logs(context.tenant_id, incident)
-            metrics = await self._get_related_metrics(context.tenant_id, incident)
+            async def gather():
+                return {
+                    "timeline": await self._build_timeline(context.tenant_id, incident),
+                    "deployments": await self._get_recent_deployments(context.tenant_id, incident),
+                    "logs": await self._get_relevant_logs(context.tenant_id, incident),
+                    "metrics": await self._get_related_metrics(context.tenant_id, incident),
+                }
+            
+            gathered = await self.phase("context", gather)
+            timeline = gathered["timeline"]
             
             # 3. Use AI to analyze all data
-            rca_result = await self._perform_ai_analysis(
+            rca_result = await self.phase("analysis", lambda: self._perform_ai_analysis(
                 incident=incident,
                 timeline=timeline,
-                deployments=deployments,
-                logs=logs,
-                metrics=metrics,
-            )
+                deployments=gathered["deployments"],
+                logs=gathered["logs"],
+                metrics=gathered["metrics"],
+            ))
             
             # 4. Update incident with RCA findings
-            await self._update_incident_with_rca(context.incident_id, rca_result)
+            await self.phase("update", lambda: self._update_incident_with_rca(context.incident_id, rca_result))
             
             return AgentResult(
                 success=True,
@@ -247,11 +256,7 @@ Determine the root cause and provide your analysis in JSON format."""
         response = await self.ask_llm(prompt, system_prompt, temperature=0.2)
         
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0]
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0]
-            return json.loads(response.strip())
+            return extract_json(response)
         except json.JSONDecodeError:
             return {
                 "root_cause": "Unable to determine with high confidence",
@@ -280,7 +285,7 @@ async def run_rca_agent(tenant_id: str, incident_id: str):
         incident_id=incident_id,
         trigger="incident",
     )
-    return await agent.execute(context)
+    return await agent.run(context)
 
 
 if __name__ == "__main__":
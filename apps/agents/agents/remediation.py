@@ -4,8 +4,9 @@ Executes automated fixes and recovery actions
 """
 
 import asyncio
+from collections import Counter
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 import json
 
 from core.base_agent import (
@@ -49,6 +50,9 @@ class RemediationAgent(BaseAgent):
     - Resource cleanup
     """
     
+    # Always ask for fresh actions; never replay a stale remediation plan
+    llm_cache_ttl = 0.0
+    
     def __init__(self, **kwargs):
         super().__init__(AgentType.REMEDIATION, **kwargs)
         
@@ -102,26 +106,27 @@ class RemediationAgent(BaseAgent):
             if not incident:
                 return AgentResult(success=False, output={}, error="Incident not found")
             
-            # 2. Determine appropriate remediation actions
-            actions = await self._determine_actions(incident)
-            
-            if not actions:
-                return AgentResult(
-                    success=True,
-                    output={"message": "No automatic remediation actions available"},
-                    recommendations=["Manual intervention required"],
-                )
-            
-            # 3. Check which actions can be auto-executed
-            auto_actions = [a for a in actions if not a.requires_approval]
-            pending_approval = [a for a in actions if a.requires_approval]
-            
+            # 2-4. Stream remediation actions from the model and run
+            # auto-approved ones as soon as each action object is complete
+            actions = []
+            pending_approval = []
             executed_actions = []
             failed_actions = []
             
-            # 4. Execute auto-approved actions
-            for action in auto_actions:
-                result = await self._execute_action(context.tenant_id, action)
+            # Executions are journaled phases so a resumed task never repeats one.
+            # Phases are keyed by plan index: a plan may repeat an action on
+            # the same target, and each occurrence must run once
+            async for action in self._planned_actions(incident):
+                index = len(actions)
+                actions.append(action)
+                if action.requires_approval:
+                    pending_approval.append((index, action))
+                    continue
+                
+                result = await self.phase(
+                    f"execute:{index}:{action.action_type}",
+                    lambda: self._execute_action(context.tenant_id, action),
+                )
                 if result["success"]:
                     executed_actions.append({
                         "action": action.action_type,
@@ -135,23 +140,33 @@ class RemediationAgent(BaseAgent):
                         "error": result.get("error"),
                     })
             
+            if not actions:
+                return AgentResult(
+                    success=True,
+                    output={"message": "No automatic remediation actions available"},
+                    recommendations=["Manual intervention required"],
+                )
+            
             # 5. Create approval requests for high-risk actions
             approval_requests = []
-            for action in pending_approval:
-                request = await self._create_approval_request(
-                    context.tenant_id,
-                    context.incident_id,
-                    action,
+            for index, action in pending_approval:
+                request = await self.phase(
+                    f"approval:{index}:{action.action_type}",
+                    lambda: self._create_approval_request(
+                        context.tenant_id,
+                        context.incident_id,
+                        action,
+                    ),
                 )
                 approval_requests.append(request)
             
             # 6. Send notification about actions taken and pending
-            await self._send_notification(
+            await self.phase("notify", lambda: self._send_notification(
                 context.tenant_id,
                 incident,
                 executed_actions,
                 approval_requests,
-            )
+            ))
             
             return AgentResult(
                 success=True,
@@ -160,7 +175,7 @@ class RemediationAgent(BaseAgent):
                     "failed_actions": failed_actions,
                     "pending_approval": [
                         {"action": a.action_type, "target": a.target}
-                        for a in pending_approval
+                        for _, a in pending_approval
                     ],
                 },
                 actions_taken=[
@@ -182,8 +197,46 @@ class RemediationAgent(BaseAgent):
             self.log_error(f"Failed to get incident: {e}")
             return None
     
-    async def _determine_actions(self, incident: Dict[str, Any]) -> List[RemediationAction]:
-        """Use AI to determine appropriate remediation actions"""
+    async def _planned_actions(self, incident: Dict[str, Any]) -> AsyncIterator[RemediationAction]:
+        """
+        Replay the journaled action plan when resuming, otherwise stream a new
+        one. Each action is journaled as `plan:<index>` before it is yielded,
+        so a run interrupted mid-stream replays the actions it already had
+        and only takes new ones from the fresh stream.
+        """
+        checkpoints = self.current_run.checkpoints
+        plan = checkpoints.get("plan")
+        if plan is not None:
+            for a in plan:
+                yield RemediationAction(**a)
+            return
+        
+        planned = []
+        while f"plan:{len(planned)}" in checkpoints:
+            planned.append(checkpoints[f"plan:{len(planned)}"])
+        for a in planned:
+            yield RemediationAction(**a)
+        
+        # The fresh plan may be reordered or changed; actions matching one
+        # already planned (once each) are taken as that one and not repeated
+        replayed = Counter((a["action_type"], a["target"]) for a in planned)
+        async for action in self._stream_actions(incident):
+            key = (action.action_type, action.target)
+            if replayed[key] > 0:
+                replayed[key] -= 1
+                continue
+            
+            async def journaled(action=action):
+                return vars(action)
+            planned.append(await self.phase(f"plan:{len(planned)}", journaled))
+            yield action
+        
+        async def finished_plan():
+            return planned
+        await self.phase("plan", finished_plan)
+    
+    async def _stream_actions(self, incident: Dict[str, Any]) -> AsyncIterator[RemediationAction]:
+        """Use AI to determine remediation actions, yielding each as it streams in"""
         
         system_prompt = """You are a DevOps remediation expert. Based on the incident information,
 suggest appropriate remediation actions. Available actions are:
@@ -216,30 +269,20 @@ RCA Analysis: {json.dumps(incident.get('rcaAnalysis', {}), indent=2)}
 
 Suggest remediation actions to resolve this incident."""
 
-        response = await self.ask_llm(prompt, system_prompt, temperature=0.2)
-        
-        actions = []
         try:
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0]
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0]
-            
-            action_data = json.loads(response.strip())
-            
-            for a in action_data:
+            async for a in self.stream_llm_json(prompt, system_prompt, temperature=0.2):
+                if not isinstance(a, dict):
+                    continue
                 action_info = self.available_actions.get(a["action_type"], {})
-                actions.append(RemediationAction(
+                yield RemediationAction(
                     action_type=a["action_type"],
                     target=a["target"],
                     description=a["description"],
                     risk_level=a.get("risk_level", action_info.get("risk", "high")),
                     requires_approval=action_info.get("approval_required", True),
-                ))
+                )
         except (json.JSONDecodeError, KeyError) as e:
             self.log_warn(f"Failed to parse AI response: {e}")
-        
-        return actions
     
     async def _execute_action(self, tenant_id: str, action: RemediationAction) -> Dict[str, Any]:
         """Execute a single remediation action"""
@@ -336,7 +379,7 @@ async def run_remediation_agent(tenant_id: str, incident_id: str):
         incident_id=incident_id,
         trigger="incident",
     )
-    return await agent.execute(context)
+    return await agent.run(context)
 
 
 if __name__ == "__main__":
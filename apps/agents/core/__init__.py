@@ -9,6 +9,32 @@ from .base_agent import (
     AgentResult,
     AgentTaskStatus,
 )
+from .http_client import (
+    HTTPClientConfig,
+    create_http_client,
+    get_http_client,
+    close_http_client,
+)
+from .llm_cache import (
+    LLMCache,
+    MemoryLLMCache,
+    SQLiteLLMCache,
+    get_default_llm_cache,
+)
+from .singleflight import SingleFlight
+from .rate_limit import ProviderRateLimiter, get_rate_limiter
+from .json_stream import IncrementalJSONParser, extract_json
+from .batching import AsyncBatcher
+from .log_sink import LogBuffer, get_agent_logger
+from .run_context import RunContext, current_run
+from .worker_pool import TaskQueue, WorkerPool, WorkItem
+from .task_feed import TaskFeed, LongPollTaskFeed, LocalTaskFeed
+from .timer_queue import TimerQueue
+from .journal import TaskJournal
+from .status_updates import StatusBatcher
+from .admission import AdmissionController, LatencyWindow, get_llm_latency
+from .metrics import REGISTRY, Counter, Histogram, Gauge, CallbackCounter
+from .baseline import BaselineStore
 
 __all__ = [
     "BaseAgent",
@@ -16,4 +42,40 @@ __all__ = [
     "AgentContext",
     "AgentResult",
     "AgentTaskStatus",
+    "HTTPClientConfig",
+    "create_http_client",
+    "get_http_client",
+    "close_http_client",
+    "LLMCache",
+    "MemoryLLMCache",
+    "SQLiteLLMCache",
+    "get_default_llm_cache",
+    "SingleFlight",
+    "ProviderRateLimiter",
+    "get_rate_limiter",
+    "IncrementalJSONParser",
+    "extract_json",
+    "AsyncBatcher",
+    "LogBuffer",
+    "get_agent_logger",
+    "RunContext",
+    "current_run",
+    "TaskQueue",
+    "WorkerPool",
+    "WorkItem",
+    "TaskFeed",
+    "LongPollTaskFeed",
+    "LocalTaskFeed",
+    "TimerQueue",
+    "TaskJournal",
+    "StatusBatcher",
+    "AdmissionController",
+    "LatencyWindow",
+    "get_llm_latency",
+    "REGISTRY",
+    "Counter",
+    "Histogram",
+    "Gauge",
+    "CallbackCounter",
+    "BaselineStore",
 ]
@@ -0,0 +1,139 @@
+"""
+Admission Module
+LLM health tracking and load-aware admission of deferrable agent runs
+"""
+
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class LatencyWindow:
+    """Latency and outcome of recent calls over a sliding time window"""
+
+    def __init__(self, window: float = 60.0, maxlen: int = 2000):
+        self.window = window
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=maxlen)
+
+    def observe(self, latency: float, ok: bool = True):
+        self._samples.append((time.monotonic(), latency, ok))
+
+    def snapshot(self) -> Dict[str, float]:
+        cutoff = time.monotonic() - self.window
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        latencies = sorted(s[1] for s in self._samples)
+        errors = sum(1 for s in self._samples if not s[2])
+        return {
+            "count": len(latencies),
+            "p95": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else 0.0,
+            "error_rate": round(errors / len(latencies), 3) if latencies else 0.0,
+        }
+
+
+_llm_calls: Optional[LatencyWindow] = None
+
+
+def get_llm_latency() -> LatencyWindow:
+    """Process-wide window of LLM call latencies, fed by BaseAgent"""
+    global _llm_calls
+    if _llm_calls is None:
+        _llm_calls = LatencyWindow()
+    return _llm_calls
+
+
+# state -> (decision, counter)
+_DECISIONS = {
+    "open": ("admit", "admitted"),
+    "defer": ("defer", "deferred"),
+    "shed": ("shed", "shed"),
+}
+
+
+class AdmissionController:
+    """
+    Decides whether deferrable (scheduled) runs may start, from LLM p95
+    latency, LLM error rate and the number of LLM calls in flight or
+    waiting. Manual and incident work is never held back.
+
+    States:
+      open  - admit everything
+      defer - scheduled runs wait in the queue until load drops
+      shed  - scheduled runs are dropped; they come back next interval
+
+    A limit breached moves to "defer", twice the limit to "shed". Going
+    back down requires every signal to fall below `recover` x its limit.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyWindow] = None,
+        in_flight: Optional[Callable[[], int]] = None,
+        p95_limit: float = 20.0,
+        error_limit: float = 0.2,
+        in_flight_limit: int = 64,
+        recover: float = 0.8,
+        min_samples: int = 5,
+    ):
+        self.latency = latency or get_llm_latency()
+        self.in_flight = in_flight or (lambda: 0)
+        self.limits = {"p95": p95_limit, "error_rate": error_limit, "in_flight": float(in_flight_limit)}
+        self.recover = recover
+        self.min_samples = min_samples
+        self.state = "open"
+        self.reason = ""
+        self.changed_at = time.monotonic()
+        self.decisions = {"admitted": 0, "deferred": 0, "shed": 0}
+        self._signals: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls, in_flight: Optional[Callable[[], int]] = None) -> "AdmissionController":
+        return cls(
+            in_flight=in_flight,
+            p95_limit=float(os.getenv("AGENT_ADMIT_LLM_P95", "20")),
+            error_limit=float(os.getenv("AGENT_ADMIT_LLM_ERROR_RATE", "0.2")),
+            in_flight_limit=int(os.getenv("AGENT_ADMIT_LLM_IN_FLIGHT", "64")),
+        )
+
+    def update(self) -> bool:
+        """Re-evaluate the state from current signals; True if it changed"""
+        window = self.latency.snapshot()
+        signals = {"in_flight": float(self.in_flight())}
+        if window["count"] >= self.min_samples:
+            signals["p95"] = window["p95"]
+            signals["error_rate"] = window["error_rate"]
+        self._signals = signals
+
+        load = max(signals[name] / self.limits[name] for name in signals)
+        worst = max(signals, key=lambda name: signals[name] / self.limits[name])
+
+        if load >= 2.0 or (self.state == "shed" and load >= 2.0 * self.recover):
+            state = "shed"
+        elif load >= 1.0 or (self.state != "open" and load >= self.recover):
+            state = "defer"
+        else:
+            state = "open"
+
+        if state == self.state:
+            return False
+        self.state = state
+        self.reason = "" if state == "open" else f"{worst} {signals[worst]} over limit {self.limits[worst]}"
+        self.changed_at = time.monotonic()
+        return True
+
+    def decide(self) -> str:
+        """Decision for one deferrable run: "admit", "defer" or "shed" """
+        decision, counter = _DECISIONS[self.state]
+        self.decisions[counter] += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "reason": self.reason,
+            "since": round(time.monotonic() - self.changed_at, 1),
+            "signals": dict(self._signals),
+            "limits": dict(self.limits),
+            **self.decisions,
+        }
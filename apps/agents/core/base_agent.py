@@ -5,13 +5,28 @@ Foundation for all AI DevOps agents
 
 import asyncio
 import json
+import os
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
 import httpx
 
+from .http_client import get_http_client
+from .llm_cache import LLMCache, get_default_llm_cache, make_cache_key
+from .singleflight import SingleFlight
+from .rate_limit import estimate_tokens, get_rate_limiter
+from .json_stream import IncrementalJSONParser, extract_json
+from .batching import AsyncBatcher
+from .log_sink import LEVELS, LogBuffer, format_entry, get_agent_logger
+from .journal import TaskJournal
+from .status_updates import StatusBatcher
+from .admission import get_llm_latency
+from .metrics import API_DURATION, LLM_DURATION, LLM_TOKENS, PHASE_DURATION, endpoint_label
+from .run_context import RunContext, _current_run
+
 
 class AgentType(Enum):
     MONITORING = "monitoring"
@@ -51,25 +66,104 @@ class AgentResult:
     error: Optional[str] = None
 
 
+def _usage_tokens(usage: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Total tokens from an OpenAI or Anthropic usage block"""
+    if not usage:
+        return None
+    if "total_tokens" in usage:
+        return usage["total_tokens"]
+    if "input_tokens" in usage or "output_tokens" in usage:
+        return usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    return None
+
+
 class BaseAgent(ABC):
     """
     Abstract base class for all AI DevOps agents.
     Provides common functionality for LLM interaction, logging, and tool execution.
     """
     
+    # Seconds an identical LLM response may be reused; 0 disables caching
+    llm_cache_ttl: float = 300.0
+    
+    # In-flight LLM requests, shared by every agent in the process
+    llm_flights = SingleFlight()
+    
+    # Retries after a 429 before giving up on an LLM call
+    llm_max_retries: int = 3
+    
+    # Most recent log records kept in memory per agent
+    log_buffer_size: int = 500
+    
+    # Task logs are shipped in batches of this size, or after this many seconds
+    log_batch_size: int = 100
+    log_flush_interval: float = 2.0
+    
     def __init__(
         self,
         agent_type: AgentType,
         api_base_url: str = "http://localhost:3000",
         llm_provider: str = "openai",
         llm_model: str = "gpt-4",
+        http_client: Optional[httpx.AsyncClient] = None,
+        llm_cache: Optional[LLMCache] = None,
+        llm_cache_ttl: Optional[float] = None,
+        status_batcher: Optional[StatusBatcher] = None,
     ):
         self.agent_type = agent_type
         self.api_base_url = api_base_url
         self.llm_provider = llm_provider
         self.llm_model = llm_model
-        self.task_id: Optional[str] = None
-        self.logs: List[Dict[str, Any]] = []
+        # Used when the agent is called outside run(), e.g. ad-hoc scripts
+        self._default_run = RunContext(agent=self, logs=LogBuffer(self.log_buffer_size))
+        self._logger = get_agent_logger()
+        self._http_client = http_client
+        self._llm_cache = llm_cache
+        if llm_cache_ttl is not None:
+            self.llm_cache_ttl = llm_cache_ttl
+        # Shared with the scheduler when injected; otherwise owned and
+        # flushed at the end of each run
+        self._status_batcher = status_batcher
+        self._owns_status_batcher = status_batcher is None
+    
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Pooled HTTP client (injected, or the process-wide shared one)"""
+        if self._http_client is not None and not self._http_client.is_closed:
+            return self._http_client
+        return get_http_client()
+    
+    @property
+    def llm_cache(self) -> LLMCache:
+        """LLM response cache (injected, or the process-wide default)"""
+        return self._llm_cache or get_default_llm_cache()
+    
+    @property
+    def status_batcher(self) -> StatusBatcher:
+        """Batcher for task status updates"""
+        if self._status_batcher is None:
+            self._status_batcher = StatusBatcher(self.http, self.api_base_url)
+        return self._status_batcher
+    
+    @property
+    def current_run(self) -> RunContext:
+        """State of the execution running in the current task"""
+        run = _current_run.get()
+        if run is not None and run.agent is self:
+            return run
+        return self._default_run
+    
+    @property
+    def task_id(self) -> Optional[str]:
+        return self.current_run.task_id
+    
+    @task_id.setter
+    def task_id(self, value: Optional[str]):
+        self.current_run.task_id = value
+    
+    @property
+    def logs(self) -> LogBuffer:
+        return self.current_run.logs
     
     @property
     @abstractmethod
@@ -97,17 +191,99 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def run(
+        self,
+        context: AgentContext,
+        task_id: Optional[str] = None,
+        priority: float = 0.0,
+        journal: Optional[TaskJournal] = None,
+        checkpoints: Optional[Dict[str, Any]] = None,
+    ) -> AgentResult:
+        """
+        Execute with run-scoped state (task id, logs, log shipping).
+        Safe to call concurrently on the same agent instance.
+        `priority` orders this run's LLM calls ahead of routine ones.
+        With a `journal`, phases finished by an earlier attempt are reused.
+        `checkpoints` seeds finished phases (e.g. handed over by a replica
+        that released the task) and collects new ones as the run goes.
+        """
+        run = RunContext(
+            agent=self,
+            logs=LogBuffer(self.log_buffer_size),
+            task_id=task_id,
+            context=context,
+            priority=priority,
+            journal=journal,
+        )
+        if checkpoints is not None:
+            run.checkpoints = checkpoints
+        if task_id:
+            run.log_batcher = self._make_log_batcher(task_id)
+            if journal is not None:
+                run.checkpoints.update(await journal.phases(task_id))
+        
+        token = _current_run.set(run)
+        try:
+            return await self.execute(context)
+        finally:
+            if run.log_batcher is not None:
+                await run.log_batcher.flush()
+            if self._owns_status_batcher:
+                # Standalone agent: nothing flushes it later, so send what
+                # it buffers across runs (a scheduler flushes on shutdown)
+                if self._status_batcher is not None:
+                    await self._status_batcher.flush()
+                await self.flush()
+            _current_run.reset(token)
+    
+    async def phase(self, name: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run one resumable step of the current task. The JSON-serializable
+        result is journaled; when the task is resumed after a crash, a step
+        that already finished returns its recorded result instead.
+        """
+        run = self.current_run
+        if name in run.checkpoints:
+            self.log_info(f"Resuming: skipping finished phase '{name}'")
+            return run.checkpoints[name]
+        started = time.monotonic()
+        result = await fn()
+        PHASE_DURATION.observe(time.monotonic() - started, self.agent_type.value, name)
+        run.checkpoints[name] = result
+        if run.journal is not None and run.task_id:
+            await run.journal.record_phase(run.task_id, name, result)
+        return result
+    
+    async def flush(self):
+        """Send anything the agent buffers across runs; called on shutdown"""
+        pass
+    
     # Logging methods
     def log(self, level: str, message: str, data: Optional[Dict] = None):
         """Add a log entry"""
-        entry = {
-            "level": level,
-            "message": message,
-            "data": data,
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-        self.logs.append(entry)
-        print(f"[{self.agent_type.value}] [{level.upper()}] {message}")
+        run = self.current_run
+        run.logs.append(level, message, data)
+        if run.log_batcher is not None:
+            run.log_batcher.add((time.time(), level, message, data))
+        self._logger.log(
+            LEVELS.get(level, LEVELS["info"]),
+            message,
+            extra={"agent": self.agent_type.value, "task_id": run.task_id, "run_id": run.run_id, "data": data},
+        )
+    
+    def _make_log_batcher(self, task_id: str) -> AsyncBatcher:
+        """Batcher that ships a task's logs to the API"""
+        async def ship(batch: List[tuple]):
+            await self.call_api("POST", f"/api/agent-tasks/{task_id}/logs", {
+                "logs": [format_entry(r) for r in batch],
+            })
+        
+        return AsyncBatcher(
+            ship,
+            max_batch=self.log_batch_size,
+            max_delay=self.log_flush_interval,
+            name=f"{self.agent_type.value} logs",
+        )
     
     def log_info(self, message: str, data: Optional[Dict] = None):
         self.log("info", message, data)
@@ -128,13 +304,40 @@ class BaseAgent(ABC):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        use_cache: bool = True,
     ) -> str:
         """
         Send a prompt to the LLM and get a response.
-        Supports OpenAI and Anthropic.
+        Supports OpenAI and Anthropic. Identical requests are served from
+        the response cache for llm_cache_ttl seconds, and concurrent
+        identical requests share a single provider call.
         """
-        import os
+        cache_key = make_cache_key(
+            self.llm_provider, self.llm_model, system_prompt, prompt, temperature, max_tokens
+        )
+        use_cache = use_cache and self.llm_cache_ttl > 0
+        if use_cache:
+            cached = await self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.log_debug("LLM response served from cache")
+                return cached
+        
+        async def call() -> str:
+            response = await self._call_llm(prompt, system_prompt, temperature, max_tokens)
+            if use_cache and response:
+                await self.llm_cache.set(cache_key, response, self.llm_cache_ttl)
+            return response
         
+        return await self.llm_flights.do(cache_key, call)
+    
+    async def _call_llm(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        """Dispatch a request to the configured provider"""
         if self.llm_provider == "openai":
             return await self._ask_openai(prompt, system_prompt, temperature, max_tokens)
         elif self.llm_provider == "anthropic":
@@ -149,32 +352,29 @@ class BaseAgent(ABC):
         temperature: float,
         max_tokens: int,
     ) -> str:
-        import os
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             self.log_error("OPENAI_API_KEY not set")
             return ""
         
-        async with httpx.AsyncClient() as client:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {api_key}"},
-                json={
-                    "model": self.llm_model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                },
-                timeout=60.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        data = await self._post_llm(
+            f"{base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {api_key}"},
+            payload={
+                "model": self.llm_model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            estimated_tokens=estimate_tokens(prompt, system_prompt) + max_tokens,
+        )
+        return data["choices"][0]["message"]["content"]
     
     async def _ask_anthropic(
         self,
@@ -183,30 +383,234 @@ class BaseAgent(ABC):
         temperature: float,
         max_tokens: int,
     ) -> str:
-        import os
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             self.log_error("ANTHROPIC_API_KEY not set")
             return ""
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01",
-                },
-                json={
-                    "model": self.llm_model,
-                    "max_tokens": max_tokens,
-                    "system": system_prompt or "",
-                    "messages": [{"role": "user", "content": prompt}],
-                },
-                timeout=60.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["content"][0]["text"]
+        base_url = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+        data = await self._post_llm(
+            f"{base_url}/messages",
+            headers={
+                "x-api-key": api_key,
+                "anthropic-version": "2023-06-01",
+            },
+            payload={
+                "model": self.llm_model,
+                "max_tokens": max_tokens,
+                "system": system_prompt or "",
+                "messages": [{"role": "user", "content": prompt}],
+            },
+            estimated_tokens=estimate_tokens(prompt, system_prompt) + max_tokens,
+        )
+        return data["content"][0]["text"]
+    
+    async def _post_llm(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        estimated_tokens: int,
+    ) -> Dict[str, Any]:
+        """
+        POST to an LLM provider through its rate limiter.
+        429 responses feed the limiter and are retried up to llm_max_retries.
+        """
+        limiter = get_rate_limiter(self.llm_provider, self.llm_model)
+        attempt = 0
+        
+        while True:
+            await limiter.acquire(self.agent_type.value, estimated_tokens, self.current_run.priority)
+            response = None
+            used_tokens = None
+            started = time.monotonic()
+            completed = False
+            try:
+                response = await self.http.post(url, headers=headers, json=payload, timeout=60.0)
+                if response.status_code == 429 and attempt < self.llm_max_retries:
+                    attempt += 1
+                    self.log_warn(f"LLM rate limited, retrying ({attempt}/{self.llm_max_retries})")
+                    continue
+                response.raise_for_status()
+                data = response.json()
+                used_tokens = _usage_tokens(data.get("usage"))
+                completed = True
+                return data
+            finally:
+                limiter.release(estimated_tokens, used_tokens, response)
+                # Latency and errors (429s included) drive scheduler admission
+                elapsed = time.monotonic() - started
+                get_llm_latency().observe(elapsed, completed)
+                self._record_llm_call(elapsed, completed, response, used_tokens)
+    
+    # Streaming LLM interaction
+    async def stream_llm(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        use_cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the LLM response as text chunks (server-sent events).
+        Cached responses are replayed as a single chunk.
+        """
+        cache_key = make_cache_key(
+            self.llm_provider, self.llm_model, system_prompt, prompt, temperature, max_tokens
+        )
+        use_cache = use_cache and self.llm_cache_ttl > 0
+        if use_cache:
+            cached = await self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.log_debug("LLM response served from cache")
+                yield cached
+                return
+        
+        if self.llm_provider == "openai":
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                self.log_error("OPENAI_API_KEY not set")
+                return
+            messages = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            messages.append({"role": "user", "content": prompt})
+            base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+            url = f"{base_url}/chat/completions"
+            headers = {"Authorization": f"Bearer {api_key}"}
+            payload = {
+                "model": self.llm_model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stream": True,
+                "stream_options": {"include_usage": True},
+            }
+        elif self.llm_provider == "anthropic":
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                self.log_error("ANTHROPIC_API_KEY not set")
+                return
+            base_url = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+            url = f"{base_url}/messages"
+            headers = {"x-api-key": api_key, "anthropic-version": "2023-06-01"}
+            payload = {
+                "model": self.llm_model,
+                "max_tokens": max_tokens,
+                "system": system_prompt or "",
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True,
+            }
+        else:
+            raise ValueError(f"Unknown LLM provider: {self.llm_provider}")
+        
+        chunks = []
+        async for text in self._stream_post_llm(
+            url, headers, payload, estimate_tokens(prompt, system_prompt) + max_tokens
+        ):
+            chunks.append(text)
+            yield text
+        
+        response = "".join(chunks)
+        if use_cache and response:
+            await self.llm_cache.set(cache_key, response, self.llm_cache_ttl)
+    
+    async def _stream_post_llm(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        estimated_tokens: int,
+    ) -> AsyncIterator[str]:
+        """Stream an SSE completion through the provider rate limiter"""
+        limiter = get_rate_limiter(self.llm_provider, self.llm_model)
+        attempt = 0
+        
+        while True:
+            await limiter.acquire(self.agent_type.value, estimated_tokens, self.current_run.priority)
+            response = None
+            usage: Dict[str, int] = {}
+            started = time.monotonic()
+            completed = False
+            try:
+                async with self.http.stream("POST", url, headers=headers, json=payload, timeout=60.0) as response:
+                    if response.status_code == 429 and attempt < self.llm_max_retries:
+                        attempt += 1
+                        self.log_warn(f"LLM rate limited, retrying ({attempt}/{self.llm_max_retries})")
+                        continue
+                    if response.is_error:
+                        await response.aread()
+                        response.raise_for_status()
+                    
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        event = json.loads(data)
+                        
+                        # OpenAI chunks
+                        if event.get("usage"):
+                            usage.update(event["usage"])
+                        for choice in event.get("choices") or []:
+                            text = (choice.get("delta") or {}).get("content")
+                            if text:
+                                yield text
+                        
+                        # Anthropic events
+                        if event.get("type") == "message_start":
+                            usage.update(event["message"].get("usage") or {})
+                        elif event.get("type") == "content_block_delta":
+                            text = event["delta"].get("text")
+                            if text:
+                                yield text
+                completed = True
+                return
+            finally:
+                used_tokens = _usage_tokens(usage)
+                limiter.release(estimated_tokens, used_tokens, response)
+                elapsed = time.monotonic() - started
+                get_llm_latency().observe(elapsed, completed)
+                self._record_llm_call(elapsed, completed, response, used_tokens)
+    
+    def _record_llm_call(
+        self,
+        elapsed: float,
+        completed: bool,
+        response: Optional[httpx.Response],
+        used_tokens: Optional[int],
+    ):
+        if completed:
+            outcome = "ok"
+        elif response is None:
+            outcome = "error"
+        else:
+            outcome = str(response.status_code)
+        LLM_DURATION.observe(elapsed, self.llm_provider, self.llm_model, outcome)
+        if used_tokens:
+            LLM_TOKENS.inc(self.llm_provider, self.llm_model, amount=used_tokens)
+    
+    async def stream_llm_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Any]:
+        """
+        Stream a JSON response, yielding each element of a top-level array
+        as soon as it is complete. A top-level object is yielded once whole.
+        """
+        parser = IncrementalJSONParser()
+        async for text in self.stream_llm(prompt, system_prompt, temperature, max_tokens, use_cache):
+            for item in parser.feed(text):
+                yield item
+        
+        if parser.root != "[":
+            yield parser.close()
     
     async def analyze_with_llm(
         self,
@@ -237,12 +641,7 @@ Provide your analysis in JSON format."""
         response = await self.ask_llm(prompt, system_prompt, temperature=0.3)
         
         try:
-            # Extract JSON from response
-            if "```json" in response:
-                response = response.split("```json")[1].split("```")[0]
-            elif "```" in response:
-                response = response.split("```")[1].split("```")[0]
-            return json.loads(response.strip())
+            return extract_json(response)
         except json.JSONDecodeError:
             return {
                 "summary": response,
@@ -261,17 +660,22 @@ Provide your analysis in JSON format."""
         headers: Optional[Dict] = None,
     ) -> Dict[str, Any]:
         """Call the main application API"""
-        async with httpx.AsyncClient() as client:
-            url = f"{self.api_base_url}{endpoint}"
-            response = await client.request(
+        url = f"{self.api_base_url}{endpoint}"
+        started = time.monotonic()
+        status = "error"
+        try:
+            response = await self.http.request(
                 method,
                 url,
                 json=data,
                 headers=headers or {},
                 timeout=30.0,
             )
-            response.raise_for_status()
-            return response.json()
+            status = str(response.status_code)
+        finally:
+            API_DURATION.observe(time.monotonic() - started, method, endpoint_label(endpoint), status)
+        response.raise_for_status()
+        return response.json()
     
     async def create_incident(
         self,
@@ -299,8 +703,8 @@ Provide your analysis in JSON format."""
         output: Optional[Dict] = None,
         error_message: Optional[str] = None,
     ):
-        """Update the agent task status in the database"""
-        await self.call_api("PATCH", f"/api/agent-tasks/{task_id}", {
+        """Queue a task status update; sent in the next status batch"""
+        self.status_batcher.add(task_id, {
             "status": status.value,
             "output": output,
             "errorMessage": error_message,
@@ -309,5 +713,13 @@ Provide your analysis in JSON format."""
     
     async def save_logs(self, task_id: str):
         """Save agent logs to database"""
-        for log in self.logs:
-            await self.call_api("POST", f"/api/agent-tasks/{task_id}/logs", log)
+        run = self.current_run
+        if run.log_batcher is not None and run.task_id == task_id:
+            await run.log_batcher.flush()
+            return
+        
+        entries = self.logs.drain()
+        for i in range(0, len(entries), self.log_batch_size):
+            await self.call_api("POST", f"/api/agent-tasks/{task_id}/logs", {
+                "logs": entries[i:i + self.log_batch_size],
+            })
@@ -0,0 +1,151 @@
+"""
+Baseline Module
+Rolling per-series baselines and anomaly scoring on NumPy arrays
+"""
+
+import warnings
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class BaselineStore:
+    """
+    Baselines for many series (e.g. one per website) kept in fixed arrays:
+    a ring buffer of the last `window` log-latencies per series for
+    median/MAD, an EWMA of latency and an EWMA of the error rate.
+
+    observe() scores a batch of samples against their baselines in a few
+    vectorized operations, then folds the samples in. A sample is anomalous
+    when its log-latency is more than `z_threshold` robust deviations above
+    the median (once `min_samples` latencies are known) and at least
+    `min_excess` above it, or when it failed while the series usually
+    succeeds. Latency is right-skewed, so it is scored on a log scale.
+    """
+
+    def __init__(
+        self,
+        window: int = 60,
+        alpha: float = 0.1,
+        z_threshold: float = 4.0,
+        min_samples: int = 10,
+        error_threshold: float = 0.5,
+        min_spread: float = 0.1,
+        min_excess: float = 50.0,
+        capacity: int = 64,
+    ):
+        self.window = window
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        # Floor on the log deviation (about 10%) and on the latency increase,
+        # so very steady or very fast series do not flag jitter
+        self.min_spread = min_spread
+        self.min_excess = min_excess
+        self.scored = 0
+        self.anomalous = 0
+
+        self._index: Dict[str, int] = {}
+        self._latency = np.full((capacity, window), np.nan, dtype=np.float32)
+        self._written = np.zeros(capacity, dtype=np.int64)
+        self._latency_ewma = np.zeros(capacity, dtype=np.float64)
+        self._error_rate = np.zeros(capacity, dtype=np.float64)
+
+    def _grow(self):
+        capacity = len(self._written) * 2
+        latency = np.full((capacity, self.window), np.nan, dtype=np.float32)
+        latency[: len(self._latency)] = self._latency
+        self._latency = latency
+        self._written = np.resize(self._written, capacity)
+        self._written[len(self._index):] = 0
+        self._latency_ewma = np.resize(self._latency_ewma, capacity)
+        self._latency_ewma[len(self._index):] = 0.0
+        self._error_rate = np.resize(self._error_rate, capacity)
+        self._error_rate[len(self._index):] = 0.0
+
+    def _rows(self, keys: Sequence[str]) -> np.ndarray:
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self._index.get(key)
+            if row is None:
+                row = len(self._index)
+                if row >= len(self._written):
+                    self._grow()
+                self._index[key] = row
+            rows[i] = row
+        return rows
+
+    def observe(
+        self,
+        keys: Sequence[str],
+        latencies: Sequence[float],
+        errors: Sequence[bool],
+    ) -> List[Dict]:
+        """
+        Score one sample per key, update the baselines, and return the
+        anomalous samples with the baseline they were compared against.
+        Latencies of failed samples are ignored (pass NaN or anything).
+        """
+        if not keys:
+            return []
+        rows = self._rows(keys)
+        latency = np.asarray(latencies, dtype=np.float64)
+        failed = np.asarray(errors, dtype=bool)
+        ok = ~failed & ~np.isnan(latency)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            log_latency = np.log1p(latency)
+        history = self._latency[rows]
+        with warnings.catch_warnings():
+            # Rows without history yet are all-NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            median = np.nanmedian(history, axis=1)
+            mad = np.nanmedian(np.abs(history - median[:, None]), axis=1) * 1.4826
+        median_latency = np.expm1(median)
+        known = np.minimum(self._written[rows], self.window) >= self.min_samples
+        with np.errstate(invalid="ignore"):
+            z = np.where(known & ok, (log_latency - median) / np.maximum(mad, self.min_spread), 0.0)
+            excess = np.where(known & ok, latency - median_latency, 0.0)
+
+        error_rate = self._error_rate[rows]
+        baseline_ewma = self._latency_ewma[rows]
+        slow = (z > self.z_threshold) & (excess >= self.min_excess)
+        new_errors = failed & (error_rate < self.error_threshold)
+        anomalous = slow | new_errors
+
+        # Fold the samples in
+        ok_rows = rows[ok]
+        self._latency[ok_rows, self._written[ok_rows] % self.window] = log_latency[ok]
+        self._latency_ewma[ok_rows] = np.where(
+            self._written[ok_rows] == 0,
+            latency[ok],
+            (1 - self.alpha) * self._latency_ewma[ok_rows] + self.alpha * latency[ok],
+        )
+        self._written[ok_rows] += 1
+        self._error_rate[rows] = (1 - self.alpha) * error_rate + self.alpha * failed
+
+        self.scored += len(rows)
+        self.anomalous += int(anomalous.sum())
+        return [
+            {
+                "key": keys[i],
+                "reason": "errors" if new_errors[i] else "latency",
+                "latency": None if np.isnan(latency[i]) else float(latency[i]),
+                "baseline_median": None if np.isnan(median[i]) else round(float(median_latency[i]), 1),
+                "baseline_ewma": round(float(baseline_ewma[i]), 1),
+                "z": round(float(z[i]), 1),
+                "error_rate": round(float(error_rate[i]), 3),
+            }
+            for i in np.flatnonzero(anomalous)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "series": len(self._index),
+            "scored": self.scored,
+            "anomalous": self.anomalous,
+        }
+
+    def __len__(self) -> int:
+        return len(self._index)
@@ -0,0 +1,119 @@
+"""
+Batching Module
+Non-blocking batcher that flushes buffered items by size or age
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional
+
+
+class AsyncBatcher:
+    """
+    Buffers items and hands them to `flush_fn` in batches.
+
+    add() never awaits: a batch is flushed in the background once
+    `max_batch` items are pending or the oldest item is `max_delay`
+    seconds old. Failed batches are put back and retried with
+    exponential backoff. At most `max_pending` items are kept; the oldest
+    are dropped (and counted) beyond that.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Any]], Awaitable[None]],
+        max_batch: int = 100,
+        max_delay: float = 2.0,
+        max_pending: int = 10000,
+        max_backoff: float = 30.0,
+        name: str = "batcher",
+    ):
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.name = name
+        self.dropped = 0
+        self.flushed = 0
+        self.failures = 0
+        self._pending: Deque[Any] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._retry_delay = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, item: Any):
+        """Queue an item for the next batch"""
+        self._pending.append(item)
+        self._trim()
+        if len(self._pending) >= self.max_batch and not self._retry_delay:
+            self._start_flush()
+        elif self._timer is None and self._flushing is None:
+            self._arm(self.max_delay)
+
+    def _trim(self):
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+
+    def _arm(self, delay: float):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (e.g. synchronous use); items wait for flush()
+            return
+        self._timer = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            while self._pending:
+                if not await self._flush_one():
+                    self._retry_delay = min(self.max_backoff, max(0.5, self._retry_delay * 2))
+                    self._arm(self._retry_delay)
+                    return
+                self._retry_delay = 0.0
+                if len(self._pending) < self.max_batch:
+                    break
+            if self._pending:
+                self._arm(self.max_delay)
+        finally:
+            self._flushing = None
+
+    async def _flush_one(self) -> bool:
+        batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+        try:
+            await self.flush_fn(batch)
+            self.flushed += len(batch)
+            return True
+        except Exception as e:
+            self.failures += 1
+            print(f"[{self.name}] Flush of {len(batch)} items failed: {e}")
+            self._pending.extendleft(reversed(batch))
+            self._trim()
+            return False
+
+    async def flush(self, retries: int = 3):
+        """Flush everything now, retrying failed batches a few times"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None:
+            await asyncio.shield(self._flushing)
+        attempts = 0
+        while self._pending and attempts <= retries:
+            if await self._flush_one():
+                attempts = 0
+            else:
+                attempts += 1
+                await asyncio.sleep(min(self.max_backoff, 0.5 * 2 ** attempts))
+        self._retry_delay = 0.0
@@ -0,0 +1,108 @@
+"""
+HTTP Client Module
+Process-wide pooled httpx client shared by every agent
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+
+
+@dataclass
+class HTTPClientConfig:
+    """Connection pool settings for the shared HTTP client"""
+    max_connections: int = 200
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 30.0
+    timeout: float = 30.0
+    http2: bool = False
+    # Internal app API routes expect the cron secret as a bearer token
+    api_base_url: str = "http://localhost:3000"
+    api_secret: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientConfig":
+        """Build a config from AGENT_HTTP_* environment variables"""
+        return cls(
+            max_connections=int(os.getenv("AGENT_HTTP_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(os.getenv("AGENT_HTTP_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=float(os.getenv("AGENT_HTTP_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            timeout=float(os.getenv("AGENT_HTTP_TIMEOUT", cls.timeout)),
+            http2=os.getenv("AGENT_HTTP2", "false").lower() in ("1", "true", "yes"),
+            api_base_url=os.getenv("API_BASE_URL", cls.api_base_url),
+            api_secret=os.getenv("CRON_SECRET") or None,
+        )
+
+
+class APIAuth(httpx.Auth):
+    """
+    Adds the bearer secret to requests for the app API only, so it is never
+    sent to LLM providers or other hosts that share the client
+    """
+
+    def __init__(self, api_base_url: str, secret: str):
+        self.prefix = api_base_url.rstrip("/") + "/"
+        self.secret = secret
+
+    def auth_flow(self, request: httpx.Request):
+        if str(request.url).startswith(self.prefix) and "authorization" not in request.headers:
+            request.headers["Authorization"] = f"Bearer {self.secret}"
+        yield request
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client(
+    config: Optional[HTTPClientConfig] = None,
+    api_base_url: Optional[str] = None,
+) -> httpx.AsyncClient:
+    """Create a pooled AsyncClient with keep-alive enabled"""
+    config = config or HTTPClientConfig.from_env()
+    api_base_url = api_base_url or config.api_base_url
+    http2 = config.http2
+    if http2 and not _http2_available():
+        print("[HTTP] HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        timeout=config.timeout,
+        http2=http2,
+        auth=APIAuth(api_base_url, config.api_secret) if config.api_secret else None,
+    )
+
+
+_shared_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use"""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = create_http_client()
+    return _shared_client
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]):
+    """Install a client (e.g. one built by the scheduler) as the shared client"""
+    global _shared_client
+    _shared_client = client
+
+
+async def close_http_client():
+    """Close the shared client and drop its pooled connections"""
+    global _shared_client
+    if _shared_client is not None and not _shared_client.is_closed:
+        await _shared_client.aclose()
+    _shared_client = None
@@ -0,0 +1,120 @@
+"""
+Task Journal Module
+Append-only local journal so a restarted scheduler can resume tasks
+"""
+
+import asyncio
+import json
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List
+
+
+class TaskJournal:
+    """
+    SQLite journal (WAL mode) of task claims, finished phase results and
+    completions. Every record is committed before the call returns, so
+    anything journaled survives the process being killed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = asyncio.Lock()
+        self._completions = 0
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_journal ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL, "
+            "event TEXT NOT NULL, phase TEXT, data TEXT, ts REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS task_journal_task ON task_journal (task_id)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS journal_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def worker_id(self) -> str:
+        """Worker id stored with the journal, so a restart reclaims its own tasks"""
+        row = self._conn.execute("SELECT value FROM journal_meta WHERE key = 'worker_id'").fetchone()
+        if row is not None:
+            return row[0]
+        worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self._conn.execute("INSERT INTO journal_meta (key, value) VALUES ('worker_id', ?)", (worker_id,))
+        self._conn.commit()
+        return worker_id
+
+    def _append_sync(self, task_id: str, event: str, phase: Any, data: Any):
+        self._conn.execute(
+            "INSERT INTO task_journal (task_id, event, phase, data, ts) VALUES (?, ?, ?, ?, ?)",
+            (task_id, event, phase, json.dumps(data, default=str), time.time()),
+        )
+        self._conn.commit()
+
+    async def _append(self, task_id: str, event: str, phase: Any = None, data: Any = None):
+        async with self._lock:
+            await asyncio.to_thread(self._append_sync, task_id, event, phase, data)
+
+    async def record_claim(self, task: Dict[str, Any]):
+        await self._append(task["id"], "claim", data=task)
+
+    async def record_phase(self, task_id: str, phase: str, result: Any):
+        await self._append(task_id, "phase", phase, result)
+
+    async def record_complete(self, task_id: str, status: str):
+        await self._append(task_id, "complete", data=status)
+        self._completions += 1
+        if self._completions % 1000 == 0:
+            await self.prune()
+
+    def _phases_sync(self, task_id: str) -> Dict[str, Any]:
+        # A task claimed again after completing starts from scratch
+        rows = self._conn.execute(
+            "SELECT phase, data FROM task_journal WHERE task_id = ? AND event = 'phase' "
+            "AND seq > COALESCE((SELECT MAX(seq) FROM task_journal "
+            "WHERE task_id = ? AND event = 'complete'), 0) ORDER BY seq",
+            (task_id, task_id),
+        ).fetchall()
+        return {phase: json.loads(data) for phase, data in rows}
+
+    async def phases(self, task_id: str) -> Dict[str, Any]:
+        """Results of the phases a task finished since it was last completed"""
+        async with self._lock:
+            return await asyncio.to_thread(self._phases_sync, task_id)
+
+    def _unfinished_sync(self) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT c.data FROM task_journal c WHERE c.event = 'claim' "
+            "AND c.seq = (SELECT MAX(seq) FROM task_journal WHERE task_id = c.task_id AND event = 'claim') "
+            "AND NOT EXISTS (SELECT 1 FROM task_journal d WHERE d.task_id = c.task_id "
+            "AND d.event = 'complete' AND d.seq > c.seq) ORDER BY c.seq"
+        ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    async def unfinished(self) -> List[Dict[str, Any]]:
+        """Tasks that were claimed but never completed"""
+        async with self._lock:
+            return await asyncio.to_thread(self._unfinished_sync)
+
+    def _prune_sync(self, max_age: float):
+        cutoff = time.time() - max_age
+        self._conn.execute(
+            "DELETE FROM task_journal WHERE task_id IN ("
+            "SELECT task_id FROM task_journal GROUP BY task_id "
+            "HAVING MAX(CASE WHEN event = 'complete' THEN seq END) = MAX(seq) AND MAX(ts) < ?)",
+            (cutoff,),
+        )
+        self._conn.commit()
+
+    async def prune(self, max_age: float = 86400.0):
+        """Drop tasks that completed more than `max_age` seconds ago"""
+        async with self._lock:
+            await asyncio.to_thread(self._prune_sync, max_age)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,156 @@
+"""
+JSON Stream Module
+Incremental, fence-aware JSON parsing of streamed LLM output
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Parses the first JSON value in LLM output as text arrives.
+
+    Leading prose and ``` / ```json fences are skipped. A bracket in the
+    prose (e.g. "[see below]") is only a candidate: when it is not followed
+    by a JSON value, runs into a fence, or closes into something that does
+    not parse, scanning resumes after it. When the value is an array, each
+    object or array element is returned by feed() as soon as it closes.
+    When it is an object, `partial` holds the members completed so far.
+    close() returns the whole value.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.partial: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._root_char = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._in_fence_line = False
+        self._item_start: Optional[int] = None
+        self._expect_value = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Add text and return any array elements completed by it"""
+        self.buffer += chunk
+        items: List[Any] = []
+        text = self.buffer
+
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+
+            if self._root_start is None:
+                if self._in_fence_line:
+                    # Skip the rest of a fence line such as ```json
+                    if ch == "\n":
+                        self._in_fence_line = False
+                elif ch == "`":
+                    self._in_fence_line = True
+                elif ch in "{[":
+                    self._root_start = self._pos
+                    self._root_char = ch
+                    self._depth = 1
+                    self._expect_value = True
+                self._pos += 1
+                continue
+
+            if self._expect_value and not ch.isspace():
+                # The first token inside the candidate must be able to start
+                # a member ('"' or '}') or an element (any value or ']')
+                allowed = '"}' if self._root_char == "{" else '"{[]-0123456789tfn'
+                if ch not in allowed:
+                    self._restart()
+                    continue
+                self._expect_value = False
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "`":
+                # A fence inside the candidate: it was prose, the value follows
+                self._restart(self._pos)
+                continue
+            elif ch in "{[":
+                if self._depth == 1 and self._root_char == "[":
+                    self._item_start = self._pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._item_start is not None:
+                    try:
+                        items.append(json.loads(text[self._item_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+                elif self._depth == 1 and self._root_char == "{":
+                    self._update_partial(self._pos + 1)
+                elif self._depth == 0:
+                    try:
+                        json.loads(text[self._root_start:self._pos + 1])
+                    except json.JSONDecodeError:
+                        self._restart()
+                        continue
+                    self._root_end = self._pos + 1
+                    self.done = True
+            elif ch == "," and self._depth == 1 and self._root_char == "{":
+                self._update_partial(self._pos)
+            self._pos += 1
+
+        return items
+
+    def _restart(self, pos: Optional[int] = None):
+        """Drop the current candidate and scan again from `pos` (default: just after its start)"""
+        self._pos = self._root_start + 1 if pos is None else pos
+        self._root_start = None
+        self._root_char = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self._expect_value = False
+        self.partial = {}
+
+    @property
+    def root(self) -> str:
+        """Opening character of the value ('{' or '['), or '' if not seen yet"""
+        return self._root_char
+
+    def _update_partial(self, end: int):
+        try:
+            self.partial = json.loads(self.buffer[self._root_start:end] + "}")
+        except json.JSONDecodeError:
+            pass
+
+    def close(self) -> Any:
+        """Return the complete value; raises JSONDecodeError if there is none"""
+        if self._root_start is None:
+            return json.loads(self.buffer.strip())
+        end = self._root_end if self._root_end is not None else len(self.buffer)
+        return json.loads(self.buffer[self._root_start:end])
+
+
+def extract_json(text: str) -> Any:
+    """
+    Parse the JSON value in a complete LLM response: the first one inside
+    a ``` fence when there is one, otherwise the first one in the text.
+    """
+    fence = text.find("```")
+    if fence > 0:
+        try:
+            return extract_json(text[fence:])
+        except json.JSONDecodeError:
+            pass
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.close()
@@ -0,0 +1,196 @@
+"""
+LLM Cache Module
+Response cache for identical LLM prompts
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Stable key for an LLM request; max_tokens too, as it can cut a reply short"""
+    payload = json.dumps(
+        [provider, model, system_prompt or "", prompt, round(temperature, 4), max_tokens],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache(ABC):
+    """
+    Base class for LLM response caches.
+    Backends implement _get/_set; hit and miss counting lives here.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        if ttl <= 0:
+            return
+        await self._set(key, value, time.time() + ttl)
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def _set(self, key: str, value: str, expires_at: float):
+        pass
+
+    @abstractmethod
+    async def clear(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryLLMCache(LLMCache):
+    """In-process LRU cache with a size cap and per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: str, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["entries"] = len(self._entries)
+        return stats
+
+
+class SQLiteLLMCache(LLMCache):
+    """On-disk cache backed by SQLite, survives scheduler restarts"""
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = asyncio.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _get_sync(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return row[0]
+
+    def _set_sync(self, key: str, value: str, expires_at: float):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, expires_at, now),
+        )
+        # Evict expired rows, then least recently used rows over the cap
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+    async def _get(self, key: str) -> Optional[str]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, value: str, expires_at: float):
+        async with self._lock:
+            await asyncio.to_thread(self._set_sync, key, value, expires_at)
+
+    async def clear(self):
+        async with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache: Optional[LLMCache] = None
+
+
+def get_default_llm_cache() -> LLMCache:
+    """
+    Process-wide cache shared by all agents.
+    Uses SQLite when LLM_CACHE_PATH is set, otherwise an in-memory LRU.
+    """
+    global _default_cache
+    if _default_cache is None:
+        path = os.getenv("LLM_CACHE_PATH")
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+        if path:
+            _default_cache = SQLiteLLMCache(path, max_entries=max_entries)
+        else:
+            _default_cache = MemoryLLMCache(max_entries=max_entries)
+    return _default_cache
+
+
+def set_default_llm_cache(cache: Optional[LLMCache]):
+    """Replace the process-wide cache (None resets to the env default)"""
+    global _default_cache
+    _default_cache = cache
@@ -0,0 +1,112 @@
+"""
+Log Sink Module
+Bounded in-memory log buffer and a non-blocking structured log sink
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+# (timestamp, level, message, data)
+LogRecord = Tuple[float, str, str, Optional[Dict[str, Any]]]
+
+
+def format_entry(record: LogRecord) -> Dict[str, Any]:
+    """Expand a compact record into the API log entry shape"""
+    timestamp, level, message, data = record
+    return {
+        "level": level,
+        "message": message,
+        "data": data,
+        "timestamp": datetime.utcfromtimestamp(timestamp).isoformat(),
+    }
+
+
+class LogBuffer:
+    """Ring buffer of compact log records; the oldest records are dropped"""
+
+    def __init__(self, maxlen: int = 500):
+        self._records: Deque[LogRecord] = deque(maxlen=maxlen)
+        self.dropped = 0
+
+    def append(self, level: str, message: str, data: Optional[Dict[str, Any]] = None):
+        if len(self._records) == self._records.maxlen:
+            self.dropped += 1
+        self._records.append((time.time(), level, message, data))
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Remove and return all buffered entries"""
+        entries = [format_entry(r) for r in self._records]
+        self._records.clear()
+        return entries
+
+    def clear(self):
+        self._records.clear()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (format_entry(r) for r in list(self._records))
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("agent", "task_id", "run_id", "data"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_agent_logger() -> logging.Logger:
+    """
+    Logger whose records are queued and written by a background thread,
+    so logging never blocks the event loop on stdout.
+    Output is JSON lines unless AGENT_LOG_FORMAT=text.
+    """
+    global _listener
+    logger = logging.getLogger("agentops.agents")
+    if _listener is None:
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        stream = logging.StreamHandler(sys.stdout)
+        if os.getenv("AGENT_LOG_FORMAT", "json") == "text":
+            stream.setFormatter(logging.Formatter("[%(agent)s] [%(levelname)s] %(message)s"))
+        else:
+            stream.setFormatter(JSONFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, stream)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.setLevel(os.getenv("AGENT_LOG_LEVEL", "DEBUG").upper())
+        logger.propagate = False
+    return logger
@@ -0,0 +1,175 @@
+"""
+Metrics Module
+In-process counters, histograms and gauges in the Prometheus text format
+"""
+
+import bisect
+import re
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter; inc() is a dict update"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; observe() is a bisect and two adds"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time, so the hot path pays nothing"""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, help, labelnames)
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self.read():
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class CallbackCounter(Gauge):
+    """Counter kept elsewhere (e.g. a stats dict), read at scrape time"""
+    kind = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str):
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TASKS = REGISTRY.register(Counter(
+    "agent_tasks_total", "Agent runs finished, by outcome", ("agent_type", "kind", "outcome"),
+))
+TASK_DURATION = REGISTRY.register(Histogram(
+    "agent_task_duration_seconds", "Agent run duration", ("agent_type", "kind"),
+))
+TASK_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "agent_task_queue_wait_seconds", "Time from queueing to start", ("agent_type", "kind"),
+))
+PHASE_DURATION = REGISTRY.register(Histogram(
+    "agent_phase_duration_seconds", "Duration of journaled agent phases", ("agent_type", "phase"),
+))
+API_DURATION = REGISTRY.register(Histogram(
+    "agent_api_request_duration_seconds", "Latency of agent calls to the app API",
+    ("method", "endpoint", "status"),
+))
+LLM_DURATION = REGISTRY.register(Histogram(
+    "agent_llm_request_duration_seconds", "LLM request latency", ("provider", "model", "outcome"),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "agent_llm_tokens_total", "Tokens used by LLM requests", ("provider", "model"),
+))
+
+
+_ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{24,}|\d+)(?=/|$)")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """API path without query string and with ids replaced, to bound label cardinality"""
+    return _ID_SEGMENT.sub("/:id", endpoint.split("?", 1)[0])
@@ -0,0 +1,306 @@
+"""
+Rate Limit Module
+Adaptive token-bucket limiter and concurrency governor for LLM providers
+"""
+
+import asyncio
+import bisect
+import itertools
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import httpx
+
+
+class TokenBucket:
+    """Per-minute token bucket; may go negative when usage is reconciled"""
+
+    def __init__(self, per_minute: float):
+        self.ceiling = float(per_minute)
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        rate = self.capacity / 60.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / (self.capacity / 60.0)
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def set_capacity(self, capacity: float):
+        self.capacity = max(1.0, capacity)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def set_remaining(self, remaining: float, now: float):
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+
+class _Waiter:
+    def __init__(self, tokens: float, future: "asyncio.Future[None]", priority: float = 0.0):
+        self.tokens = tokens
+        self.future = future
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse '20ms', '1.5s' or '6m0s' style durations into seconds"""
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+
+def _parse_reset(value: str) -> Optional[float]:
+    """Parse a reset header: a duration, seconds, or an RFC 3339 timestamp"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+    except ValueError:
+        return _parse_duration(value)
+
+
+def retry_after_seconds(headers: httpx.Headers) -> Optional[float]:
+    """Read retry-after-ms / retry-after (seconds or HTTP date)"""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+# (limit, remaining, reset) header names per bucket, OpenAI then Anthropic
+_RATE_HEADERS = {
+    "requests": [
+        ("x-ratelimit-limit-requests", "x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+        ("anthropic-ratelimit-requests-limit", "anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    ],
+    "tokens": [
+        ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        ("anthropic-ratelimit-tokens-limit", "anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+    ],
+}
+
+
+class ProviderRateLimiter:
+    """
+    Limiter for one provider/model pair.
+    Counts requests/min and tokens/min, caps concurrent calls, adapts to
+    rate-limit headers and 429s, and grants slots round-robin across agent
+    types so one busy agent type cannot starve the others.
+
+    Callers with a positive priority (urgent incident work) skip the
+    round-robin: they are served first, ordered by enqueued_at - priority.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 150000,
+        max_concurrency: int = 16,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._order: Deque[str] = deque()
+        self._urgent: List[Tuple[float, int, _Waiter]] = []
+        self._urgent_seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, agent_type: str, tokens: float, priority: float = 0.0):
+        """Wait for a request slot with `tokens` estimated tokens"""
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(tokens, loop.create_future(), priority)
+        if priority > 0:
+            bisect.insort(self._urgent, (waiter.enqueued_at - priority, next(self._urgent_seq), waiter))
+        else:
+            if agent_type not in self._queues:
+                self._queues[agent_type] = deque()
+                self._order.append(agent_type)
+            self._queues[agent_type].append(waiter)
+        self._pump()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted but abandoned before use
+                self.in_flight -= 1
+            elif priority > 0:
+                self._urgent = [entry for entry in self._urgent if entry[2] is not waiter]
+            else:
+                try:
+                    self._queues[agent_type].remove(waiter)
+                except ValueError:
+                    pass
+            self._pump()
+            raise
+
+    def release(
+        self,
+        estimated_tokens: float,
+        used_tokens: Optional[float] = None,
+        response: Optional[httpx.Response] = None,
+    ):
+        """Return a slot, reconcile token usage and adapt to the response"""
+        now = time.monotonic()
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens.consume(used_tokens - estimated_tokens, now)
+        if response is not None:
+            self._adapt(response, now)
+        self._pump()
+
+    def _adapt(self, response: httpx.Response, now: float):
+        for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            for limit_header, remaining_header, reset_header in _RATE_HEADERS[name]:
+                limit = response.headers.get(limit_header)
+                remaining = response.headers.get(remaining_header)
+                if limit is None and remaining is None:
+                    continue
+                try:
+                    if limit is not None:
+                        bucket.ceiling = float(limit)
+                        bucket.set_capacity(min(bucket.ceiling, max(bucket.capacity, 1.0)))
+                    if remaining is not None:
+                        bucket.set_remaining(float(remaining), now)
+                        if float(remaining) <= 0 and response.headers.get(reset_header):
+                            reset = _parse_reset(response.headers[reset_header])
+                            if reset:
+                                self.blocked_until = max(self.blocked_until, now + reset)
+                except ValueError:
+                    pass
+                break
+
+        if response.status_code == 429:
+            self.throttled += 1
+            retry_after = retry_after_seconds(response.headers)
+            self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0))
+            # Multiplicative decrease on throttling
+            self.requests.set_capacity(self.requests.capacity * 0.75)
+            self.tokens.set_capacity(self.tokens.capacity * 0.75)
+        elif response.is_success:
+            # Additive recovery towards the known ceiling
+            for bucket in (self.requests, self.tokens):
+                if bucket.capacity < bucket.ceiling:
+                    bucket.set_capacity(min(bucket.ceiling, bucket.capacity + bucket.ceiling * 0.05))
+
+    def _next_type(self) -> Optional[str]:
+        for agent_type in self._order:
+            if self._queues[agent_type]:
+                return agent_type
+        return None
+
+    def _pump(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while True:
+            agent_type = None if self._urgent else self._next_type()
+            if (agent_type is None and not self._urgent) or self.in_flight >= self.max_concurrency:
+                return
+            waiter = self._urgent[0][2] if self._urgent else self._queues[agent_type][0]
+            now = time.monotonic()
+            delay = max(
+                self.blocked_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(waiter.tokens, now),
+            )
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+
+            self.requests.consume(1, now)
+            self.tokens.consume(waiter.tokens, now)
+            self.in_flight += 1
+            if agent_type is None:
+                self._urgent.pop(0)
+            else:
+                self._queues[agent_type].popleft()
+                # Move the served agent type to the back of the round-robin
+                self._order.remove(agent_type)
+                self._order.append(agent_type)
+            waiter.future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": {t: len(q) for t, q in self._queues.items() if q},
+            "urgent_queued": len(self._urgent),
+            "requests_per_minute": round(self.requests.capacity, 1),
+            "tokens_per_minute": round(self.tokens.capacity, 1),
+            "throttled": self.throttled,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+        }
+
+
+_limiters: Dict[Tuple[str, str], ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, model: str) -> ProviderRateLimiter:
+    """
+    Process-wide limiter for a provider/model, configured from LLM_* env vars.
+    With several scheduler processes each gets an equal share of the limits.
+    """
+    key = (provider, model)
+    if key not in _limiters:
+        shards = max(1, int(os.getenv("AGENT_SHARD_COUNT", "1")))
+        _limiters[key] = ProviderRateLimiter(
+            requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")) / shards,
+            tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "150000")) / shards,
+            max_concurrency=max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "16")) // shards),
+        )
+    return _limiters[key]
+
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Rough prompt size (about four characters per token)"""
+    return sum(len(t) for t in texts if t) // 4 + 1
+
+
+def llm_load() -> int:
+    """LLM calls in flight or waiting for a slot, across all providers"""
+    return sum(
+        limiter.in_flight + len(limiter._urgent) + sum(len(q) for q in limiter._queues.values())
+        for limiter in _limiters.values()
+    )
@@ -0,0 +1,37 @@
+"""
+Run Context Module
+Per-execution state so one agent instance can serve many concurrent runs
+"""
+
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from .batching import AsyncBatcher
+from .journal import TaskJournal
+from .log_sink import LogBuffer
+
+
+@dataclass
+class RunContext:
+    """State owned by a single agent execution"""
+    agent: Any
+    logs: LogBuffer
+    task_id: Optional[str] = None
+    context: Any = None
+    log_batcher: Optional[AsyncBatcher] = None
+    priority: float = 0.0
+    journal: Optional[TaskJournal] = None
+    checkpoints: Dict[str, Any] = field(default_factory=dict)
+    # Tells apart runs without a task id, and retries of the same task, in logs
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+# Each asyncio task sees its own value, so concurrent runs never share state
+_current_run: ContextVar[Optional[RunContext]] = ContextVar("agent_run", default=None)
+
+
+def current_run() -> Optional[RunContext]:
+    """The run active in the current task, if any"""
+    return _current_run.get()
@@ -0,0 +1,92 @@
+"""
+Status Updates Module
+Coalesced, batched agent task status updates
+"""
+
+from typing import Any, Dict, List
+import httpx
+
+from .batching import AsyncBatcher
+
+
+class StatusBatcher:
+    """
+    Collects task status transitions and sends them to the bulk status
+    endpoint. Transitions of the same task that are still waiting are
+    merged into one update (later fields win), so a task that goes
+    RUNNING -> COMPLETED between flushes costs a single row.
+
+    add() never blocks; batches go out every `max_delay` seconds or
+    `max_batch` tasks and are retried with backoff by AsyncBatcher.
+    """
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        api_base_url: str,
+        max_batch: int = 100,
+        max_delay: float = 0.5,
+    ):
+        self.http = http
+        self.api_base_url = api_base_url
+        self.coalesced = 0
+        self.rejected = 0
+        self._updates: Dict[str, Dict[str, Any]] = {}
+        self._batcher = AsyncBatcher(
+            self._send,
+            max_batch=max_batch,
+            max_delay=max_delay,
+            name="StatusBatcher",
+        )
+
+    def add(self, task_id: str, update: Dict[str, Any]):
+        """Queue an update, merging it into one already waiting for the task"""
+        update = {k: v for k, v in update.items() if v is not None}
+        current = self._updates.get(task_id)
+        if current is not None:
+            # Replace rather than mutate, so _send can tell it changed in flight
+            self._updates[task_id] = {**current, **update}
+            self.coalesced += 1
+            return
+        self._updates[task_id] = update
+        self._batcher.add(task_id)
+
+    async def _send(self, task_ids: List[str]):
+        sent = {task_id: self._updates[task_id] for task_id in task_ids if task_id in self._updates}
+        if not sent:
+            return
+        response = await self.http.post(
+            f"{self.api_base_url}/api/agent-tasks/status",
+            json={"updates": [{"id": task_id, **update} for task_id, update in sent.items()]},
+            timeout=10.0,
+        )
+        response.raise_for_status()
+
+        for result in response.json().get("results", []):
+            if not result.get("ok"):
+                self.rejected += 1
+                print(f"[StatusBatcher] Update for task {result.get('id')} rejected: {result.get('error')}")
+
+        for task_id, update in sent.items():
+            if self._updates.get(task_id) is update:
+                del self._updates[task_id]
+            else:
+                # A newer transition arrived while this batch was in flight
+                self._batcher.add(task_id)
+
+    async def flush(self):
+        """Send everything waiting now"""
+        await self._batcher.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._updates),
+            "flushed": self._batcher.flushed,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "failures": self._batcher.failures,
+            "dropped": self._batcher.dropped,
+        }
+
+    def __len__(self) -> int:
+        return len(self._updates)
@@ -0,0 +1,68 @@
+"""
+Task Feed Module
+Push-style delivery of new agent tasks to the scheduler
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+import httpx
+
+
+class TaskFeed(ABC):
+    """Source of newly created tasks; next_batch() blocks until some arrive"""
+
+    @abstractmethod
+    async def next_batch(self) -> List[Dict[str, Any]]:
+        pass
+
+
+class LongPollTaskFeed(TaskFeed):
+    """
+    Long-polls /api/agent-tasks/pending. The API holds the request open
+    until a task is created (or `wait` seconds pass), so new tasks reach
+    the scheduler as soon as they are written.
+    """
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        api_base_url: str,
+        wait: float = 25.0,
+        limit: int = 50,
+    ):
+        self.http = http
+        self.api_base_url = api_base_url
+        self.wait = wait
+        self.limit = limit
+        self.cursor: Optional[str] = None
+
+    async def next_batch(self) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"wait": self.wait, "limit": self.limit}
+        if self.cursor:
+            params["since"] = self.cursor
+        response = await self.http.get(
+            f"{self.api_base_url}/api/agent-tasks/pending",
+            params=params,
+            timeout=self.wait + 10.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+        self.cursor = data.get("cursor", self.cursor)
+        return data.get("tasks", [])
+
+
+class LocalTaskFeed(TaskFeed):
+    """In-process feed, a stand-in for the API channel in tests and local runs"""
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+    def publish(self, task: Dict[str, Any]):
+        self._queue.put_nowait(task)
+
+    async def next_batch(self) -> List[Dict[str, Any]]:
+        tasks = [await self._queue.get()]
+        while not self._queue.empty():
+            tasks.append(self._queue.get_nowait())
+        return tasks
@@ -0,0 +1,96 @@
+"""
+Timer Queue Module
+Heap of due jobs keyed by id, on the monotonic clock
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class TimerQueue:
+    """
+    Min-heap of (due, key) entries. schedule() on an existing key replaces
+    its entry in O(log n); the stale entry is marked dead and skipped when
+    it reaches the top (lazy deletion), and the heap is rebuilt once dead
+    entries outnumber live ones.
+
+    Times come from time.monotonic(), so wall-clock changes never shift jobs.
+    """
+
+    _REMOVED = object()
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._entries: Dict[Hashable, list] = {}
+        self._counter = itertools.count()
+        self._changed = asyncio.Event()
+
+    def schedule(self, key: Hashable, due: float, value: Any = None):
+        """Add a job, or move an existing one to a new due time"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[2] = self._REMOVED
+        entry = [due, next(self._counter), key, value]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+        self._compact()
+        self._changed.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[2] = self._REMOVED
+        self._compact()
+        return True
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest live job"""
+        while self._heap and self._heap[0][2] is self._REMOVED:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[float, Hashable, Any]]:
+        """Remove and return every job due at or before `now`, earliest first"""
+        now = time.monotonic() if now is None else now
+        due = []
+        while True:
+            next_due = self.next_due()
+            if next_due is None or next_due > now:
+                return due
+            when, _, key, value = heapq.heappop(self._heap)
+            del self._entries[key]
+            due.append((when, key, value))
+
+    async def wait(self, max_wait: Optional[float] = None):
+        """Sleep until the earliest job is due or the schedule changes"""
+        self._changed.clear()
+        next_due = self.next_due()
+        timeout = None if next_due is None else max(0.0, next_due - time.monotonic())
+        if max_wait is not None:
+            timeout = max_wait if timeout is None else min(timeout, max_wait)
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        return (entry[0], entry[3]) if entry is not None else None
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [e for e in self._heap if e[2] is not self._REMOVED]
+            heapq.heapify(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
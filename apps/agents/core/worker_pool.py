@@ -0,0 +1,527 @@
+"""
+Worker Pool Module
+Bounded concurrent execution of agent tasks
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Priority is measured in seconds of queue age: an item with priority P is
+# ordered as if it had been enqueued P seconds earlier. Every second spent
+# waiting therefore raises an item's rank by one second (linear aging), so
+# a routine run waiting an hour goes ahead of a fresh critical incident.
+SEVERITY_PRIORITY = {"critical": 3600.0, "high": 900.0, "medium": 120.0, "low": 0.0}
+TRIGGER_PRIORITY = {"incident": 600.0, "manual": 300.0, "webhook": 300.0, "scheduled": 0.0}
+
+
+def task_priority(severity: Optional[str] = None, trigger: Optional[str] = None) -> float:
+    """Priority for a task from its incident severity and trigger"""
+    return (
+        SEVERITY_PRIORITY.get((severity or "").lower(), 0.0)
+        + TRIGGER_PRIORITY.get((trigger or "").lower(), 0.0)
+    )
+
+
+@dataclass
+class WorkItem:
+    """A task waiting for or holding a worker slot"""
+    task_id: str
+    agent_type: str
+    payload: Dict[str, Any]
+    priority: float = 0.0
+    preemptible: bool = False
+    tenant_id: Optional[str] = None
+    weight: float = 1.0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+
+
+class TaskQueue:
+    """FIFO queue; pop() returns the oldest item a worker may start"""
+
+    def __init__(self):
+        self._items: Deque[WorkItem] = deque()
+
+    def push(self, item: WorkItem):
+        self._items.append(item)
+
+    def pop(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        item = self.peek(eligible)
+        if item is not None:
+            self._items.remove(item)
+        return item
+
+    def peek(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        for item in self._items:
+            if eligible(item):
+                return item
+        return None
+
+    def remove(self, task_id: str) -> Optional[WorkItem]:
+        for item in self._items:
+            if item.task_id == task_id:
+                self._items.remove(item)
+                return item
+        return None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def item_class(item: WorkItem) -> Tuple[str, bool]:
+    """
+    Items of one class are all startable or all not: worker eligibility
+    depends only on the agent type (type limits) and preemptibility (held
+    deferrable runs)
+    """
+    return item.agent_type, item.preemptible
+
+
+def _live_head(heap: List[list]) -> Optional[list]:
+    """Top entry of a heap, dropping entries removed lazily"""
+    while heap and heap[0][2] is None:
+        heapq.heappop(heap)
+    return heap[0] if heap else None
+
+
+class PriorityTaskQueue(TaskQueue):
+    """
+    Items ordered by enqueued_at - priority, in one heap per item class.
+    pop() and peek() compare the head of each eligible class, so classes
+    that are type-limited or held are skipped whole instead of item by
+    item. `eligible` must depend only on item_class(). Removal is lazy.
+    """
+
+    def __init__(self):
+        self._heaps: Dict[Tuple[str, bool], List[list]] = {}
+        self._entries: Dict[str, list] = {}
+        self._counter = itertools.count()
+
+    def push(self, item: WorkItem):
+        entry = [item.enqueued_at - item.priority, next(self._counter), item]
+        self._entries[item.task_id] = entry
+        heapq.heappush(self._heaps.setdefault(item_class(item), []), entry)
+
+    def _best(self, eligible: Callable[[WorkItem], bool]) -> Optional[list]:
+        best = None
+        for key in list(self._heaps):
+            head = _live_head(self._heaps[key])
+            if head is None:
+                del self._heaps[key]
+            elif (best is None or head < best) and eligible(head[2]):
+                best = head
+        return best
+
+    def pop(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        entry = self._best(eligible)
+        if entry is None:
+            return None
+        item = entry[2]
+        heapq.heappop(self._heaps[item_class(item)])
+        del self._entries[item.task_id]
+        return item
+
+    def peek(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        entry = self._best(eligible)
+        return entry[2] if entry is not None else None
+
+    def remove(self, task_id: str) -> Optional[WorkItem]:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return None
+        item, entry[2] = entry[2], None
+        return item
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _TenantStats:
+    def __init__(self):
+        self.served = 0
+        self.waits: Deque[float] = deque(maxlen=200)
+        # [10s bucket, items started] for the last minute
+        self.buckets: Deque[List[int]] = deque(maxlen=6)
+
+    def record(self, wait: float, now: float):
+        self.served += 1
+        self.waits.append(wait)
+        bucket = int(now // 10)
+        if self.buckets and self.buckets[-1][0] == bucket:
+            self.buckets[-1][1] += 1
+        else:
+            self.buckets.append([bucket, 1])
+
+    def per_minute(self, now: float) -> int:
+        oldest = int(now // 10) - 5
+        return sum(count for bucket, count in self.buckets if bucket >= oldest)
+
+
+class _FairClass:
+    """Deficit round robin over the tenants that have items of one class"""
+
+    def __init__(self):
+        self.tenants: Dict[Optional[str], List[list]] = {}
+        self.deficit: Dict[Optional[str], float] = {}
+        self.active: Deque[Optional[str]] = deque()
+        self.turn_started = False
+
+    def push(self, tenant: Optional[str], entry: list):
+        if tenant not in self.tenants:
+            self.tenants[tenant] = []
+            self.deficit[tenant] = 0.0
+            self.active.append(tenant)
+        heapq.heappush(self.tenants[tenant], entry)
+
+    def front(self) -> Optional[list]:
+        """Best entry of the tenant whose turn it is"""
+        while self.active:
+            head = _live_head(self.tenants[self.active[0]])
+            if head is not None:
+                return head
+            self._retire(self.active[0])
+        return None
+
+    def pop(self, weights: Dict[Optional[str], float]) -> Optional[list]:
+        while self.front() is not None:
+            tenant = self.active[0]
+            if not self.turn_started:
+                self.deficit[tenant] += weights[tenant]
+                self.turn_started = True
+            if self.deficit[tenant] >= 1:
+                self.deficit[tenant] -= 1
+                entry = heapq.heappop(self.tenants[tenant])
+                if _live_head(self.tenants[tenant]) is None:
+                    self._retire(tenant)
+                return entry
+            self.active.rotate(-1)
+            self.turn_started = False
+        return None
+
+    def _retire(self, tenant: Optional[str]):
+        """Drop an emptied tenant (at the front) from the rotation; DRR forfeits its credit"""
+        self.active.popleft()
+        del self.tenants[tenant]
+        del self.deficit[tenant]
+        self.turn_started = False
+
+
+class FairTaskQueue(TaskQueue):
+    """
+    Weighted fair queue across tenants (deficit round robin).
+    Each tenant has its own priority queue; on its turn a tenant earns
+    `weight` credits and starts one item per credit, so over time tenants
+    get worker slots in proportion to their weights however many items
+    they queue. Items at or above `urgent_priority` skip the rotation.
+
+    There is one rotation per item class (see item_class), so tenants
+    whose items are all type-limited or held are skipped with their class
+    instead of one by one. Between classes, the best item at the front of
+    each eligible rotation goes first.
+    """
+
+    def __init__(self, urgent_priority: Optional[float] = None):
+        self.urgent_priority = urgent_priority
+        self._urgent = PriorityTaskQueue()
+        self._classes: Dict[Tuple[str, bool], _FairClass] = {}
+        self._entries: Dict[str, list] = {}
+        self._counter = itertools.count()
+        self._weights: Dict[Optional[str], float] = {}
+        self._queued: Dict[Optional[str], int] = {}
+        self._stats: Dict[Optional[str], _TenantStats] = {}
+
+    def push(self, item: WorkItem):
+        if self.urgent_priority is not None and item.priority >= self.urgent_priority:
+            self._urgent.push(item)
+            return
+        tenant = item.tenant_id
+        self._weights[tenant] = max(item.weight, 0.01)
+        self._queued[tenant] = self._queued.get(tenant, 0) + 1
+        entry = [item.enqueued_at - item.priority, next(self._counter), item]
+        self._entries[item.task_id] = entry
+        self._classes.setdefault(item_class(item), _FairClass()).push(tenant, entry)
+
+    def pop(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        item = self._urgent.pop(eligible)
+        if item is None:
+            item = self._pop_fair(eligible)
+        if item is not None:
+            self._record(item)
+        return item
+
+    def _best_class(self, eligible: Callable[[WorkItem], bool]) -> Tuple[Optional[_FairClass], Optional[list]]:
+        best, best_head = None, None
+        for key in list(self._classes):
+            head = self._classes[key].front()
+            if head is None:
+                del self._classes[key]
+            elif (best_head is None or head < best_head) and eligible(head[2]):
+                best, best_head = self._classes[key], head
+        return best, best_head
+
+    def _pop_fair(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        fair_class, _ = self._best_class(eligible)
+        if fair_class is None:
+            return None
+        item = fair_class.pop(self._weights)[2]
+        del self._entries[item.task_id]
+        self._dequeued(item.tenant_id)
+        return item
+
+    def _dequeued(self, tenant: Optional[str]):
+        self._queued[tenant] -= 1
+        if not self._queued[tenant]:
+            del self._queued[tenant]
+            del self._weights[tenant]
+
+    def peek(self, eligible: Callable[[WorkItem], bool]) -> Optional[WorkItem]:
+        item = self._urgent.peek(eligible)
+        if item is not None:
+            return item
+        _, head = self._best_class(eligible)
+        return head[2] if head is not None else None
+
+    def remove(self, task_id: str) -> Optional[WorkItem]:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return self._urgent.remove(task_id)
+        item, entry[2] = entry[2], None
+        self._dequeued(item.tenant_id)
+        return item
+
+    def _record(self, item: WorkItem):
+        now = time.monotonic()
+        self._stats.setdefault(item.tenant_id, _TenantStats()).record(now - item.enqueued_at, now)
+
+    def tenant_stats(self, limit: int = 20) -> Dict[Optional[str], Dict[str, Any]]:
+        """Queue depth, start wait and throughput for the busiest tenants"""
+        now = time.monotonic()
+        report = {}
+        for tenant, stats in self._stats.items():
+            waits = sorted(stats.waits)
+            report[tenant] = {
+                "queued": self._queued.get(tenant, 0),
+                "served": stats.served,
+                "per_minute": stats.per_minute(now),
+                "wait_p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "wait_p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+            }
+        for tenant, queued in self._queued.items():
+            report.setdefault(tenant, {
+                "queued": queued, "served": 0, "per_minute": 0, "wait_p50": 0.0, "wait_p95": 0.0,
+            })
+        busiest = sorted(report.items(), key=lambda kv: (kv[1]["queued"], kv[1]["per_minute"]), reverse=True)
+        return dict(busiest[:limit])
+
+    def __len__(self) -> int:
+        return len(self._urgent) + len(self._entries)
+
+
+class WorkerPool:
+    """
+    Runs work items concurrently under an overall limit and per-agent-type
+    limits. A dispatcher moves items from the internal queue to workers as
+    slots free up. Each item runs under a timeout and can be cancelled.
+
+    When every worker is busy and the next eligible item's priority is at
+    least `preempt_priority`, the lowest-priority preemptible run below it
+    is cancelled to free a slot.
+
+    Items for which `hold(item)` returns True stay queued (deferred) until
+    it returns False; call wake() when the answer may have changed. Like
+    the type limits, `hold` may only look at item_class() (agent type and
+    preemptible), which lets the queues skip whole classes.
+
+    `on_finished(item, outcome, error)` is called after every item with
+    outcome "completed", "failed", "timeout", "cancelled" or "preempted".
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[WorkItem], Awaitable[None]],
+        max_workers: int = 16,
+        type_limits: Optional[Dict[str, int]] = None,
+        task_timeout: float = 600.0,
+        on_finished: Optional[Callable[[WorkItem, str, Optional[BaseException]], Awaitable[None]]] = None,
+        queue: Optional[TaskQueue] = None,
+        preempt_priority: Optional[float] = None,
+        hold: Optional[Callable[[WorkItem], bool]] = None,
+    ):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.type_limits = type_limits or {}
+        self.task_timeout = task_timeout
+        self.on_finished = on_finished
+        self.queue = queue if queue is not None else TaskQueue()
+        self.preempt_priority = preempt_priority
+        self.hold = hold
+        self.running: Dict[str, asyncio.Task] = {}
+        self.running_items: Dict[str, WorkItem] = {}
+        self.running_by_type: Dict[str, int] = {}
+        self.counts = {"completed": 0, "failed": 0, "timeout": 0, "cancelled": 0, "preempted": 0}
+        self._queued_ids: set = set()
+        self._preempting: set = set()
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._queued_ids or task_id in self.running
+
+    def task_ids(self) -> list:
+        """Ids of every queued and running item"""
+        return list(self._queued_ids) + list(self.running)
+
+    def queued_ids(self) -> list:
+        return list(self._queued_ids)
+
+    def wake(self):
+        """Have the dispatcher look at the queue again"""
+        self._wakeup.set()
+
+    def submit(self, item: WorkItem) -> bool:
+        """Queue an item; returns False if it is already queued or running"""
+        if item.task_id in self:
+            return False
+        self._queued_ids.add(item.task_id)
+        self.queue.push(item)
+        self._wakeup.set()
+        return True
+
+    def cancel(self, task_id: str) -> bool:
+        """Drop a queued item or cancel a running one"""
+        item = self.queue.remove(task_id)
+        if item is not None:
+            self._queued_ids.discard(task_id)
+            self.counts["cancelled"] += 1
+            return True
+        task = self.running.get(task_id)
+        if task is not None:
+            task.cancel()
+            return True
+        return False
+
+    def start(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def stop(self, cancel_running: bool = True):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if cancel_running:
+            for task in list(self.running.values()):
+                task.cancel()
+        if self.running:
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+
+    async def drain(self, timeout: float) -> List[WorkItem]:
+        """
+        Stop starting items and give running ones up to `timeout` seconds
+        to finish. Returns the queued items, which are removed unstarted.
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        dropped = []
+        for task_id in list(self._queued_ids):
+            item = self.queue.remove(task_id)
+            if item is not None:
+                dropped.append(item)
+        self._queued_ids.clear()
+        if self.running:
+            await asyncio.wait(list(self.running.values()), timeout=timeout)
+        return dropped
+
+    def _eligible(self, item: WorkItem) -> bool:
+        if self.hold is not None and self.hold(item):
+            return False
+        limit = self.type_limits.get(item.agent_type)
+        return limit is None or self.running_by_type.get(item.agent_type, 0) < limit
+
+    async def _dispatch(self):
+        while True:
+            while len(self.running) < self.max_workers:
+                item = self.queue.pop(self._eligible)
+                if item is None:
+                    break
+                self._launch(item)
+            if len(self.running) >= self.max_workers and len(self.queue):
+                self._preempt()
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    def _preempt(self):
+        """Cancel one low-priority preemptible run for a more urgent queued item"""
+        if self.preempt_priority is None or self._preempting:
+            return
+        urgent = self.queue.peek(self._eligible)
+        if urgent is None or urgent.priority < self.preempt_priority:
+            return
+        victims = [
+            item for item in self.running_items.values()
+            if item.preemptible and item.priority < urgent.priority
+        ]
+        if victims:
+            victim = min(victims, key=lambda item: item.priority)
+            self._preempting.add(victim.task_id)
+            self.running[victim.task_id].cancel()
+
+    def _launch(self, item: WorkItem):
+        self._queued_ids.discard(item.task_id)
+        item.started_at = time.monotonic()
+        self._waits.append(item.started_at - item.enqueued_at)
+        self.running_items[item.task_id] = item
+        self.running_by_type[item.agent_type] = self.running_by_type.get(item.agent_type, 0) + 1
+        self.running[item.task_id] = asyncio.ensure_future(self._work(item))
+
+    async def _work(self, item: WorkItem):
+        outcome, error = "completed", None
+        try:
+            await asyncio.wait_for(self.handler(item), timeout=self.task_timeout)
+        except asyncio.TimeoutError as e:
+            outcome, error = "timeout", e
+        except asyncio.CancelledError as e:
+            outcome, error = "cancelled", e
+            if item.task_id in self._preempting:
+                outcome = "preempted"
+        except Exception as e:
+            outcome, error = "failed", e
+        finally:
+            self.counts[outcome] += 1
+            self._preempting.discard(item.task_id)
+            self.running.pop(item.task_id, None)
+            self.running_items.pop(item.task_id, None)
+            self.running_by_type[item.agent_type] -= 1
+            self._wakeup.set()
+
+        if self.on_finished is not None:
+            await self.on_finished(item, outcome, error)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": len(self.queue),
+            "running": len(self.running),
+            "running_by_type": {t: n for t, n in self.running_by_type.items() if n},
+            "max_workers": self.max_workers,
+            "saturated": len(self.running) >= self.max_workers and len(self.queue) > 0,
+            "wait_p50": round(waits[len(waits) // 2], 3) if waits else 0.0,
+            "wait_p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+            "wait_max": round(waits[-1], 3) if waits else 0.0,
+            **self.counts,
+        }
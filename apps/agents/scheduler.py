@@ -4,11 +4,15 @@ Runs AI agents on a schedule and handles manual triggers
 """
 
 import asyncio
+import hashlib
+import math
 import os
+import signal
+import socket
 import sys
+import time
 from datetime import datetime, timedelta
-from typing import Optional
-import httpx
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -18,80 +22,545 @@ from agents.incident import IncidentAgent
 from agents.rca import RCAAgent
 from agents.remediation import RemediationAgent
 from core.base_agent import AgentContext, AgentType
+from core.http_client import create_http_client, set_http_client, close_http_client
+from core.worker_pool import FairTaskQueue, WorkerPool, WorkItem, task_priority
+from core.task_feed import TaskFeed, LongPollTaskFeed
+from core.timer_queue import TimerQueue
+from core.journal import TaskJournal
+from core.status_updates import StatusBatcher
+from core.admission import AdmissionController, get_llm_latency
+from core.rate_limit import llm_load
+from core.metrics import REGISTRY, TASKS, TASK_DURATION, TASK_QUEUE_WAIT, CallbackCounter, Gauge
+
+
+# Work item ids for scheduled runs, which have no AgentTask row
+SCHEDULED_PREFIX = "scheduled:"
+
+# (agent type, tenant id, website id or None)
+JobKey = Tuple[str, str, Optional[str]]
+
+
+def _job_name(key: JobKey) -> str:
+    return ":".join(part for part in key if part)
+
+
+# A tenant's jobs are phased against this period: a job with interval i
+# comes due at times equal to the tenant's phase mod i, so jobs of one tenant
+# come due together whenever their cadences coincide and share a run
+_PHASE_PERIOD = 86400.0
+
+
+def _jitter_offset(key: str, interval: float) -> float:
+    """Stable offset in [0, interval) from the tenant's phase within the period"""
+    digest = hashlib.sha1(key.encode()).digest()
+    phase = int.from_bytes(digest[:8], "big") / 2 ** 64 * _PHASE_PERIOD
+    return phase % interval
+
+
+def tenant_shard(tenant_id: str, shards: int) -> int:
+    """Process shard a tenant belongs to; the claim route computes the same in SQL"""
+    return int(hashlib.md5(tenant_id.encode()).hexdigest()[:15], 16) % shards
+
+
+def _task_kind(item: WorkItem) -> str:
+    return "scheduled" if item.task_id.startswith(SCHEDULED_PREFIX) else "task"
+
+
+def _parse_limits(value: str) -> dict:
+    """Parse 'rca=4,monitoring=8' into {'rca': 4, 'monitoring': 8}"""
+    limits = {}
+    for part in value.split(","):
+        if "=" in part:
+            name, limit = part.split("=", 1)
+            limits[name.strip().lower()] = int(limit)
+    return limits
 
 
 class AgentScheduler:
     """
     Scheduler that runs AI agents based on configured schedules.
-    Also handles manual triggers via API polling.
+    Manual triggers arrive through a push feed (API long-poll), with
+    periodic polling as a fallback.
     """
     
-    def __init__(self, api_base_url: str = "http://localhost:3000"):
+    def __init__(self, api_base_url: str = "http://localhost:3000", feed: Optional[TaskFeed] = None):
         self.api_base_url = api_base_url
+        
+        # One pooled client for the scheduler and every agent it runs
+        self.http = create_http_client(api_base_url=api_base_url)
+        set_http_client(self.http)
+        
+        # Status transitions are coalesced per task and sent in bulk
+        self.status_updates = StatusBatcher(
+            self.http,
+            api_base_url,
+            max_batch=int(os.getenv("AGENT_STATUS_BATCH_SIZE", "100")),
+            max_delay=float(os.getenv("AGENT_STATUS_FLUSH_MS", "500")) / 1000,
+        )
+        
+        shared = {"api_base_url": api_base_url, "http_client": self.http, "status_batcher": self.status_updates}
         self.agents = {
-            AgentType.MONITORING: MonitoringAgent(api_base_url=api_base_url),
-            AgentType.INCIDENT: IncidentAgent(api_base_url=api_base_url),
-            AgentType.RCA: RCAAgent(api_base_url=api_base_url),
-            AgentType.REMEDIATION: RemediationAgent(api_base_url=api_base_url),
+            AgentType.MONITORING: MonitoringAgent(**shared),
+            AgentType.INCIDENT: IncidentAgent(**shared),
+            AgentType.RCA: RCAAgent(**shared),
+            AgentType.REMEDIATION: RemediationAgent(**shared),
         }
         
-        # Schedule configuration (in seconds)
+        # Default schedule configuration (in seconds); tenants override these
+        # with <type>Interval and websites with checkInterval
         self.schedules = {
             AgentType.MONITORING: 60,       # Every minute
             AgentType.INCIDENT: 300,        # Every 5 minutes
         }
         
-        self.last_run = {}
         self.running = False
+        
+        # Scheduled jobs, one per tenant (per website for monitoring), in a
+        # timer heap on the monotonic clock. Each job first runs at a hashed
+        # offset within its interval; lag is how late a run started. Jobs of
+        # a tenant that come due together share one run (queued run by id).
+        self.timers = TimerQueue()
+        self._phase_origin = time.monotonic()
+        self._scheduled: Dict[str, WorkItem] = {}
+        # Jobs that came due while their tenant's run was running; they get
+        # a run of their own when it finishes. Jobs due within the batch
+        # window are started early with the jobs due now.
+        self._followups: Dict[str, Dict[str, tuple]] = {}
+        self.schedule_batch_window = float(os.getenv("AGENT_SCHEDULE_BATCH_WINDOW", "1"))
+        self.tenant_page_size = int(os.getenv("AGENT_TENANT_PAGE_SIZE", "500"))
+        self.schedule_sync_interval = float(os.getenv("AGENT_SCHEDULE_SYNC_INTERVAL", "300"))
+        self.schedule_lag: Dict[str, Dict[str, float]] = {t.value: {} for t in self.schedules}
+        self.schedule_stats: Dict[str, dict] = {t.value: {"skipped": 0, "preempted": 0} for t in self.schedules}
+        self._last_sync: Optional[float] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        
+        # Concurrent task execution, bounded overall and per agent type.
+        # Worker slots are shared fairly across tenants by plan weight; within
+        # a tenant tasks start in priority order (incident severity, trigger,
+        # age). Urgent incident work bypasses fairness and may preempt
+        # scheduled runs when workers are full.
+        self.plan_weights = _parse_limits(os.getenv(
+            "AGENT_PLAN_WEIGHTS", "starter=1,pro=4,enterprise=16"
+        ))
+        self.tenant_weights: Dict[str, float] = {}
+        urgent_priority = task_priority("high", "incident")
+        
+        # Admission control: when LLM calls get slow, fail or pile up,
+        # scheduled runs are deferred or shed. Newly due jobs are deferred
+        # outside the pool, (agent type, tenant) -> job key -> job, and
+        # queued when admission opens again; their timers keep their slots.
+        # Runs queued before the state changed are held in the queue. Manual
+        # and incident tasks are always admitted.
+        self.admission = AdmissionController.from_env(in_flight=llm_load)
+        self.admission_interval = float(os.getenv("AGENT_ADMISSION_INTERVAL", "1"))
+        self._admission_task: Optional[asyncio.Task] = None
+        self._deferred: Dict[Tuple[str, str], Dict[JobKey, tuple]] = {}
+        
+        self.pool = WorkerPool(
+            self._run_work_item,
+            max_workers=int(os.getenv("AGENT_MAX_WORKERS", "16")),
+            type_limits=_parse_limits(os.getenv(
+                "AGENT_TYPE_LIMITS", "monitoring=8,incident=4,rca=4,remediation=4"
+            )),
+            task_timeout=float(os.getenv("AGENT_TASK_TIMEOUT", "600")),
+            on_finished=self._on_work_finished,
+            queue=FairTaskQueue(urgent_priority=urgent_priority),
+            preempt_priority=urgent_priority,
+            hold=lambda item: item.preemptible and self.admission.state != "open",
+        )
+        
+        # Push delivery of new tasks; polling runs every poll_interval only
+        # while the feed is unhealthy, otherwise every safety_poll_interval
+        self.feed = feed or LongPollTaskFeed(self.http, api_base_url)
+        self.feed_healthy = False
+        self.poll_interval = float(os.getenv("AGENT_POLL_INTERVAL", "10"))
+        self.safety_poll_interval = float(os.getenv("AGENT_SAFETY_POLL_INTERVAL", "60"))
+        self._last_poll = 0.0
+        self._feed_task: Optional[asyncio.Task] = None
+        
+        # In multi-process mode (AGENT_PROCESSES > 1) each process owns the
+        # tenants hashing to its shard, for both claimed and scheduled work
+        self.shard_index = int(os.getenv("AGENT_SHARD_INDEX", "0"))
+        self.shard_count = max(1, int(os.getenv("AGENT_SHARD_COUNT", "1")))
+        shard_suffix = f".{self.shard_index}" if self.shard_count > 1 else ""
+        
+        # Local journal of claims, phase results and completions; a restarted
+        # scheduler resumes unfinished tasks from their last finished phase
+        journal_path = os.getenv("AGENT_JOURNAL_PATH")
+        self.journal = TaskJournal(journal_path + shard_suffix) if journal_path else None
+        
+        # Tasks are claimed atomically under a lease that is renewed by
+        # heartbeat, so several scheduler replicas can run side by side.
+        # With a journal the worker id is kept across restarts.
+        worker_id = os.getenv("AGENT_WORKER_ID")
+        self.worker_id = (
+            (worker_id + shard_suffix if worker_id else None)
+            or (self.journal.worker_id() if self.journal else None)
+            or f"{socket.gethostname()}:{os.getpid()}"
+        )
+        self.lease_seconds = float(os.getenv("AGENT_LEASE_SECONDS", "60"))
+        self._claim_lock = asyncio.Lock()
+        self._claim_backlog = False
+        self._lost_leases: set = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        
+        # Graceful shutdown (SIGTERM/SIGINT): stop claiming, let running tasks
+        # finish for up to drain_timeout, then hand unfinished tasks back with
+        # the phases they completed so the next claimant resumes them
+        self.drain_timeout = float(os.getenv("AGENT_DRAIN_TIMEOUT", "25"))
+        self.draining = False
+        self._stopped = asyncio.Event()
+        self._releasing: set = set()
+        self._checkpoints: Dict[str, dict] = {}
+        self._drained = False
+        
+        # Prometheus text metrics on GET /metrics; gauges are read at scrape
+        # time, counters and histograms are plain dict updates
+        metrics_port = int(os.getenv("AGENT_METRICS_PORT", "9464"))
+        self.metrics_port = metrics_port + self.shard_index if metrics_port else 0
+        self._metrics_server: Optional[asyncio.AbstractServer] = None
+        self._register_gauges()
     
     async def start(self):
         """Start the scheduler loop"""
         self.running = True
         print(f"[Scheduler] Starting agent scheduler at {datetime.utcnow()}")
+        self.pool.start()
+        await self.start_metrics_server()
+        await self.recover_tasks()
+        self._feed_task = asyncio.ensure_future(self._consume_feed())
+        self._heartbeat_task = asyncio.ensure_future(self._heartbeat_loop())
+        self._timer_task = asyncio.ensure_future(self._run_timers())
+        self._admission_task = asyncio.ensure_future(self._run_admission())
         
         while self.running:
             try:
-                # Check for pending manual tasks
-                await self.process_pending_tasks()
+                # Poll for pending tasks the feed may have missed
+                loop_time = asyncio.get_running_loop().time()
+                interval = self.safety_poll_interval if self.feed_healthy else self.poll_interval
+                if loop_time - self._last_poll >= interval:
+                    self._last_poll = loop_time
+                    await self.process_pending_tasks()
                 
-                # Run scheduled agents
+                # Refresh scheduled jobs; the timer task runs them
                 await self.run_scheduled_agents()
                 
                 # Wait before next iteration
-                await asyncio.sleep(10)
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), 10)
+                except asyncio.TimeoutError:
+                    pass
                 
             except Exception as e:
                 print(f"[Scheduler] Error: {e}")
                 await asyncio.sleep(30)
     
     def stop(self):
-        """Stop the scheduler"""
+        """Stop the scheduler; close() then drains running tasks"""
+        if not self.running:
+            return
         self.running = False
+        self._stopped.set()
         print("[Scheduler] Stopping...")
     
+    def install_signal_handlers(self):
+        """Stop on SIGTERM (rollouts) and SIGINT"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Not supported on this platform; KeyboardInterrupt still stops
+                pass
+    
+    async def drain(self, timeout: Optional[float] = None):
+        """
+        Stop claiming, wait up to `timeout` for running tasks, then cancel
+        the rest and release their leases along with their finished phases.
+        """
+        if self._drained:
+            return
+        self._drained = True
+        self.draining = True
+        self.running = False
+        timeout = self.drain_timeout if timeout is None else timeout
+        for task in (self._feed_task, self._timer_task, self._admission_task):
+            if task is not None:
+                task.cancel()
+        
+        # Let a claim in progress finish, so its tasks are released below
+        async with self._claim_lock:
+            pass
+        
+        started = time.monotonic()
+        print(f"[Scheduler] Draining {len(self.pool.running)} running tasks (up to {timeout}s)")
+        release = [item for item in await self.pool.drain(timeout) if not item.task_id.startswith(SCHEDULED_PREFIX)]
+        unfinished = list(self.pool.running_items.values())
+        for item in unfinished:
+            if not item.task_id.startswith(SCHEDULED_PREFIX):
+                self._releasing.add(item.task_id)
+                release.append(item)
+            self.pool.cancel(item.task_id)
+        await self.pool.stop()
+        for agent in self.agents.values():
+            await agent.flush()
+        
+        # Status of finished tasks goes out before their leases could lapse
+        await self.status_updates.flush()
+        if await self.release_tasks(release):
+            for item in release:
+                await self._journal_complete(item.task_id, "RELEASED")
+        print(
+            f"[Scheduler] Drained in {time.monotonic() - started:.1f}s: "
+            f"{len(unfinished)} tasks interrupted, {len(release)} released"
+        )
+        self.draining = False
+    
+    async def release_tasks(self, items: list) -> bool:
+        """Hand tasks back to PENDING with the phases they already finished"""
+        if not items:
+            return True
+        tasks = []
+        for item in items:
+            checkpoints = self._checkpoints.pop(item.task_id, None) or item.payload.get("checkpoints") or {}
+            tasks.append({"id": item.task_id, "checkpoints": checkpoints})
+        try:
+            response = await self.http.post(
+                f"{self.api_base_url}/api/agent-tasks/release",
+                json={"workerId": self.worker_id, "tasks": tasks},
+                timeout=10.0,
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            # Leases expire on their own; a restart with the same journal
+            # resumes the tasks, otherwise another replica reclaims them
+            print(f"[Scheduler] Error releasing tasks: {e}")
+            return False
+    
+    async def close(self):
+        """Drain workers and release pooled HTTP connections"""
+        await self.drain()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+        await self.status_updates.flush()
+        await close_http_client()
+        if self.journal is not None:
+            self.journal.close()
+    
+    async def _consume_feed(self):
+        """Submit tasks as the push feed delivers them"""
+        backoff = 1.0
+        while self.running:
+            try:
+                tasks = await self.feed.next_batch()
+                if not self.feed_healthy:
+                    print("[Scheduler] Push task feed connected")
+                self.feed_healthy = True
+                backoff = 1.0
+                if tasks:
+                    # The feed only signals new work; claiming decides who runs it
+                    await self.claim_tasks()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.feed_healthy:
+                    print(f"[Scheduler] Push task feed failed, falling back to polling: {e}")
+                self.feed_healthy = False
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+    
     async def process_pending_tasks(self):
         """Check for and process pending manual tasks"""
+        await self.claim_tasks()
+        
+        stats = self.pool.stats()
+        if stats["saturated"]:
+            busiest = ", ".join(
+                f"{tenant}: {t['queued']} queued, p95 wait {t['wait_p95']}s"
+                for tenant, t in self.pool.queue.tenant_stats(limit=3).items()
+            )
+            print(
+                f"[Scheduler] Worker pool saturated: {stats['queue_depth']} queued, "
+                f"p95 wait {stats['wait_p95']}s ({busiest})"
+            )
+    
+    async def claim_tasks(self) -> int:
+        """Claim as many pending tasks as the worker pool has room for"""
+        async with self._claim_lock:
+            if self.draining or self._drained:
+                return 0
+            limit = self.pool.max_workers * 2 - self.claimed_count()
+            if limit <= 0:
+                self._claim_backlog = True
+                return 0
+            
+            tasks = await self._claim(limit)
+            if tasks is None:
+                return 0
+            
+            # A full batch suggests more work is waiting
+            self._claim_backlog = len(tasks) >= limit
+            for task in tasks:
+                if self.journal is not None:
+                    await self.journal.record_claim(task)
+                self.submit_task(task)
+            return len(tasks)
+    
+    def claimed_count(self) -> int:
+        """Claimed tasks queued or running; scheduled runs don't use the claim budget"""
+        return sum(1 for task_id in self.pool.task_ids() if not task_id.startswith(SCHEDULED_PREFIX))
+    
+    async def _claim(self, limit: int, resume: Optional[list] = None) -> Optional[list]:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.api_base_url}/api/agent-tasks",
-                    params={"status": "PENDING"},
+            response = await self.http.post(
+                f"{self.api_base_url}/api/agent-tasks/claim",
+                json={
+                    "workerId": self.worker_id,
+                    "limit": limit,
+                    "leaseSeconds": self.lease_seconds,
+                    "resume": resume or [],
+                    "shard": self.shard_index,
+                    "shards": self.shard_count,
+                },
+                timeout=10.0,
+            )
+            response.raise_for_status()
+            return response.json().get("tasks", [])
+        except Exception as e:
+            print(f"[Scheduler] Error claiming tasks: {e}")
+            return None
+    
+    async def recover_tasks(self):
+        """Reclaim tasks this worker journaled but never finished"""
+        if self.journal is None:
+            return
+        await self.journal.prune()
+        unfinished = [task["id"] for task in await self.journal.unfinished()]
+        if not unfinished:
+            return
+        
+        # Only tasks still leased to us come back; the limit of 0 claims nothing new
+        tasks = await self._claim(0, resume=unfinished)
+        if tasks is None:
+            return
+        resumed = {task["id"] for task in tasks}
+        for task in tasks:
+            self.submit_task(task)
+        for task_id in unfinished:
+            if task_id not in resumed:
+                # Finished or taken over by another replica meanwhile
+                await self.journal.record_complete(task_id, "ABANDONED")
+        print(f"[Scheduler] Resuming {len(resumed)} of {len(unfinished)} unfinished journaled tasks")
+    
+    async def _heartbeat_loop(self):
+        """Renew leases on queued and running tasks; drop the ones we lost"""
+        while self.running or self.draining:
+            await asyncio.sleep(self.lease_seconds / 3)
+            task_ids = [t for t in self.pool.task_ids() if not t.startswith(SCHEDULED_PREFIX)]
+            if not task_ids:
+                continue
+            try:
+                response = await self.http.post(
+                    f"{self.api_base_url}/api/agent-tasks/heartbeat",
+                    json={
+                        "workerId": self.worker_id,
+                        "taskIds": task_ids,
+                        "leaseSeconds": self.lease_seconds,
+                    },
                     timeout=10.0,
                 )
-                
-                if response.status_code != 200:
-                    return
-                
-                data = response.json()
-                tasks = data.get("tasks", [])
-                
-                for task in tasks:
-                    await self.execute_task(task)
-                    
-        except Exception as e:
-            print(f"[Scheduler] Error fetching pending tasks: {e}")
+                response.raise_for_status()
+                for task_id in response.json().get("lost", []):
+                    print(f"[Scheduler] Lost lease on task {task_id}, stopping it")
+                    self._lost_leases.add(task_id)
+                    self.pool.cancel(task_id)
+            except Exception as e:
+                print(f"[Scheduler] Lease heartbeat failed: {e}")
     
-    async def execute_task(self, task: dict):
+    def tenant_weight(self, tenant_id: Optional[str], plan: Optional[str] = None) -> float:
+        """Fair-share weight for a tenant, from its plan when known"""
+        if plan:
+            self.tenant_weights[tenant_id] = self.plan_weights.get(plan.lower(), 1)
+        return self.tenant_weights.get(tenant_id, 1)
+    
+    def submit_task(self, task: dict) -> bool:
+        """Queue a task for the worker pool; ignores tasks already queued or running"""
+        severity = task.get("incidentSeverity") or (task.get("input") or {}).get("severity")
+        tenant_id = task.get("tenantId")
+        return self.pool.submit(WorkItem(
+            task_id=task["id"],
+            agent_type=str(task.get("agentType", "")).lower(),
+            payload=task,
+            priority=task_priority(severity, task.get("trigger")),
+            tenant_id=tenant_id,
+            weight=self.tenant_weight(tenant_id, task.get("tenantPlan")),
+        ))
+    
+    async def _run_work_item(self, item: WorkItem):
+        TASK_QUEUE_WAIT.observe(item.started_at - item.enqueued_at, item.agent_type, _task_kind(item))
+        if item.task_id.startswith(SCHEDULED_PREFIX):
+            await self.run_scheduled(item)
+        else:
+            await self.execute_task(item.payload, priority=item.priority)
+    
+    async def _on_work_finished(self, item: WorkItem, outcome: str, error: Optional[BaseException]):
+        """Record tasks the pool stopped before execute_task could"""
+        kind = _task_kind(item)
+        TASKS.inc(item.agent_type, kind, outcome)
+        if item.started_at is not None:
+            TASK_DURATION.observe(time.monotonic() - item.started_at, item.agent_type, kind)
+        
+        if item.task_id not in self._releasing:
+            self._checkpoints.pop(item.task_id, None)
+        if self._claim_backlog and self.running:
+            asyncio.ensure_future(self.claim_tasks())
+        
+        if item.task_id.startswith(SCHEDULED_PREFIX):
+            if self._scheduled.get(item.task_id) is item:
+                del self._scheduled[item.task_id]
+            followups = self._followups.pop(item.task_id, None)
+            if followups and self.running:
+                self.submit_scheduled(item.agent_type, item.tenant_id, list(followups.values()))
+            if outcome == "preempted":
+                # Dropped for urgent work; the job runs again next interval
+                self.schedule_stats[item.agent_type]["preempted"] += 1
+            elif outcome in ("timeout", "failed"):
+                print(f"[Scheduler] Scheduled run {item.task_id} {outcome}: {error}")
+        elif item.task_id in self._releasing:
+            # Handed back by drain(), which records it
+            self._releasing.discard(item.task_id)
+        elif item.task_id in self._lost_leases:
+            # Another replica owns the task now
+            self._lost_leases.discard(item.task_id)
+            await self._journal_complete(item.task_id, "LOST")
+        elif outcome == "timeout":
+            print(f"[Scheduler] Task {item.task_id} timed out after {self.pool.task_timeout}s")
+            await self.update_task_status(item.task_id, "FAILED", error_message="Task timed out")
+            await self._journal_complete(item.task_id, "FAILED")
+        elif outcome == "cancelled":
+            print(f"[Scheduler] Task {item.task_id} cancelled")
+            await self.update_task_status(item.task_id, "CANCELLED")
+            await self._journal_complete(item.task_id, "CANCELLED")
+    
+    async def _journal_complete(self, task_id: str, status: str):
+        if self.journal is not None:
+            await self.journal.record_complete(task_id, status)
+    
+    async def cancel_task(self, task_id: str) -> bool:
+        """Cancel a queued or running task"""
+        if task_id in self.pool.running:
+            # _on_work_finished records the cancellation
+            return self.pool.cancel(task_id)
+        if self.pool.cancel(task_id):
+            await self.update_task_status(task_id, "CANCELLED")
+            await self._journal_complete(task_id, "CANCELLED")
+            return True
+        return False
+    
+    async def execute_task(self, task: dict, priority: float = 0.0):
         """Execute a single agent task"""
         task_id = task["id"]
         agent_type_str = task["agentType"]
@@ -103,18 +572,20 @@ class AgentScheduler:
             agent_type = AgentType(agent_type_str.lower())
         except ValueError:
             print(f"[Scheduler] Unknown agent type: {agent_type_str}")
+            await self.update_task_status(task_id, "FAILED", error_message=f"Unknown agent type: {agent_type_str}")
+            await self._journal_complete(task_id, "FAILED")
             return
         
         agent = self.agents.get(agent_type)
         if not agent:
             print(f"[Scheduler] Agent not found: {agent_type}")
+            await self.update_task_status(task_id, "FAILED", error_message=f"No agent for {agent_type.value}")
+            await self._journal_complete(task_id, "FAILED")
             return
         
+        # The claim already marked the task RUNNING under our lease
         print(f"[Scheduler] Executing task {task_id} ({agent_type.value})")
         
-        # Update task status to RUNNING
-        await self.update_task_status(task_id, "RUNNING")
-        
         try:
             context = AgentContext(
                 tenant_id=tenant_id,
@@ -124,36 +595,366 @@ class AgentScheduler:
                 input_data=task.get("input", {}),
             )
             
-            result = await agent.execute(context)
+            # Shared with the run so drain() can hand finished phases over
+            checkpoints = self._checkpoints[task_id] = dict(task.get("checkpoints") or {})
+            result = await agent.run(
+                context,
+                task_id=task_id,
+                priority=priority,
+                journal=self.journal,
+                checkpoints=checkpoints,
+            )
             
             # Update task with result
+            status = "COMPLETED" if result.success else "FAILED"
             await self.update_task_status(
                 task_id,
-                "COMPLETED" if result.success else "FAILED",
+                status,
                 output=result.output,
                 error_message=result.error,
             )
+            await self._journal_complete(task_id, status)
             
             print(f"[Scheduler] Task {task_id} completed: {result.success}")
             
         except Exception as e:
             await self.update_task_status(task_id, "FAILED", error_message=str(e))
+            await self._journal_complete(task_id, "FAILED")
             print(f"[Scheduler] Task {task_id} failed: {e}")
     
     async def run_scheduled_agents(self):
-        """Run agents based on their schedules"""
-        now = datetime.utcnow()
+        """Re-sync scheduled jobs with the API once per sync interval"""
+        now = time.monotonic()
+        if self._last_sync is None or now - self._last_sync >= self.schedule_sync_interval:
+            self._last_sync = now
+            await self.sync_schedules()
+    
+    def owns_tenant(self, tenant_id: str) -> bool:
+        return self.shard_count == 1 or tenant_shard(tenant_id, self.shard_count) == self.shard_index
+    
+    async def iter_tenants(self) -> AsyncIterator[dict]:
+        """Page through active tenants in this process's shard"""
+        cursor = None
+        while True:
+            params = {"limit": self.tenant_page_size}
+            if cursor:
+                params["cursor"] = cursor
+            response = await self.http.get(
+                f"{self.api_base_url}/api/tenants",
+                params=params,
+                timeout=30.0,
+            )
+            response.raise_for_status()
+            data = response.json()
+            for tenant in data.get("tenants", []):
+                if self.owns_tenant(tenant["id"]):
+                    yield tenant
+            cursor = data.get("nextCursor")
+            if not cursor:
+                return
+    
+    def _tenant_jobs(self, tenant: dict) -> Dict[JobKey, Tuple[float, dict]]:
+        """Jobs for one tenant: {key: (interval, payload)}"""
+        jobs = {}
+        for agent_type, default in self.schedules.items():
+            interval = tenant.get(f"{agent_type.value}Interval") or default
+            if agent_type == AgentType.MONITORING:
+                for website in tenant.get("websites", []):
+                    key = (agent_type.value, tenant["id"], website["id"])
+                    jobs[key] = (website.get("checkInterval") or interval, {"website": website})
+            else:
+                jobs[(agent_type.value, tenant["id"], None)] = (interval, {})
+        return jobs
+    
+    async def sync_schedules(self):
+        """Add, reschedule or drop jobs to match active tenants and websites"""
+        try:
+            jobs: Dict[JobKey, Tuple[float, dict]] = {}
+            async for tenant in self.iter_tenants():
+                self.tenant_weight(tenant["id"], tenant.get("plan"))
+                jobs.update(self._tenant_jobs(tenant))
+        except Exception as e:
+            print(f"[Scheduler] Failed to sync schedules: {e}")
+            return
         
-        for agent_type, interval in self.schedules.items():
-            last = self.last_run.get(agent_type)
-            
-            if last is None or (now - last).total_seconds() >= interval:
-                self.last_run[agent_type] = now
-                
-                # Get all tenants and run agent for each
-                # For now, we'll skip scheduled runs if no tenants are configured
-                # In production, you'd fetch tenant list from database
+        now = time.monotonic()
+        for key in self.timers.keys():
+            if key not in jobs:
+                self.timers.cancel(key)
+                self.schedule_lag[key[0]].pop(_job_name(key[1:]), None)
+        
+        for key, (interval, input_data) in jobs.items():
+            current = self.timers.get(key)
+            if current is not None and current[1][0] == interval:
+                # Unchanged interval: keep the job's phase, refresh its data
+                self.timers.schedule(key, current[0], (interval, input_data))
+            else:
+                # Next slot on the tenant's phase, counted from a fixed origin
+                # so jobs added by later syncs line up with existing ones
+                due = self._phase_origin + _jitter_offset(_job_name(key[:2]), interval)
+                due += interval * max(0, math.ceil((now - due) / interval))
+                self.timers.schedule(key, due, (interval, input_data))
+        
+        for agent_type in self.schedules:
+            stats = self.schedule_stats[agent_type.value]
+            stats.update(self.schedule_lag_stats(agent_type))
+            stats["jobs"] = sum(1 for key in jobs if key[0] == agent_type.value)
+            if stats["skipped"] or stats["preempted"] or stats["lag_p95"] > self.schedules[agent_type] / 2:
+                print(
+                    f"[Scheduler] {agent_type.value} schedule falling behind: "
+                    f"{stats['jobs']} jobs, {stats['skipped']} skipped while still running, "
+                    f"{stats['preempted']} preempted, "
+                    f"p95 lag {stats['lag_p95']}s, max lag {stats['lag_max']}s"
+                )
+            stats["skipped"] = stats["preempted"] = 0
+    
+    async def _run_timers(self):
+        """Submit scheduled jobs as they come due"""
+        while self.running:
+            await self.timers.wait()
+            self.submit_due(time.monotonic())
+    
+    def submit_due(self, now: float) -> int:
+        """
+        Reschedule every job due by `now` (plus the batch window) and queue
+        runs for them, one per agent type and tenant, so a tenant's due
+        websites are checked in one monitoring sweep. Returns the number of
+        runs that took new jobs.
+        """
+        groups: Dict[Tuple[str, str], list] = {}
+        for due, key, (interval, input_data) in self.timers.pop_due(now + self.schedule_batch_window):
+            # Anchor the next run to this due time so the cadence does not
+            # drift; slots missed while stalled are skipped, not replayed
+            next_due = due + interval * max(1, math.ceil((now - due) / interval))
+            self.timers.schedule(key, next_due, (interval, input_data))
+            groups.setdefault(key[:2], []).append((key, due, input_data))
+        
+        queued = 0
+        for (agent_type, tenant_id), jobs in groups.items():
+            decision = self.admission.decide()
+            if decision == "shed":
+                continue
+            if decision == "defer":
+                # Not queued, where it would only sit held in the pool; the
+                # timers already point at the next regular slot
+                self._deferred.setdefault((agent_type, tenant_id), {}).update((job[0], job) for job in jobs)
+                continue
+            queued += self._submit_group(agent_type, tenant_id, jobs)
+        return queued
+    
+    def _submit_group(self, agent_type: str, tenant_id: str, jobs: list) -> bool:
+        """Queue a group of due jobs, with any deferred earlier; True if a run took new ones"""
+        deferred = self._deferred.pop((agent_type, tenant_id), None)
+        if deferred:
+            deferred.update((job[0], job) for job in jobs)
+            jobs = list(deferred.values())
+        skipped = self.submit_scheduled(agent_type, tenant_id, jobs)
+        # Jobs whose previous run is still queued or running
+        self.schedule_stats[agent_type]["skipped"] += skipped
+        return skipped < len(jobs)
+    
+    def submit_deferred(self) -> int:
+        """Queue the jobs deferred while admission was closed; returns runs queued"""
+        queued = 0
+        for agent_type, tenant_id in list(self._deferred):
+            queued += self._submit_group(agent_type, tenant_id, [])
+        return queued
+    
+    async def _run_admission(self):
+        """Re-evaluate admission from LLM health and apply state changes"""
+        while self.running:
+            await asyncio.sleep(self.admission_interval)
+            if not self.admission.update():
+                continue
+            stats = self.admission.stats()
+            print(f"[Scheduler] Admission {stats['state']}: {stats['reason'] or 'load back to normal'} {stats['signals']}")
+            if self.admission.state == "shed":
+                # Drop scheduled runs still waiting; they come back next interval
+                for task_id in self.pool.queued_ids():
+                    if task_id.startswith(SCHEDULED_PREFIX) and self.pool.cancel(task_id):
+                        self.admission.decisions["shed"] += 1
+                self.admission.decisions["shed"] += len(self._deferred)
+                self._deferred.clear()
+            elif self.admission.state == "open":
+                self.submit_deferred()
+            # Held runs may start again
+            self.pool.wake()
+    
+    def stats(self) -> dict:
+        """Current scheduler state for metrics and diagnostics"""
+        return {
+            "pool": self.pool.stats(),
+            "admission": self.admission.stats(),
+            "llm": get_llm_latency().snapshot(),
+            "status_updates": self.status_updates.stats(),
+            "schedules": self.schedule_stats,
+        }
+    
+    def _register_gauges(self):
+        """Scheduler state exported as metrics, read from existing stats at scrape time"""
+        REGISTRY.register(Gauge(
+            "agent_queue_depth", "Work items waiting for a worker",
+            lambda: [((), len(self.pool.queue))],
+        ))
+        REGISTRY.register(Gauge(
+            "agent_running_tasks", "Work items running, by agent type",
+            lambda: [((t,), n) for t, n in sorted(self.pool.running_by_type.items())],
+            ("agent_type",),
+        ))
+        REGISTRY.register(Gauge(
+            "agent_max_workers", "Worker pool size",
+            lambda: [((), self.pool.max_workers)],
+        ))
+        REGISTRY.register(Gauge(
+            "agent_admission_state", "1 for the current admission state",
+            lambda: [((state,), int(state == self.admission.state)) for state in ("open", "defer", "shed")],
+            ("state",),
+        ))
+        REGISTRY.register(CallbackCounter(
+            "agent_admission_decisions_total", "Admission decisions for scheduled runs",
+            lambda: [((d,), n) for d, n in self.admission.decisions.items()],
+            ("decision",),
+        ))
+        REGISTRY.register(Gauge(
+            "agent_llm_in_flight", "LLM calls running or waiting for the rate limiter",
+            lambda: [((), llm_load())],
+        ))
+        REGISTRY.register(CallbackCounter(
+            "agent_llm_cache_lookups_total", "LLM response cache lookups",
+            self._cache_lookups,
+            ("result",),
+        ))
+        REGISTRY.register(Gauge(
+            "agent_status_updates_pending", "Task status updates waiting to be sent",
+            lambda: [((), len(self.status_updates))],
+        ))
+        REGISTRY.register(CallbackCounter(
+            "agent_status_updates_total", "Task status updates by result",
+            lambda: [((k,), v) for k, v in self.status_updates.stats().items() if k != "pending"],
+            ("result",),
+        ))
+        REGISTRY.register(Gauge(
+            "agent_scheduled_jobs", "Scheduled jobs in the timer heap",
+            lambda: [((), len(self.timers))],
+        ))
+        REGISTRY.register(Gauge(
+            "agent_schedule_lag_seconds", "Start lag of the latest scheduled runs, by agent type",
+            lambda: [
+                ((t.value, stat), value)
+                for t in self.schedules
+                for stat, value in self.schedule_lag_stats(t).items()
+            ],
+            ("agent_type", "stat"),
+        ))
+    
+    def _cache_lookups(self):
+        # Agents usually share one cache; count each cache once
+        caches = {id(agent.llm_cache): agent.llm_cache for agent in self.agents.values()}
+        hits = sum(getattr(cache, "hits", 0) for cache in caches.values())
+        misses = sum(getattr(cache, "misses", 0) for cache in caches.values())
+        return [(("hit",), hits), (("miss",), misses)]
+    
+    async def start_metrics_server(self):
+        """Serve GET /metrics on AGENT_METRICS_PORT (0 disables it)"""
+        if not self.metrics_port:
+            return
+        host = os.getenv("AGENT_METRICS_HOST", "0.0.0.0")
+        try:
+            self._metrics_server = await asyncio.start_server(self._serve_metrics, host, self.metrics_port)
+            print(f"[Scheduler] Metrics on http://{host}:{self.metrics_port}/metrics")
+        except OSError as e:
+            print(f"[Scheduler] Metrics endpoint disabled: {e}")
+    
+    async def _serve_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Drain headers; the request line is all we need
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)).strip():
                 pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+                status, body = "200 OK", REGISTRY.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    def submit_scheduled(self, agent_type: str, tenant_id: str, jobs: List[Tuple[JobKey, float, dict]]) -> int:
+        """
+        Queue one run for a tenant's due jobs of an agent type. Jobs that
+        come due while the tenant's run is queued join it; while it runs,
+        they wait for a follow-up run. A job already in the queued or running
+        run is skipped. Returns the number of jobs skipped.
+        """
+        task_id = SCHEDULED_PREFIX + _job_name((agent_type, tenant_id))
+        item = self._scheduled.get(task_id)
+        if item is None or task_id not in self.pool:
+            item = WorkItem(
+                task_id=task_id,
+                agent_type=agent_type,
+                priority=task_priority(trigger="scheduled"),
+                preemptible=True,
+                tenant_id=tenant_id,
+                weight=self.tenant_weight(tenant_id),
+                payload={
+                    "tenantId": tenant_id,
+                    # job name -> due time, for start lag
+                    "jobs": {_job_name(key[1:]): due for key, due, _ in jobs},
+                    "websites": [data["website"] for _, _, data in jobs if data.get("website")],
+                },
+            )
+            self.pool.submit(item)
+            self._scheduled[task_id] = item
+            return 0
+        
+        running = task_id in self.pool.running
+        followups = self._followups.setdefault(task_id, {}) if running else None
+        skipped = 0
+        for key, due, input_data in jobs:
+            name = _job_name(key[1:])
+            if name in item.payload["jobs"] or (running and name in followups):
+                skipped += 1
+            elif running:
+                followups[name] = (key, due, input_data)
+            else:
+                item.payload["jobs"][name] = due
+                if input_data.get("website"):
+                    item.payload["websites"].append(input_data["website"])
+        return skipped
+    
+    async def run_scheduled(self, item: WorkItem):
+        """Run a scheduled agent for one tenant (its due websites, for monitoring)"""
+        payload = item.payload
+        now = time.monotonic()
+        for job, due in payload["jobs"].items():
+            self.schedule_lag[item.agent_type][job] = max(0.0, now - due)
+        
+        agent = self.agents[AgentType(item.agent_type)]
+        result = await agent.run(AgentContext(
+            tenant_id=payload["tenantId"],
+            trigger="scheduled",
+            input_data={"websites": payload["websites"]} if payload["websites"] else {},
+        ))
+        if not result.success:
+            print(f"[Scheduler] Scheduled {item.agent_type} failed for {payload['tenantId']}: {result.error}")
+    
+    def schedule_lag_stats(self, agent_type: AgentType) -> dict:
+        """Start lag across jobs for their most recent runs"""
+        lags = sorted(self.schedule_lag[agent_type.value].values())
+        return {
+            "lag_p50": round(lags[len(lags) // 2], 3) if lags else 0.0,
+            "lag_p95": round(lags[int(len(lags) * 0.95)], 3) if lags else 0.0,
+            "lag_max": round(lags[-1], 3) if lags else 0.0,
+        }
     
     async def update_task_status(
         self,
@@ -162,36 +963,88 @@ class AgentScheduler:
         output: Optional[dict] = None,
         error_message: Optional[str] = None,
     ):
-        """Update task status via API"""
+        """Queue a task status update; sent in the next status batch"""
+        data = {"status": status, "workerId": self.worker_id}
+        if output:
+            data["output"] = output
+        if error_message:
+            data["errorMessage"] = error_message
+        if status in ["COMPLETED", "FAILED"]:
+            data["completedAt"] = datetime.utcnow().isoformat()
+        
+        self.status_updates.add(task_id, data)
+
+
+async def supervise(processes: int):
+    """
+    Run one scheduler process per shard, each with its own event loop and
+    HTTP pool. Children that exit are restarted with backoff; SIGTERM and
+    SIGINT are forwarded so every child drains before the supervisor exits.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    children: Dict[int, asyncio.subprocess.Process] = {}
+    
+    def stop():
+        stopping.set()
+        for child in children.values():
+            if child.returncode is None:
+                child.send_signal(signal.SIGTERM)
+    
+    for sig in (signal.SIGTERM, signal.SIGINT):
         try:
-            async with httpx.AsyncClient() as client:
-                data = {"status": status}
-                if output:
-                    data["output"] = output
-                if error_message:
-                    data["errorMessage"] = error_message
-                if status in ["COMPLETED", "FAILED"]:
-                    data["completedAt"] = datetime.utcnow().isoformat()
-                
-                await client.patch(
-                    f"{self.api_base_url}/api/agent-tasks/{task_id}",
-                    json=data,
-                    timeout=10.0,
-                )
-        except Exception as e:
-            print(f"[Scheduler] Failed to update task status: {e}")
+            loop.add_signal_handler(sig, stop)
+        except (NotImplementedError, RuntimeError):
+            pass
+    
+    async def run_shard(index: int):
+        env = {
+            **os.environ,
+            "AGENT_PROCESSES": "1",
+            "AGENT_SHARD_INDEX": str(index),
+            "AGENT_SHARD_COUNT": str(processes),
+        }
+        backoff = 0.5
+        while not stopping.is_set():
+            started = time.monotonic()
+            children[index] = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__), env=env,
+            )
+            code = await children[index].wait()
+            if stopping.is_set():
+                return
+            # Reset the backoff after a child that ran for a while
+            backoff = 1.0 if time.monotonic() - started > 60 else min(backoff * 2, 60.0)
+            print(f"[Scheduler] Shard {index} exited with {code}, restarting in {backoff:.0f}s")
+            try:
+                await asyncio.wait_for(stopping.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+    
+    print(f"[Scheduler] Supervising {processes} scheduler processes")
+    await asyncio.gather(*(run_shard(index) for index in range(processes)))
 
 
 async def main():
     """Main entry point"""
     api_url = os.getenv("API_BASE_URL", "http://localhost:3000")
     
+    # AGENT_PROCESSES=auto runs one scheduler process per core
+    processes = os.getenv("AGENT_PROCESSES", "1")
+    processes = (os.cpu_count() or 1) if processes == "auto" else int(processes)
+    if processes > 1:
+        await supervise(processes)
+        return
+    
     scheduler = AgentScheduler(api_base_url=api_url)
+    scheduler.install_signal_handlers()
     
     try:
         await scheduler.start()
     except KeyboardInterrupt:
         scheduler.stop()
+    finally:
+        await scheduler.close()
 
 
 if __name__ == "__main__":
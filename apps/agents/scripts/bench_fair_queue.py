@@ -0,0 +1,126 @@
+"""
+Fair Queue Benchmark
+Simulated worker pool fed by tenants of skewed sizes: per-tenant start wait
+and throughput with the global priority queue and the weighted fair queue,
+and the cost of a pop while one agent type is at its limit
+
+    python scripts/bench_fair_queue.py [--tenants 200] [--workers 20] [--minutes 10]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.worker_pool import FairTaskQueue, PriorityTaskQueue, WorkItem
+
+
+def make_arrivals(tenants: int, minutes: float, capacity: float, rng: random.Random) -> list:
+    """
+    (time, tenant, weight) arrivals at 1.2x pool capacity (runs per second);
+    Pareto tenant sizes, plus a whale that dumps 40% of the load in bursts
+    """
+    horizon = minutes * 60
+    sizes = [rng.paretovariate(1.1) for _ in range(tenants)]
+    sizes[0] = sum(sizes[1:]) * 2 / 3
+    total = sum(sizes)
+    arrivals = []
+    for t, size in enumerate(sizes):
+        count = max(1, int(size / total * horizon * capacity * 1.2))
+        weight = 2.0 if t % 10 == 0 else 1.0
+        if t == 0:
+            # Whale backlog lands at the start of each minute
+            times = (int(rng.uniform(0, minutes)) * 60.0 for _ in range(count))
+        else:
+            times = (rng.uniform(0, horizon) for _ in range(count))
+        arrivals.extend((at, f"tenant-{t:04d}", weight) for at in times)
+    arrivals.sort()
+    return arrivals
+
+
+def simulate(queue, arrivals: list, workers: int, service: float) -> dict:
+    """Discrete-event run; returns start waits and completions per tenant"""
+    waits = {}
+    done = {}
+    busy = []  # completion times
+    i = 0
+    now = 0.0
+    end = arrivals[-1][0]
+    while now <= end:
+        while i < len(arrivals) and arrivals[i][0] <= now:
+            at, tenant, weight = arrivals[i]
+            queue.push(WorkItem(
+                task_id=f"task-{i}", agent_type="monitoring", payload={},
+                tenant_id=tenant, weight=weight, enqueued_at=at,
+            ))
+            i += 1
+        while busy and busy[0] <= now:
+            heapq.heappop(busy)
+        while len(busy) < workers:
+            item = queue.pop(lambda item: True)
+            if item is None:
+                break
+            waits.setdefault(item.tenant_id, []).append(now - item.enqueued_at)
+            done[item.tenant_id] = done.get(item.tenant_id, 0) + 1
+            heapq.heappush(busy, now + service * random.uniform(0.5, 1.5))
+        next_arrival = arrivals[i][0] if i < len(arrivals) else end + 1
+        now = min(next_arrival, busy[0]) if len(busy) >= workers else next_arrival
+    return {"waits": waits, "done": done, "left": len(queue)}
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def report(name: str, result: dict, minutes: float):
+    waits = result["waits"]
+    whale = "tenant-0000"
+    small = [w for tenant, ws in waits.items() if tenant != whale for w in ws]
+    per_tenant_p95 = sorted(percentile(ws, 0.95) for tenant, ws in waits.items() if tenant != whale)
+    print(f"{name}")
+    print(f"  started {sum(result['done'].values())} ({sum(result['done'].values()) / minutes:.0f}/min), {result['left']} left queued")
+    print(f"  whale:  {result['done'].get(whale, 0):6d} started, wait p50 {percentile(waits.get(whale, []), 0.5):7.1f}s p95 {percentile(waits.get(whale, []), 0.95):7.1f}s")
+    print(f"  others: {len(small):6d} started, wait p50 {percentile(small, 0.5):7.1f}s p95 {percentile(small, 0.95):7.1f}s")
+    print(f"  worst small-tenant p95 wait: {per_tenant_p95[-1] if per_tenant_p95 else 0.0:.1f}s")
+
+
+def bench_blocked_pop(tenants: int):
+    """Pop cost while every queued monitoring run is at its type limit"""
+    queue = FairTaskQueue()
+    for t in range(tenants):
+        for j in range(10):
+            queue.push(WorkItem(task_id=f"m{t}-{j}", agent_type="monitoring", payload={}, tenant_id=f"tenant-{t}"))
+    eligible = lambda item: item.agent_type != "monitoring"
+    started = time.perf_counter()
+    for _ in range(1000):
+        queue.pop(eligible)
+    elapsed = time.perf_counter() - started
+    print(f"Blocked pop over {tenants} tenants / {len(queue)} items: {elapsed / 1000 * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--service", type=float, default=2.0, help="mean run time in seconds")
+    parser.add_argument("--minutes", type=float, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    arrivals = make_arrivals(args.tenants, args.minutes, args.workers / args.service, rng)
+    print(f"{len(arrivals)} runs from {args.tenants} tenants over {args.minutes:.0f} min, {args.workers} workers\n")
+    random.seed(7)
+    report("Global priority queue", simulate(PriorityTaskQueue(), arrivals, args.workers, args.service), args.minutes)
+    random.seed(7)
+    report("Weighted fair queue", simulate(FairTaskQueue(), arrivals, args.workers, args.service), args.minutes)
+    print()
+    bench_blocked_pop(args.tenants * 10)
+
+
+if __name__ == "__main__":
+    main()
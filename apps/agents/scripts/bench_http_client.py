@@ -0,0 +1,90 @@
+"""
+HTTP Client Benchmark
+Requests per second against a local stub API, with a fresh AsyncClient per
+call (how call_api worked before) and with the shared pooled client
+
+    python scripts/bench_http_client.py [--requests 2000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.http_client import HTTPClientConfig, create_http_client
+
+
+BODY = b'{"ok": true}'
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal keep-alive HTTP/1.1 stub that answers every request with JSON"""
+    try:
+        while True:
+            request = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in request.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run(url: str, requests: int, concurrency: int, shared: bool) -> float:
+    client = create_http_client(HTTPClientConfig()) if shared else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            if client is not None:
+                response = await client.post(url, json={"status": "ok"})
+            else:
+                async with httpx.AsyncClient(timeout=30.0) as fresh:
+                    response = await fresh.post(url, json={"status": "ok"})
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    if client is not None:
+        await client.aclose()
+    return requests / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/api/agent-tasks/status"
+
+    async with server:
+        # Warm up imports and the loop before timing
+        await run(url, 50, 10, shared=True)
+        fresh = await run(url, args.requests, args.concurrency, shared=False)
+        pooled = await run(url, args.requests, args.concurrency, shared=True)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"  client per request:   {fresh:7.0f} req/s")
+    print(f"  shared pooled client: {pooled:7.0f} req/s ({pooled / fresh:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
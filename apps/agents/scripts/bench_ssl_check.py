@@ -0,0 +1,124 @@
+"""
+SSL Check Benchmark
+Event-loop stall while certificates of many HTTPS sites are inspected: the
+old blocking socket + wrap_socket check, and MonitoringAgent._check_ssl
+(asyncio TLS connect, then the certificate cache). Needs the openssl CLI
+for a throwaway self-signed certificate.
+
+    python scripts/bench_ssl_check.py [--sites 50] [--handshake-delay 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.monitoring import MonitoringAgent
+
+
+def make_cert(directory: str) -> tuple:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+         "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def start_tls_server(cert: str, key: str, delay: float) -> int:
+    """Threaded TLS server that waits `delay` before each handshake"""
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            time.sleep(delay)
+            try:
+                with context.wrap_socket(self.request, server_side=True) as tls:
+                    while tls.recv(1024):
+                        pass
+            except (ssl.SSLError, ConnectionError):
+                pass
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+async def blocking_check_ssl(url: str, context: ssl.SSLContext) -> dict:
+    """The check as it was: a blocking TLS connect inside a coroutine"""
+    parsed = urlparse(url)
+    hostname, port = parsed.hostname, parsed.port
+    with socket.create_connection((hostname, port), timeout=10) as sock:
+        with context.wrap_socket(sock, server_hostname=hostname) as ssock:
+            return {"valid": bool(ssock.getpeercert())}
+
+
+async def measure(checks) -> tuple:
+    """Run the checks concurrently; returns (elapsed, longest loop stall, total stall)"""
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(max(0.0, time.perf_counter() - before - 0.001))
+
+    tick = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    results = await asyncio.gather(*checks)
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    assert all(r.get("valid") for r in results), results[:1]
+    return elapsed, max(stalls), sum(s for s in stalls if s > 0.005)
+
+
+async def run(args, port: int, cert: str):
+    context = ssl.create_default_context(cafile=cert)
+    url = f"https://localhost:{port}/"
+    agent = MonitoringAgent()
+    agent._ssl_context = context
+
+    print(f"{args.sites} HTTPS checks, {args.handshake_delay * 1000:.0f} ms handshake delay")
+    rows = [
+        # Concurrent checks all start before any certificate is cached
+        ("blocking connect (before)", lambda: [blocking_check_ssl(url, context) for _ in range(args.sites)]),
+        ("asyncio connect (after)", lambda: [agent._check_ssl(url) for _ in range(args.sites)]),
+        ("cached certificate", lambda: [agent._check_ssl(url) for _ in range(args.sites)]),
+    ]
+    for name, checks in rows:
+        elapsed, worst, total = await measure(checks())
+        print(f"  {name:26s} {elapsed * 1000:7.0f} ms, worst loop stall {worst * 1000:6.1f} ms, stalled {total * 1000:7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sites", type=int, default=50)
+    parser.add_argument("--handshake-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_cert(directory)
+        port = start_tls_server(cert, key, args.handshake_delay)
+        asyncio.run(run(args, port, cert))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from core.json_stream import IncrementalJSONParser, extract_json
+
+
+def feed_in_chunks(text: str, size: int):
+    parser = IncrementalJSONParser()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return parser, items
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('```\n[1, 2]\n```', [1, 2]),
+    ('Here you go: {"a": {"b": [1, "}"]}} trailing', {"a": {"b": [1, "}"]}}),
+    ('Sure [see below]:\n```json\n{"a": 1}\n```', {"a": 1}),
+    ('Options [1, 2]:\n```json\n{"a": 1}\n```', {"a": 1}),
+    ('Use {braces} like this: {"a": 1}', {"a": 1}),
+    ('Note [x] then [1, {"a": 2}]', [1, {"a": 2}]),
+    ('Broken {"a": } then {"b": 2}', {"b": 2}),
+    ('{"text": "a ``` b"}', {"text": "a ``` b"}),
+    ('```bash\nls [dir]\n```\n```json\n{"a": 1}\n```', {"a": 1}),
+])
+def test_extract_json(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("Unable to help with that [sorry]")
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_array_items_stream_as_they_close(size):
+    text = 'Plan [draft]:\n```json\n[{"action_type": "restart"}, {"action_type": "scale", "n": [1]}]\n```'
+    parser, items = feed_in_chunks(text, size)
+    assert items == [{"action_type": "restart"}, {"action_type": "scale", "n": [1]}]
+    assert parser.root == "["
+    assert parser.close() == items
+
+
+def test_first_item_available_before_the_array_ends():
+    parser = IncrementalJSONParser()
+    assert parser.feed('```json\n[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}]') == [{"b": 2}]
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_object_partial_fills_member_by_member(size):
+    text = 'Result (see [notes]):\n{"summary": "slow db", "severity": "high", "issues": ["x"]}'
+    parser, items = feed_in_chunks(text, size)
+    assert items == []
+    assert parser.partial == {"summary": "slow db", "severity": "high", "issues": ["x"]}
+    assert parser.close()["severity"] == "high"
+
+
+def test_partial_is_reset_when_a_candidate_is_dropped():
+    parser = IncrementalJSONParser()
+    parser.feed('{"draft": 1, nope} {"a": 2')
+    assert parser.partial == {}
+    parser.feed("}")
+    assert parser.close() == {"a": 2}
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from core import llm_cache
+from core.llm_cache import MemoryLLMCache, SQLiteLLMCache, make_cache_key
+
+
+class Clock:
+    """Stands in for the time module; every reading moves a millisecond on"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return clock
+
+
+def test_cache_key_covers_every_request_field():
+    base = ("openai", "gpt-4", "system", "prompt", 0.2, 2000)
+    keys = {make_cache_key(*base)}
+    for i, other in enumerate(["anthropic", "gpt-4o", "other", "other prompt", 0.7, 50]):
+        changed = list(base)
+        changed[i] = other
+        keys.add(make_cache_key(*changed))
+    assert len(keys) == 7
+    assert make_cache_key(*base) == make_cache_key("openai", "gpt-4", "system", "prompt", 0.20000001, 2000)
+
+
+def test_memory_cache_evicts_least_recently_used(clock):
+    async def scenario():
+        cache = MemoryLLMCache(max_entries=2)
+        await cache.set("a", "A", ttl=60)
+        await cache.set("b", "B", ttl=60)
+        assert await cache.get("a") == "A"
+        await cache.set("c", "C", ttl=60)
+        return cache, [await cache.get(k) for k in ("a", "b", "c")]
+
+    cache, values = asyncio.run(scenario())
+    # "b" was the least recently used when "c" arrived
+    assert values == ["A", None, "C"]
+    assert cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "entries": 2}
+
+
+def test_memory_cache_expires_entries(clock):
+    async def scenario():
+        cache = MemoryLLMCache()
+        await cache.set("a", "A", ttl=10)
+        await cache.set("skip", "S", ttl=0)
+        fresh = await cache.get("a")
+        clock.now += 10
+        return cache, fresh, await cache.get("a"), await cache.get("skip")
+
+    cache, fresh, expired, skipped = asyncio.run(scenario())
+    assert fresh == "A"
+    assert expired is None and skipped is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_sqlite_cache_persists_expires_and_evicts(tmp_path, clock):
+    path = str(tmp_path / "llm_cache.db")
+
+    async def first_process():
+        cache = SQLiteLLMCache(path, max_entries=2)
+        await cache.set("a", "A", ttl=60)
+        await cache.set("short", "S", ttl=5)
+        cache.close()
+
+    async def second_process():
+        cache = SQLiteLLMCache(path, max_entries=2)
+        survived = await cache.get("a")
+        clock.now += 10
+        expired = await cache.get("short")
+        await cache.set("b", "B", ttl=60)
+        assert await cache.get("a") == "A"
+        await cache.set("c", "C", ttl=60)
+        values = [await cache.get(k) for k in ("a", "b", "c")]
+        cache.close()
+        return survived, expired, values
+
+    asyncio.run(first_process())
+    survived, expired, values = asyncio.run(second_process())
+    assert survived == "A"
+    assert expired is None
+    # Over the cap the least recently read row goes
+    assert values == ["A", None, "C"]
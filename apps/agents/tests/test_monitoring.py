@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+import socket
+import time
+
+import httpx
+
+from agents.monitoring import MonitoringAgent
+from core.base_agent import AgentContext, AgentResult
+
+
+CERT = {"notAfter": "Jan  1 00:00:00 2099 GMT", "issuer": ((("organizationName", "Test CA"),),)}
+
+
+class BrokenStream:
+    def get_extra_info(self, name):
+        raise RuntimeError("no TLS info on this stream")
+
+
+def test_check_ssl_falls_back_to_a_tls_connect():
+    agent = MonitoringAgent()
+    fetched = []
+
+    async def fetch_cert(hostname, port):
+        fetched.append((hostname, port))
+        return CERT
+
+    agent._fetch_cert = fetch_cert
+    request = httpx.Request("GET", "https://site.test/")
+    response = httpx.Response(200, request=request, extensions={"network_stream": BrokenStream()})
+
+    info = asyncio.run(agent._check_ssl("https://site.test/", response))
+    assert info["valid"] is True
+    assert info["issuer"] == {"organizationName": "Test CA"}
+    assert fetched == [("site.test", 443)]
+
+
+def test_cert_cache_is_bounded():
+    agent = MonitoringAgent()
+    agent.max_cached_certs = 3
+    now = time.monotonic()
+    agent._cache_cert("expired:443", (now - 1, {}))
+    agent._cache_cert("a:443", (now + 60, {}))
+    agent._cache_cert("b:443", (now + 60, {}))
+    # Full: the expired entry goes first
+    agent._cache_cert("c:443", (now + 60, {}))
+    assert list(agent._cert_cache) == ["a:443", "b:443", "c:443"]
+    # Still full and nothing expired: the oldest goes
+    agent._cache_cert("d:443", (now + 60, {}))
+    assert list(agent._cert_cache) == ["b:443", "c:443", "d:443"]
+
+
+async def serve_ok(reader, writer):
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok")
+    await writer.drain()
+    writer.close()
+
+
+def test_check_resolves_once_and_times_each_phase(monkeypatch):
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        lookups.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+
+    async def scenario():
+        server = await asyncio.start_server(serve_ok, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            agent = MonitoringAgent()
+            return await agent._check_website({"id": "w1", "url": f"http://localhost:{port}/"})
+
+    result = asyncio.run(scenario())
+    assert result["status"] == "up", result
+    assert lookups == ["localhost"]
+    assert {"dns", "connect", "ttfb", "body"} <= set(result["timings"])
+
+
+def test_dns_failure_is_reported_as_the_failed_phase():
+    async def scenario():
+        agent = MonitoringAgent()
+        return await agent._check_website({"id": "w1", "url": "http://does-not-exist.invalid/"})
+
+    result = asyncio.run(scenario())
+    assert result["status"] == "down"
+    assert result["slow_phase"] == "dns"
+    assert result["error"].endswith("during dns")
+    assert "connect" not in result["timings"]
+
+
+class TextLines(logging.Handler):
+    """Formats records like AGENT_LOG_FORMAT=text; a missing field raises"""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(logging.Formatter("[%(agent)s] [%(levelname)s] %(message)s"))
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_standalone_run_sends_queued_health_checks():
+    posted = []
+
+    def api(request):
+        checks = json.loads(request.content)["checks"]
+        posted.extend(checks)
+        return httpx.Response(200, json={"results": [
+            {"websiteId": c["websiteId"], "ok": c["websiteId"] != "bad", "error": "unknown website"}
+            for c in checks
+        ]})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+        agent = MonitoringAgent(http_client=client)
+
+        async def execute(context):
+            for website_id in ("w1", "bad"):
+                agent._store_health_check(website_id, {
+                    "status": "up", "status_code": 200, "response_time": 12, "checked_at": "2026-01-01T00:00:00",
+                })
+            return AgentResult(success=True, output={})
+
+        agent.execute = execute
+        await agent.run(AgentContext(tenant_id="t1"))
+        await client.aclose()
+        return agent
+
+    handler = TextLines()
+    logger = logging.getLogger("agentops.agents")
+    logger.addHandler(handler)
+    try:
+        agent = asyncio.run(scenario())
+    finally:
+        logger.removeHandler(handler)
+
+    # Sent when the run ended, not left in the batcher
+    assert [c["websiteId"] for c in posted] == ["w1", "bad"]
+    assert agent.rejected_health_checks == 1
+    assert "[monitoring] [WARNING] Health check for website bad rejected: unknown website" in handler.lines
+
+
+def test_virtual_hosts_on_one_address_share_its_cap(monkeypatch):
+    getaddrinfo = socket.getaddrinfo
+    # Every vhost*.test name resolves to the local server
+    monkeypatch.setattr(socket, "getaddrinfo", lambda host, *a, **k: getaddrinfo(
+        "127.0.0.1" if host.endswith(".test") else host, *a, **k
+    ))
+    open_connections = []
+    peak = []
+
+    async def slow_ok(reader, writer):
+        open_connections.append(writer)
+        peak.append(len(open_connections))
+        await asyncio.sleep(0.05)
+        open_connections.remove(writer)
+        await serve_ok(reader, writer)
+
+    async def scenario():
+        server = await asyncio.start_server(slow_ok, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        agent = MonitoringAgent()
+        agent._address_slots.limit = 2
+        websites = [
+            {"id": f"w{i}", "name": f"vhost{i}", "url": f"http://vhost{i}.test:{port}/"} for i in range(8)
+        ]
+        async with server:
+            results = await asyncio.gather(*(agent._probe(w) for w in websites))
+        return agent, results
+
+    agent, results = asyncio.run(scenario())
+    assert [r["status"] for _, r in results] == ["up"] * 8
+    assert max(peak) == 2
+    assert len(agent._host_slots) == 0 and len(agent._address_slots) == 0
+
+
+def test_transport_raises_httpx_errors():
+    async def never_answer(reader, writer):
+        await asyncio.sleep(5)
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_server(never_answer, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        agent = MonitoringAgent()
+        agent.check_timeout = 0.2
+        async with server:
+            return await agent._check_website({"id": "w1", "url": f"http://127.0.0.1:{port}/"})
+
+    result = asyncio.run(scenario())
+    # httpcore's ReadTimeout arrives as httpx.ReadTimeout
+    assert result["status"] == "down"
+    assert result["error"] == "Connection timed out during ttfb"
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from core import rate_limit
+from core.base_agent import AgentContext, AgentResult, AgentType, BaseAgent
+from core.rate_limit import ProviderRateLimiter, retry_after_seconds
+
+
+class StubAgent(BaseAgent):
+    name = "stub"
+    description = "Calls the LLM once"
+    capabilities = []
+    llm_cache_ttl = 0.0
+
+    async def execute(self, context: AgentContext) -> AgentResult:
+        return AgentResult(success=True, output={"answer": await self.ask_llm("ping")})
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://llm.test/v1")
+
+
+def completion(text: str = "pong", tokens: int = 12) -> httpx.Response:
+    return httpx.Response(200, json={
+        "choices": [{"message": {"content": text}}],
+        "usage": {"total_tokens": tokens},
+    })
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds(httpx.Headers({"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(httpx.Headers({"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(httpx.Headers({})) is None
+
+
+def test_429_backs_off_and_shrinks_buckets():
+    async def scenario():
+        limiter = ProviderRateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+        await limiter.acquire("monitoring", 100)
+        limiter.release(100, response=httpx.Response(429, headers={"retry-after": "2"}))
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.throttled == 1
+    assert limiter.requests.capacity == pytest.approx(450)
+    assert limiter.tokens.capacity == pytest.approx(45000)
+    assert limiter.blocked_until - time.monotonic() == pytest.approx(2, abs=0.1)
+
+
+def test_rate_limit_headers_adapt_limits():
+    async def scenario():
+        limiter = ProviderRateLimiter(requests_per_minute=600, tokens_per_minute=60000)
+        await limiter.acquire("rca", 100)
+        limiter.release(100, used_tokens=100, response=httpx.Response(200, headers={
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "1.5s",
+            "x-ratelimit-limit-tokens": "1000",
+        }))
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.requests.capacity == 60
+    assert limiter.tokens.capacity == 1000
+    assert limiter.blocked_until - time.monotonic() == pytest.approx(1.5, abs=0.1)
+
+
+def test_slots_round_robin_across_agent_types():
+    async def scenario():
+        limiter = ProviderRateLimiter(max_concurrency=1)
+        await limiter.acquire("monitoring", 1)
+        order = []
+
+        async def call(agent_type: str):
+            await limiter.acquire(agent_type, 1)
+            order.append(agent_type)
+            limiter.release(1)
+
+        waiters = [asyncio.ensure_future(call("monitoring")) for _ in range(3)]
+        waiters.append(asyncio.ensure_future(call("rca")))
+        await asyncio.sleep(0)
+        limiter.release(1)
+        await asyncio.gather(*waiters)
+        return order
+
+    # RCA queued behind three monitoring calls still gets the second slot
+    assert asyncio.run(scenario())[:2] == ["monitoring", "rca"]
+
+
+def test_urgent_callers_go_first():
+    async def scenario():
+        limiter = ProviderRateLimiter(max_concurrency=1)
+        await limiter.acquire("monitoring", 1)
+        order = []
+
+        async def call(name: str, priority: float):
+            await limiter.acquire(name, 1, priority)
+            order.append(name)
+            limiter.release(1)
+
+        waiters = [
+            asyncio.ensure_future(call("monitoring", 0.0)),
+            asyncio.ensure_future(call("remediation", 3600.0)),
+        ]
+        await asyncio.sleep(0)
+        limiter.release(1)
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["remediation", "monitoring"]
+
+
+def test_agent_retries_through_stub_returning_429s():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        if len(calls) <= 2:
+            return httpx.Response(429, headers={"retry-after-ms": "100"})
+        return completion()
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            agent = StubAgent(AgentType.MONITORING, http_client=client)
+            return await agent.run(AgentContext(tenant_id="t1"))
+
+    result = asyncio.run(scenario())
+    assert result.output == {"answer": "pong"}
+    assert len(calls) == 3
+    # Each retry waited for the limiter to reopen after retry-after
+    assert calls[1] - calls[0] >= 0.09
+    assert calls[2] - calls[1] >= 0.09
+    limiter = rate_limit._limiters[("openai", "gpt-4")]
+    assert limiter.throttled == 2
+    assert limiter.in_flight == 0
+
+
+def test_agent_gives_up_after_max_retries():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"retry-after-ms": "10"})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            agent = StubAgent(AgentType.RCA, http_client=client)
+            agent.llm_max_retries = 1
+            return await agent.ask_llm("ping")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(scenario())
+    assert rate_limit._limiters[("openai", "gpt-4")].in_flight == 0
@@ -0,0 +1,123 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+
+# Runs remediation for one task against a journal. The first attempt kills
+# itself with SIGKILL just before the third action, like a crashed worker;
+# after the restart the scripted model returns a reordered, changed plan.
+CHILD = textwrap.dedent('''
+    import asyncio
+    import json
+    import os
+    import signal
+    import sys
+
+    import httpx
+
+    from agents.remediation import RemediationAction, RemediationAgent
+    from core.base_agent import AgentContext
+    from core.journal import TaskJournal
+
+    workdir = sys.argv[1]
+    executions = os.path.join(workdir, "executions.log")
+
+
+    class ScriptedRemediation(RemediationAgent):
+        async def _get_incident(self, incident_id):
+            return {"id": incident_id, "title": "5xx spike"}
+
+        async def _stream_actions(self, incident):
+            if not os.path.exists(os.path.join(workdir, "killed")):
+                plan = [
+                    ("clear_cache", "cdn"),
+                    ("clear_cache", "cdn"),
+                    ("scale_up", "web"),
+                    ("restart_service", "api"),
+                ]
+            else:
+                # The model answers differently after the restart
+                plan = [
+                    ("scale_up", "web"),
+                    ("clear_cache", "cdn"),
+                    ("clear_cache", "app"),
+                    ("clear_cache", "cdn"),
+                    ("restart_service", "api"),
+                ]
+            for action_type, target in plan:
+                yield RemediationAction(
+                    action_type=action_type,
+                    target=target,
+                    description="scripted",
+                    risk_level="low",
+                    requires_approval=self.available_actions[action_type]["approval_required"],
+                )
+
+        async def _execute_action(self, tenant_id, action):
+            with open(executions) as f:
+                done = len(f.readlines())
+            if done == 2 and not os.path.exists(os.path.join(workdir, "killed")):
+                open(os.path.join(workdir, "killed"), "w").close()
+                os.kill(os.getpid(), signal.SIGKILL)
+            with open(executions, "a") as f:
+                f.write(f"{action.action_type}:{action.target}\\n")
+            return {"success": True}
+
+
+    async def main():
+        journal = TaskJournal(os.path.join(workdir, "journal.db"))
+        task = {"id": "task-1", "incidentId": "inc-1"}
+        if not any(t["id"] == task["id"] for t in await journal.unfinished()):
+            await journal.record_claim(task)
+        api = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+        agent = ScriptedRemediation(http_client=api)
+        result = await agent.run(
+            AgentContext(tenant_id="tenant-1", incident_id="inc-1", trigger="incident"),
+            task_id=task["id"],
+            journal=journal,
+        )
+        await journal.record_complete(task["id"], "COMPLETED" if result.success else "FAILED")
+        await api.aclose()
+        print(json.dumps(result.output))
+
+
+    asyncio.run(main())
+''')
+
+
+def run_child(tmp_path):
+    script = tmp_path / "child.py"
+    script.write_text(CHILD)
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "OPENAI_API_KEY": "test",
+        "AGENT_METRICS_PORT": "0",
+    }
+    return subprocess.run(
+        [sys.executable, str(script), str(tmp_path)],
+        env=env, capture_output=True, text=True, timeout=60,
+    )
+
+
+def test_killed_remediation_resumes_without_repeating_actions(tmp_path):
+    (tmp_path / "executions.log").write_text("")
+
+    first = run_child(tmp_path)
+    assert first.returncode == -9, first.stderr
+    assert (tmp_path / "executions.log").read_text().split() == ["clear_cache:cdn", "clear_cache:cdn"]
+
+    second = run_child(tmp_path)
+    assert second.returncode == 0, second.stderr
+    # Finished actions are not repeated although the new plan reorders them;
+    # the action planned before the kill runs, then the one new action
+    assert (tmp_path / "executions.log").read_text().split() == [
+        "clear_cache:cdn", "clear_cache:cdn", "scale_up:web", "clear_cache:app",
+    ]
+    output = json.loads(second.stdout.strip().splitlines()[-1])
+    assert [(a["action"], a["target"]) for a in output["executed_actions"]] == [
+        ("clear_cache", "cdn"), ("clear_cache", "cdn"), ("scale_up", "web"), ("clear_cache", "app"),
+    ]
+    assert output["pending_approval"] == [{"action": "restart_service", "target": "api"}]
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import logging
+import random
+from collections import defaultdict
+
+import httpx
+
+from core.base_agent import AgentContext, AgentResult, AgentType, BaseAgent
+from core.run_context import current_run
+
+
+class InterleavingAgent(BaseAgent):
+    """Logs several times per run with awaits in between, so runs interleave"""
+    name = "interleaving"
+    description = "Stress test agent"
+    capabilities = []
+    log_flush_interval = 0.01
+
+    async def execute(self, context: AgentContext) -> AgentResult:
+        seen = []
+        for step in range(5):
+            self.log_info(f"{context.tenant_id} step {step}")
+            await asyncio.sleep(random.random() / 1000)
+            seen.append((self.task_id, current_run().run_id))
+        return AgentResult(success=True, output={
+            "seen": seen,
+            "logs": [entry["message"] for entry in self.logs],
+        })
+
+
+def test_concurrent_runs_stay_isolated():
+    runs = 500
+    shipped = defaultdict(list)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        task_id = request.url.path.split("/")[3]
+        shipped[task_id].extend(entry["message"] for entry in json.loads(request.content)["logs"])
+        return httpx.Response(200, json={"count": 1})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            agent = InterleavingAgent(AgentType.MONITORING, http_client=client)
+            agent._logger = logging.getLogger("test.run_context")
+            return await asyncio.gather(*(
+                agent.run(AgentContext(tenant_id=f"tenant-{i}"), task_id=f"task-{i}")
+                for i in range(runs)
+            ))
+
+    results = asyncio.run(scenario())
+    run_ids = set()
+    for i, result in enumerate(results):
+        expected = [f"tenant-{i} step {step}" for step in range(5)]
+        assert result.output["logs"] == expected
+        assert shipped[f"task-{i}"] == expected
+        task_ids = {task_id for task_id, _ in result.output["seen"]}
+        ids = {run_id for _, run_id in result.output["seen"]}
+        assert task_ids == {f"task-{i}"}
+        assert len(ids) == 1
+        run_ids |= ids
+    assert len(run_ids) == runs
+    assert len(shipped) == runs
+
+
+def test_outside_run_uses_the_default_context():
+    agent = InterleavingAgent(AgentType.RCA)
+    agent._logger = logging.getLogger("test.run_context")
+    agent.task_id = "adhoc"
+    agent.log_info("outside")
+    assert agent.task_id == "adhoc"
+    assert [entry["message"] for entry in agent.logs] == ["outside"]
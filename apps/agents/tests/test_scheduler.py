@@ -0,0 +1,238 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import scheduler as scheduler_module
+from core.base_agent import AgentResult, AgentType
+from scheduler import SCHEDULED_PREFIX, AgentScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setenv("AGENT_MAX_WORKERS", "16")
+    monkeypatch.delenv("AGENT_JOURNAL_PATH", raising=False)
+    claims = []
+
+    async def fake_claim(limit, resume=None):
+        claims.append(limit)
+        return [{"id": f"task-{len(claims)}-{i}", "agentType": "RCA", "tenantId": "t1"} for i in range(limit)]
+
+    def make():
+        instance = AgentScheduler(api_base_url="http://app.test")
+        instance._claim = fake_claim
+        instance.claims = claims
+        return instance
+
+    return make
+
+
+def test_scheduled_runs_do_not_use_the_claim_budget(scheduler):
+    async def scenario():
+        s = scheduler()
+        for i in range(40):
+            assert s.submit_scheduled("incident", f"tenant-{i}", [(("incident", f"tenant-{i}", None), 0.0, {})]) == 0
+        claimed = await s.claim_tasks()
+        return s, claimed
+
+    s, claimed = asyncio.run(scenario())
+    assert s.claims == [32]
+    assert claimed == 32
+    assert s.claimed_count() == 32
+    assert len(s.pool.queue) == 72
+
+
+def test_claim_budget_counts_claimed_tasks(scheduler):
+    async def scenario():
+        s = scheduler()
+        await s.claim_tasks()
+        await s.claim_tasks()
+        return s
+
+    s = asyncio.run(scenario())
+    assert s.claims == [32]
+    assert s._claim_backlog
+    assert not any(t.startswith(SCHEDULED_PREFIX) for t in s.pool.task_ids())
+
+
+def tenant(tenant_id, sites, interval=60):
+    return {
+        "id": tenant_id,
+        "monitoringInterval": interval,
+        "incidentInterval": 300,
+        "websites": [{"id": f"{tenant_id}-w{i}", "url": f"https://{tenant_id}-{i}.test"} for i in range(sites)],
+    }
+
+
+def test_due_websites_of_a_tenant_share_one_run(scheduler):
+    async def scenario():
+        s = scheduler()
+        for t in (tenant("a", 3), tenant("b", 2)):
+            for key, (interval, data) in s._tenant_jobs(t).items():
+                s.timers.schedule(key, 100.0, (interval, data))
+        queued = s.submit_due(100.0)
+        return s, queued
+
+    s, queued = asyncio.run(scenario())
+    # monitoring and incident for each tenant
+    assert queued == 4
+    run = s._scheduled["scheduled:monitoring:a"]
+    assert [w["id"] for w in run.payload["websites"]] == ["a-w0", "a-w1", "a-w2"]
+    assert run.payload["jobs"] == {"a:a-w0": 100.0, "a:a-w1": 100.0, "a:a-w2": 100.0}
+    assert s._scheduled["scheduled:incident:b"].payload["websites"] == []
+    # Rescheduled one interval later
+    assert s.timers.get(("monitoring", "a", "a-w0"))[0] == 160.0
+
+
+def test_jobs_join_a_queued_run_or_follow_a_running_one(scheduler):
+    async def scenario():
+        s = scheduler()
+        s.running = True
+        job = lambda site: (("monitoring", "a", site), 0.0, {"website": {"id": site}})
+        assert s.submit_scheduled("monitoring", "a", [job("w0")]) == 0
+        # Still queued: a newly due website joins, a repeat is skipped
+        assert s.submit_scheduled("monitoring", "a", [job("w1"), job("w0")]) == 1
+        run = s._scheduled["scheduled:monitoring:a"]
+        assert [w["id"] for w in run.payload["websites"]] == ["w0", "w1"]
+
+        # Running: websites in the run are skipped, others wait for it
+        s.pool.queue.remove(run.task_id)
+        s.pool.running[run.task_id] = None
+        assert s.submit_scheduled("monitoring", "a", [job("w1"), job("w2")]) == 1
+        assert s.submit_scheduled("monitoring", "a", [job("w2")]) == 1
+        del s.pool.running[run.task_id]
+        await s._on_work_finished(run, "completed", None)
+        return s
+
+    s = asyncio.run(scenario())
+    followup = s._scheduled["scheduled:monitoring:a"]
+    assert [w["id"] for w in followup.payload["websites"]] == ["w2"]
+    assert "scheduled:monitoring:a" in s.pool.queued_ids()
+
+
+def test_jobs_due_within_the_batch_window_run_together(scheduler):
+    async def scenario():
+        s = scheduler()
+        s.schedule_batch_window = 1.0
+        s.timers.schedule(("monitoring", "a", "w0"), 100.0, (30, {"website": {"id": "w0"}}))
+        s.timers.schedule(("monitoring", "a", "w1"), 100.0 + 1e-9, (60, {"website": {"id": "w1"}}))
+        s.timers.schedule(("monitoring", "a", "w2"), 105.0, (60, {"website": {"id": "w2"}}))
+        return s, s.submit_due(100.0)
+
+    s, queued = asyncio.run(scenario())
+    assert queued == 1
+    assert list(s._scheduled["scheduled:monitoring:a"].payload["jobs"]) == ["a:w0", "a:w1"]
+    assert s.timers.get(("monitoring", "a", "w2"))[0] == 105.0
+
+
+def test_deferred_runs_stay_out_of_the_pool_and_leave_claims_alone(scheduler):
+    async def scenario():
+        s = scheduler()
+        # Runs queued before admission tightened are held in the pool
+        for i in range(40):
+            s.submit_scheduled("incident", f"held-{i}", [(("incident", f"held-{i}", None), 0.0, {})])
+        s.admission.state = "defer"
+        for i in range(40):
+            for key, (interval, data) in s._tenant_jobs(tenant(f"t{i}", 1)).items():
+                s.timers.schedule(key, 100.0, (interval, data))
+        queued = s.submit_due(100.0)
+        claimed = await s.claim_tasks()
+        return s, queued, claimed
+
+    s, queued, claimed = asyncio.run(scenario())
+    assert queued == 0
+    assert len(s._scheduled) == 40
+    # Held runs do not use the claim budget, and newly due ones are not queued
+    assert s.claims == [32]
+    assert claimed == 32
+    assert len(s.pool.queue) == 72
+    # Timers keep their regular slot; the deferred jobs wait outside the pool
+    assert s.timers.get(("monitoring", "t0", "t0-w0"))[0] == 160.0
+    assert len(s._deferred) == 80
+    assert s.admission.decisions["deferred"] == 80
+
+    s.admission.state = "open"
+    assert s.submit_deferred() == 80
+    assert not s._deferred
+    run = s._scheduled["scheduled:monitoring:t0"]
+    assert run.payload["jobs"] == {"t0:t0-w0": 100.0}
+
+
+def test_defer_keeps_each_jobs_phase(scheduler):
+    s = scheduler()
+    for i in range(300):
+        for key, (interval, data) in s._tenant_jobs(tenant(f"t{i}", 1)).items():
+            if key[0] == "monitoring":
+                s.timers.schedule(key, 1000.0 + (i * 7.3) % 60, (interval, data))
+    phases = lambda: {int(s.timers.get(key)[0]) % 60 for key in s.timers.keys()}
+    before = phases()
+
+    # One minute open, two deferred, two open again
+    defer_from, defer_until, end = 1060.0, 1180.0, 1300.0
+    while s.timers.next_due() <= end:
+        now = s.timers.next_due()
+        if defer_from <= now < defer_until:
+            s.admission.state = "defer"
+        elif s.admission.state == "defer":
+            s.admission.state = "open"
+            s.submit_deferred()
+        s.submit_due(now)
+        for task_id in s.pool.queued_ids():
+            s.pool.cancel(task_id)
+
+    assert len(before) == 60
+    assert phases() == before
+
+
+def test_drain_releases_unfinished_tasks_with_their_finished_phases(monkeypatch):
+    monkeypatch.delenv("AGENT_JOURNAL_PATH", raising=False)
+    posts = {}
+
+    def handler(request):
+        body = json.loads(request.content) if request.content else {}
+        posts.setdefault(request.url.path, []).append(body)
+        if request.url.path == "/api/agent-tasks/status":
+            return httpx.Response(200, json={"results": [{"id": u["id"], "ok": True} for u in body["updates"]]})
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(
+        scheduler_module, "create_http_client",
+        lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    async def scenario():
+        s = AgentScheduler(api_base_url="http://app.test")
+        agent = s.agents[AgentType.RCA]
+        gathered = asyncio.Event()
+
+        async def gather():
+            return {"logs": 3}
+
+        async def execute(context):
+            await agent.phase("triage", gather)
+            await agent.phase("gather", gather)
+            if context.input_data.get("slow"):
+                gathered.set()
+                await asyncio.sleep(60)
+            return AgentResult(success=True, output={})
+
+        agent.execute = execute
+        s.pool.start()
+        # Handed over by another replica with its first phase done
+        s.submit_task({"id": "slow", "agentType": "RCA", "input": {"slow": True}, "checkpoints": {"triage": "earlier"}})
+        s.submit_task({"id": "quick", "agentType": "RCA"})
+        await gathered.wait()
+        await s.drain(timeout=0.05)
+        await s.http.aclose()
+        return s
+
+    s = asyncio.run(scenario())
+    assert posts["/api/agent-tasks/release"] == [{
+        "workerId": s.worker_id,
+        "tasks": [{"id": "slow", "checkpoints": {"triage": "earlier", "gather": {"logs": 3}}}],
+    }]
+    statuses = {u["id"]: u["status"] for batch in posts["/api/agent-tasks/status"] for u in batch["updates"]}
+    # The released task is left for the next claimant, not marked cancelled
+    assert statuses == {"quick": "COMPLETED"}
+    assert not s._checkpoints and not s._releasing
@@ -0,0 +1,133 @@
+import asyncio
+
+from core.base_agent import AgentContext, AgentResult, AgentType, BaseAgent
+from core.llm_cache import MemoryLLMCache
+from core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_flight():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "reply"
+
+        results = await asyncio.gather(*(flights.do("k", fetch) for _ in range(5)))
+        return flights, calls, results
+
+    flights, calls, results = asyncio.run(scenario())
+    assert results == ["reply"] * 5
+    assert len(calls) == 1
+    assert flights.stats() == {"calls": 1, "collapsed": 4, "in_flight": 0}
+
+
+def test_cancelled_waiter_leaves_the_call_running_for_others():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "reply"
+
+        first = asyncio.ensure_future(flights.do("k", fetch))
+        second = asyncio.ensure_future(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second, flights
+
+    first, second, flights = asyncio.run(scenario())
+    assert first.cancelled()
+    assert second == "reply"
+    assert flights.in_flight == 0
+
+
+def test_call_is_cancelled_when_every_waiter_is():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        waiters = [asyncio.ensure_future(flights.do("k", fetch)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flights, cancelled, waiters
+
+    flights, cancelled, waiters = asyncio.run(scenario())
+    assert all(w.cancelled() for w in waiters)
+    assert cancelled == [True]
+    assert flights.in_flight == 0
+
+
+def test_leader_error_reaches_every_waiter_and_the_key_is_released():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        results = await asyncio.gather(
+            flights.do("k", failing), flights.do("k", failing), return_exceptions=True
+        )
+        assert flights.in_flight == 0
+
+        async def ok():
+            return "reply"
+
+        # The next call starts a new flight instead of reusing the failed one
+        return results, await flights.do("k", ok), flights
+
+    results, retried, flights = asyncio.run(scenario())
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+    assert retried == "reply"
+    assert flights.calls == 2
+
+
+class StubAgent(BaseAgent):
+    name = "stub"
+    description = "Answers from a counter"
+    capabilities = []
+    llm_cache_ttl = 60.0
+
+    async def execute(self, context: AgentContext) -> AgentResult:
+        return AgentResult(success=True, output={})
+
+
+def test_max_tokens_is_part_of_the_cache_and_flight_key(monkeypatch):
+    monkeypatch.setattr(BaseAgent, "llm_flights", SingleFlight())
+    agent = StubAgent(AgentType.MONITORING, llm_cache=MemoryLLMCache())
+    calls = []
+
+    async def call_llm(prompt, system_prompt, temperature, max_tokens):
+        calls.append(max_tokens)
+        return f"reply in {max_tokens} tokens"
+
+    agent._call_llm = call_llm
+
+    async def scenario():
+        long = await agent.ask_llm("summarize", max_tokens=2000)
+        short = await agent.ask_llm("summarize", max_tokens=50)
+        again = await agent.ask_llm("summarize", max_tokens=50)
+        return long, short, again
+
+    long, short, again = asyncio.run(scenario())
+    assert long == "reply in 2000 tokens"
+    assert short == again == "reply in 50 tokens"
+    assert calls == [2000, 50]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import httpx
+
+from core.status_updates import StatusBatcher
+
+
+def make_batcher(handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return StatusBatcher(client, "http://app.test", max_delay=10.0)
+
+
+def ok(updates):
+    return httpx.Response(200, json={"results": [{"id": u["id"], "ok": True} for u in updates]})
+
+
+def test_transitions_of_a_task_are_coalesced_into_one_row():
+    posts = []
+
+    def handler(request):
+        assert request.url.path == "/api/agent-tasks/status"
+        posts.append(json.loads(request.content)["updates"])
+        return ok(posts[-1])
+
+    async def scenario():
+        status = make_batcher(handler)
+        status.add("t1", {"status": "RUNNING", "startedAt": "2026-01-01T00:00:00Z", "error": None})
+        status.add("t2", {"status": "RUNNING"})
+        status.add("t1", {"status": "COMPLETED", "output": {"ok": True}})
+        await status.flush()
+        return status
+
+    status = asyncio.run(scenario())
+    assert posts == [[
+        {"id": "t1", "status": "COMPLETED", "startedAt": "2026-01-01T00:00:00Z", "output": {"ok": True}},
+        {"id": "t2", "status": "RUNNING"},
+    ]]
+    assert status.stats()["coalesced"] == 1
+    assert len(status) == 0
+
+
+def test_failed_batches_are_retried_and_rejections_counted():
+    attempts = []
+
+    def handler(request):
+        attempts.append(1)
+        if len(attempts) == 1:
+            return httpx.Response(503)
+        updates = json.loads(request.content)["updates"]
+        return httpx.Response(200, json={"results": [
+            {"id": u["id"], "ok": u["id"] != "gone", "error": "task not found"} for u in updates
+        ]})
+
+    async def scenario():
+        status = make_batcher(handler)
+        status._batcher.max_backoff = 0.01
+        status.add("t1", {"status": "COMPLETED"})
+        status.add("gone", {"status": "FAILED"})
+        await status.flush()
+        return status
+
+    status = asyncio.run(scenario())
+    assert len(attempts) == 2
+    stats = status.stats()
+    assert stats["failures"] == 1
+    assert stats["rejected"] == 1
+    assert stats["flushed"] == 2
+    assert stats["pending"] == 0
+
+
+def test_update_arriving_in_flight_is_sent_next():
+    posts = []
+    status = None
+
+    async def handler(request):
+        updates = json.loads(request.content)["updates"]
+        posts.append(updates)
+        if len(posts) == 1:
+            # The task finishes while its RUNNING update is being sent
+            status.add("t1", {"status": "COMPLETED"})
+        return ok(updates)
+
+    async def scenario():
+        nonlocal status
+        status = make_batcher(handler)
+        status.add("t1", {"status": "RUNNING"})
+        await status.flush()
+        await status.flush()
+
+    asyncio.run(scenario())
+    assert posts == [[{"id": "t1", "status": "RUNNING"}], [{"id": "t1", "status": "COMPLETED"}]]
@@ -0,0 +1,225 @@
+import asyncio
+
+from core.worker_pool import FairTaskQueue, PriorityTaskQueue, WorkerPool, WorkItem, task_priority
+
+
+def item(task_id, agent_type="monitoring", priority=0.0, enqueued_at=0.0, preemptible=False, tenant_id=None, weight=1.0):
+    return WorkItem(
+        task_id=task_id,
+        agent_type=agent_type,
+        payload={},
+        priority=priority,
+        enqueued_at=enqueued_at,
+        preemptible=preemptible,
+        tenant_id=tenant_id,
+        weight=weight,
+    )
+
+
+def drain(queue, eligible=lambda item: True):
+    ids = []
+    while True:
+        popped = queue.pop(eligible)
+        if popped is None:
+            return ids
+        ids.append(popped.task_id)
+
+
+def test_task_priority_combines_severity_and_trigger():
+    assert task_priority("critical", "incident") == 4200.0
+    assert task_priority("HIGH", "manual") == 1200.0
+    assert task_priority(None, "scheduled") == 0.0
+    assert task_priority("unknown", None) == 0.0
+
+
+def test_priority_queue_orders_by_age_minus_priority():
+    queue = PriorityTaskQueue()
+    queue.push(item("routine", enqueued_at=100.0))
+    queue.push(item("critical", "rca", priority=task_priority("critical", "incident"), enqueued_at=200.0))
+    queue.push(item("manual", "rca", priority=task_priority(None, "manual"), enqueued_at=150.0))
+    # Aging: a routine run that waited an hour goes ahead of a fresh critical one
+    queue.push(item("old", enqueued_at=-5000.0))
+    assert drain(queue) == ["old", "critical", "manual", "routine"]
+
+
+def test_priority_queue_skips_ineligible_classes():
+    queue = PriorityTaskQueue()
+    for i in range(1000):
+        queue.push(item(f"m{i}", "monitoring", enqueued_at=float(i)))
+    for i in range(1000):
+        queue.push(item(f"s{i}", "rca", preemptible=True, enqueued_at=float(i)))
+    queue.push(item("rca", "rca", enqueued_at=5000.0))
+
+    checked = []
+
+    def eligible(candidate):
+        checked.append(candidate.task_id)
+        # monitoring at its type limit, preemptible runs held
+        return candidate.agent_type != "monitoring" and not candidate.preemptible
+
+    assert queue.pop(eligible).task_id == "rca"
+    # One head per class was looked at, not every queued item
+    assert len(checked) <= 3
+    assert queue.pop(eligible) is None
+    assert len(queue) == 2000
+
+
+def test_priority_queue_lazy_remove():
+    queue = PriorityTaskQueue()
+    for i in range(5):
+        queue.push(item(f"t{i}", enqueued_at=float(i)))
+    assert queue.remove("t0").task_id == "t0"
+    assert queue.remove("t0") is None
+    assert queue.remove("t3").task_id == "t3"
+    assert len(queue) == 3
+    assert queue.peek(lambda i: True).task_id == "t1"
+    assert drain(queue) == ["t1", "t2", "t4"]
+    assert len(queue) == 0
+
+
+def test_fair_queue_shares_by_weight():
+    queue = FairTaskQueue()
+    for i in range(100):
+        queue.push(item(f"big{i}", tenant_id="big", weight=2.0, enqueued_at=float(i)))
+    for i in range(3):
+        queue.push(item(f"small{i}", tenant_id="small", enqueued_at=50.0 + i))
+    first = [queue.pop(lambda i: True).tenant_id for _ in range(9)]
+    # The small tenant is not stuck behind the big tenant's backlog
+    assert first.count("small") == 3
+    assert first.count("big") == 6
+    assert len(queue) == 94
+
+
+def test_fair_queue_urgent_items_bypass_rotation():
+    queue = FairTaskQueue(urgent_priority=3600.0)
+    for i in range(10):
+        queue.push(item(f"t{i}", tenant_id="a", enqueued_at=float(i)))
+    queue.push(item("incident", "rca", priority=4200.0, tenant_id="b", enqueued_at=100.0))
+    assert queue.peek(lambda i: True).task_id == "incident"
+    assert queue.pop(lambda i: True).task_id == "incident"
+
+
+def test_fair_queue_skips_blocked_classes_without_scanning_tenants():
+    queue = FairTaskQueue()
+    for t in range(500):
+        queue.push(item(f"m{t}", "monitoring", tenant_id=f"tenant-{t}", enqueued_at=float(t)))
+    queue.push(item("rca", "rca", tenant_id="tenant-0", enqueued_at=1000.0))
+
+    checked = []
+
+    def eligible(candidate):
+        checked.append(candidate.task_id)
+        return candidate.agent_type != "monitoring"
+
+    assert queue.pop(eligible).task_id == "rca"
+    assert queue.pop(eligible) is None
+    assert len(checked) <= 3
+    assert len(drain(queue)) == 500
+
+
+def test_fair_queue_remove_and_tenant_stats():
+    queue = FairTaskQueue()
+    queue.push(item("a1", tenant_id="a", enqueued_at=0.0))
+    queue.push(item("a2", tenant_id="a", enqueued_at=1.0))
+    queue.push(item("b1", tenant_id="b", enqueued_at=2.0))
+    assert queue.remove("a1").task_id == "a1"
+    assert queue.remove("a1") is None
+    assert len(queue) == 2
+
+    stats = queue.tenant_stats()
+    assert stats["a"]["queued"] == 1 and stats["b"]["queued"] == 1
+    assert drain(queue) == ["a2", "b1"]
+    stats = queue.tenant_stats()
+    assert stats["a"] == {**stats["a"], "queued": 0, "served": 1}
+    assert stats["b"]["served"] == 1
+
+
+def run_pool(items, **kwargs):
+    started = []
+
+    async def handler(work):
+        started.append(work.task_id)
+        await asyncio.sleep(work.payload.get("duration", 0.01))
+
+    async def scenario():
+        outcomes = {}
+
+        async def on_finished(work, outcome, error):
+            outcomes[work.task_id] = outcome
+
+        pool = WorkerPool(handler, on_finished=on_finished, queue=PriorityTaskQueue(), **kwargs)
+        for work in items:
+            pool.submit(work)
+        pool.start()
+        while len(outcomes) < len(items):
+            await asyncio.sleep(0.005)
+        await pool.stop()
+        return pool, outcomes
+
+    pool, outcomes = asyncio.run(scenario())
+    return pool, started, outcomes
+
+
+def test_pool_respects_type_limits_and_priority():
+    items = [item(f"m{i}", "monitoring", enqueued_at=float(i)) for i in range(4)]
+    items.append(item("rca", "rca", priority=4200.0, enqueued_at=10.0))
+    pool, started, outcomes = run_pool(items, max_workers=2, type_limits={"monitoring": 1})
+    assert started[0] == "rca"
+    assert set(outcomes.values()) == {"completed"}
+    assert pool.stats()["completed"] == 5
+
+
+def test_pool_preempts_a_scheduled_run_for_urgent_work():
+    urgent = task_priority("high", "incident")
+    scheduled = item("scheduled", "monitoring", preemptible=True)
+    scheduled.payload["duration"] = 5.0
+    critical = item("critical", "rca", priority=task_priority("critical", "incident"))
+
+    async def scenario():
+        outcomes = {}
+
+        async def handler(work):
+            await asyncio.sleep(work.payload.get("duration", 0.01))
+
+        async def on_finished(work, outcome, error):
+            outcomes[work.task_id] = outcome
+
+        pool = WorkerPool(handler, max_workers=1, on_finished=on_finished,
+                          queue=PriorityTaskQueue(), preempt_priority=urgent)
+        pool.start()
+        pool.submit(scheduled)
+        await asyncio.sleep(0.02)
+        pool.submit(critical)
+        while len(outcomes) < 2:
+            await asyncio.sleep(0.005)
+        await pool.stop()
+        return outcomes
+
+    assert asyncio.run(scenario()) == {"scheduled": "preempted", "critical": "completed"}
+
+
+def test_pool_holds_deferred_items_until_woken():
+    held = {"on": True}
+
+    async def scenario():
+        done = []
+
+        async def handler(work):
+            done.append(work.task_id)
+
+        pool = WorkerPool(handler, queue=PriorityTaskQueue(),
+                          hold=lambda work: work.preemptible and held["on"])
+        pool.submit(item("scheduled", preemptible=True))
+        pool.submit(item("manual", "rca"))
+        pool.start()
+        await asyncio.sleep(0.02)
+        before = list(done)
+        held["on"] = False
+        pool.wake()
+        await asyncio.sleep(0.02)
+        await pool.stop()
+        return before, done
+
+    before, after = asyncio.run(scenario())
+    assert before == ["manual"]
+    assert after == ["manual", "scheduled"]
@@ -0,0 +1,50 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+
+const MAX_LOGS_PER_REQUEST = 1000;
+
+// POST - Append a batch of log entries to an agent task (for scheduler)
+export async function POST(
+  request: Request,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const { id } = await params;
+    const body = await request.json();
+
+    // Accept either { logs: [...] } or a single log entry
+    const entries: any[] = Array.isArray(body?.logs) ? body.logs : [body];
+
+    if (entries.length > MAX_LOGS_PER_REQUEST) {
+      return NextResponse.json(
+        { error: `At most ${MAX_LOGS_PER_REQUEST} logs per request` },
+        { status: 400 }
+      );
+    }
+
+    const data = entries
+      .filter((entry) => entry && entry.message)
+      .map((entry) => ({
+        taskId: id,
+        level: entry.level || "info",
+        message: String(entry.message),
+        data: entry.data ?? undefined,
+        timestamp: entry.timestamp ? new Date(entry.timestamp) : new Date(),
+      }));
+
+    const result = await prisma.agentTaskLog.createMany({ data });
+
+    return NextResponse.json({ count: result.count });
+  } catch (error) {
+    console.error("Error saving agent task logs:", error);
+    return NextResponse.json(
+      { error: "Failed to save agent task logs" },
+      { status: 500 }
+    );
+  }
+}
@@ -1,6 +1,7 @@
 import { NextResponse } from "next/server";
 import { auth } from "@/lib/auth";
 import { prisma } from "@/lib/db";
+import { applyTaskUpdate, buildTaskUpdate } from "@/lib/agent-task-status";
 
 // GET - Get single agent task
 export async function GET(
@@ -53,23 +54,20 @@ export async function PATCH(
     // Allow internal updates without session for scheduler
     const { id } = await params;
     const body = await request.json();
-    const { status, output, errorMessage, startedAt, completedAt } = body;
-
-    const updateData: any = {};
-    if (status) updateData.status = status.toUpperCase();
-    if (output !== undefined) updateData.output = output;
-    if (errorMessage !== undefined) updateData.errorMessage = errorMessage;
-    if (startedAt) updateData.startedAt = new Date(startedAt);
-    if (completedAt) updateData.completedAt = new Date(completedAt);
-
-    // Set startedAt if moving to RUNNING
-    if (status === "RUNNING" && !startedAt) {
-      updateData.startedAt = new Date();
+    const { workerId } = body;
+
+    // A scheduler replica may only update tasks it still holds the lease on
+    if (workerId) {
+      const count = await applyTaskUpdate(id, body);
+      if (count === 0) {
+        return NextResponse.json({ error: "Lease not held" }, { status: 409 });
+      }
+      return NextResponse.json({ updated: count });
     }
 
     const task = await prisma.agentTask.update({
       where: { id },
-      data: updateData,
+      data: buildTaskUpdate(body),
     });
 
     return NextResponse.json({ task });
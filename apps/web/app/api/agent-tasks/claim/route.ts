@@ -0,0 +1,90 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+
+const MAX_CLAIM = 100;
+
+// POST - Atomically claim pending tasks for a scheduler replica
+// Rows are locked with FOR UPDATE SKIP LOCKED so concurrent claims never
+// hand the same task to two replicas. Tasks whose lease expired (the
+// owning replica died) are claimed again.
+// Tasks are claimed in priority order: createdAt minus a boost for incident
+// severity and trigger, so urgent work goes first while older tasks still
+// age ahead. The boosts match SEVERITY_PRIORITY / TRIGGER_PRIORITY in the
+// agents' worker pool.
+// `resume` lists tasks a restarted replica journaled but never finished;
+// those still leased to the same workerId are returned again at once.
+// `shard`/`shards` restrict new claims to tenants hashing to one scheduler
+// process; the hash matches tenant_shard() in the agents' scheduler.
+export async function POST(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const body = await request.json();
+    const { workerId } = body;
+    const requested = Math.min(parseInt(body.limit ?? "10"), MAX_CLAIM);
+    const limit = requested > 0 ? requested : 0;
+    const leaseSeconds = parseFloat(body.leaseSeconds ?? "60");
+    const resume: string[] = Array.isArray(body.resume) ? body.resume : [];
+    const shards = Math.max(1, parseInt(body.shards ?? "1") || 1);
+    const shard = parseInt(body.shard ?? "0") || 0;
+
+    if (!workerId) {
+      return NextResponse.json({ error: "workerId is required" }, { status: 400 });
+    }
+    if (limit === 0 && resume.length === 0) {
+      return NextResponse.json({ tasks: [] });
+    }
+
+    const tasks = await prisma.$queryRaw<any[]>`
+      UPDATE "agent_tasks"
+      SET "status" = 'RUNNING'::"AgentTaskStatus",
+          "leaseOwner" = ${workerId},
+          "leaseExpiresAt" = NOW() + make_interval(secs => ${leaseSeconds}),
+          "startedAt" = COALESCE("startedAt", NOW()),
+          "attempts" = "attempts" + 1,
+          "updatedAt" = NOW()
+      WHERE "id" IN (
+        SELECT t."id" FROM "agent_tasks" t
+        LEFT JOIN "incidents" i ON i."id" = t."incidentId"
+        WHERE (${limit > 0} AND (
+              t."status" = 'PENDING'::"AgentTaskStatus"
+           OR (t."status" = 'RUNNING'::"AgentTaskStatus" AND t."leaseExpiresAt" < NOW()))
+           AND (${shards} = 1
+             OR ('x' || substr(md5(t."tenantId"), 1, 15))::bit(60)::bigint % ${shards} = ${shard}))
+           OR (t."status" = 'RUNNING'::"AgentTaskStatus"
+               AND t."leaseOwner" = ${workerId}
+               AND t."id" = ANY(${resume}::text[]))
+        ORDER BY t."createdAt" - make_interval(secs =>
+          CASE i."severity"
+            WHEN 'CRITICAL' THEN 3600
+            WHEN 'HIGH' THEN 900
+            WHEN 'MEDIUM' THEN 120
+            ELSE 0
+          END +
+          CASE t."trigger"
+            WHEN 'incident' THEN 600
+            WHEN 'manual' THEN 300
+            WHEN 'webhook' THEN 300
+            ELSE 0
+          END
+        ) ASC
+        LIMIT ${limit + resume.length}
+        FOR UPDATE OF t SKIP LOCKED
+      )
+      RETURNING "agent_tasks".*,
+        (SELECT "severity" FROM "incidents" WHERE "id" = "agent_tasks"."incidentId") AS "incidentSeverity",
+        (SELECT "plan" FROM "tenants" WHERE "id" = "agent_tasks"."tenantId") AS "tenantPlan"
+    `;
+
+    return NextResponse.json({ tasks });
+  } catch (error) {
+    console.error("Error claiming agent tasks:", error);
+    return NextResponse.json(
+      { error: "Failed to claim agent tasks" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,46 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+
+// POST - Extend the leases a scheduler replica holds
+// Returns the task ids whose lease was renewed and those the replica no
+// longer owns (expired and reclaimed, or finished elsewhere).
+export async function POST(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const body = await request.json();
+    const { workerId } = body;
+    const taskIds: string[] = Array.isArray(body.taskIds) ? body.taskIds : [];
+    const leaseSeconds = parseFloat(body.leaseSeconds ?? "60");
+
+    if (!workerId) {
+      return NextResponse.json({ error: "workerId is required" }, { status: 400 });
+    }
+    if (taskIds.length === 0) {
+      return NextResponse.json({ renewed: [], lost: [] });
+    }
+
+    const rows = await prisma.$queryRaw<{ id: string }[]>`
+      UPDATE "agent_tasks"
+      SET "leaseExpiresAt" = NOW() + make_interval(secs => ${leaseSeconds})
+      WHERE "id" = ANY(${taskIds})
+        AND "leaseOwner" = ${workerId}
+        AND "status" = 'RUNNING'::"AgentTaskStatus"
+      RETURNING "id"
+    `;
+
+    const renewed = rows.map((row) => row.id);
+    const lost = taskIds.filter((id) => !renewed.includes(id));
+
+    return NextResponse.json({ renewed, lost });
+  } catch (error) {
+    console.error("Error renewing agent task leases:", error);
+    return NextResponse.json(
+      { error: "Failed to renew agent task leases" },
+      { status: 500 }
+    );
+  }
+}
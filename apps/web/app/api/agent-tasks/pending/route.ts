@@ -0,0 +1,68 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+import { waitForTaskCreated } from "@/lib/task-events";
+
+export const dynamic = "force-dynamic";
+
+const MAX_WAIT_SECONDS = 30;
+
+async function findPending(since: Date | null, limit: number) {
+  return prisma.agentTask.findMany({
+    where: {
+      status: "PENDING",
+      ...(since ? { createdAt: { gt: since } } : {}),
+    },
+    orderBy: { createdAt: "asc" },
+    take: limit,
+  });
+}
+
+// GET - Long-poll for pending agent tasks (for scheduler)
+// Returns immediately when tasks newer than `since` exist, otherwise waits
+// up to `wait` seconds for one to be created.
+export async function GET(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const { searchParams } = new URL(request.url);
+    const sinceParam = searchParams.get("since");
+    const since = sinceParam ? new Date(sinceParam) : null;
+    const limit = parseInt(searchParams.get("limit") || "50");
+    const wait = Math.min(
+      parseFloat(searchParams.get("wait") || "25"),
+      MAX_WAIT_SECONDS
+    );
+
+    const startedAt = new Date();
+
+    // Listen before querying so a task created in between is not missed.
+    // Only tasks created on this instance wake the wait right away; with
+    // several web replicas, AGENT_TASK_WATCH_MS covers the others (see
+    // lib/task-events.ts), otherwise they are found after the wait times out.
+    const controller = new AbortController();
+    request.signal.addEventListener("abort", () => controller.abort());
+    const created = waitForTaskCreated(wait * 1000, controller.signal);
+
+    let tasks = await findPending(since, limit);
+
+    if (tasks.length === 0 && wait > 0 && (await created)) {
+      tasks = await findPending(since, limit);
+    }
+    controller.abort();
+
+    const cursor = tasks.length
+      ? tasks[tasks.length - 1].createdAt.toISOString()
+      : (since ?? startedAt).toISOString();
+
+    return NextResponse.json({ tasks, cursor });
+  } catch (error) {
+    console.error("Error polling pending agent tasks:", error);
+    return NextResponse.json(
+      { error: "Failed to poll pending agent tasks" },
+      { status: 500 }
+    );
+  }
+}
@@ -0,0 +1,53 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+
+// POST - Return unfinished tasks to PENDING so another replica can claim them
+// A draining scheduler sends `tasks: [{ id, checkpoints }]` with the phases
+// each task already finished; the next claimant resumes from them.
+export async function POST(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const body = await request.json();
+    const { workerId } = body;
+    const tasks: { id: string; checkpoints?: Record<string, unknown> }[] = Array.isArray(body.tasks)
+      ? body.tasks.filter((task: any) => task && typeof task.id === "string")
+      : [];
+    const taskIds: string[] = Array.isArray(body.taskIds) ? body.taskIds : [];
+
+    if (!workerId) {
+      return NextResponse.json({ error: "workerId is required" }, { status: 400 });
+    }
+
+    const release = (ids: string[], checkpoints?: Record<string, unknown>) => {
+      const data: any = { status: "PENDING", leaseOwner: null, leaseExpiresAt: null };
+      if (checkpoints && Object.keys(checkpoints).length > 0) data.checkpoints = checkpoints;
+      return prisma.agentTask.updateMany({
+        where: {
+          id: { in: ids },
+          leaseOwner: workerId,
+          status: "RUNNING",
+        },
+        data,
+      });
+    };
+
+    const results = await prisma.$transaction([
+      ...(taskIds.length > 0 ? [release(taskIds)] : []),
+      ...tasks.map((task) => release([task.id], task.checkpoints)),
+    ]);
+
+    return NextResponse.json({
+      released: results.reduce((sum, result) => sum + result.count, 0),
+    });
+  } catch (error) {
+    console.error("Error releasing agent tasks:", error);
+    return NextResponse.json(
+      { error: "Failed to release agent tasks" },
+      { status: 500 }
+    );
+  }
+}
@@ -2,6 +2,11 @@ import { NextResponse } from "next/server";
 import { auth } from "@/lib/auth";
 import { prisma } from "@/lib/db";
 import { inngest } from "@/lib/inngest";
+import { notifyTaskCreated } from "@/lib/task-events";
+
+// When set to "scheduler", new tasks are queued for the Python agent
+// scheduler instead of being dispatched through Inngest
+const AGENT_EXECUTOR = process.env.AGENT_EXECUTOR || "inngest";
 
 // GET - List agent tasks
 export async function GET(request: Request) {
@@ -63,6 +68,8 @@ export async function POST(request: Request) {
       );
     }
 
+    const queueForScheduler = AGENT_EXECUTOR === "scheduler";
+
     // Create task record
     const task = await prisma.agentTask.create({
       data: {
@@ -74,11 +81,17 @@ export async function POST(request: Request) {
         websiteId,
         incidentId,
         tenantId: session.user.tenantId,
-        status: "RUNNING",
-        startedAt: new Date(),
+        status: queueForScheduler ? "PENDING" : "RUNNING",
+        startedAt: queueForScheduler ? null : new Date(),
       },
     });
 
+    if (queueForScheduler) {
+      // Wake any scheduler long-polling for work
+      notifyTaskCreated(task);
+      return NextResponse.json({ task });
+    }
+
     // Trigger the appropriate Inngest function based on agent type
     const eventData = {
       taskId: task.id,
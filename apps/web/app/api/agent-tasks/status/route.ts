@@ -0,0 +1,59 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+import { buildTaskUpdate, TaskStatusUpdate } from "@/lib/agent-task-status";
+
+const MAX_UPDATES_PER_REQUEST = 500;
+
+// POST - Apply a batch of task status updates (for scheduler)
+// Each update is { id, status, output?, errorMessage?, completedAt?, workerId? }.
+// Updates carrying a workerId only apply while that worker holds the lease;
+// the per-update result says which ones were rejected.
+export async function POST(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const body = await request.json();
+    const updates: (TaskStatusUpdate & { id: string })[] = Array.isArray(body?.updates)
+      ? body.updates.filter((u: any) => u && u.id)
+      : [];
+
+    if (updates.length > MAX_UPDATES_PER_REQUEST) {
+      return NextResponse.json(
+        { error: `At most ${MAX_UPDATES_PER_REQUEST} updates per request` },
+        { status: 400 }
+      );
+    }
+
+    const counts = await prisma.$transaction(
+      updates.map((update) =>
+        prisma.agentTask.updateMany({
+          where: update.workerId
+            ? { id: update.id, leaseOwner: update.workerId }
+            : { id: update.id },
+          data: buildTaskUpdate(update),
+        })
+      )
+    );
+
+    const results = updates.map((update, i) =>
+      counts[i].count > 0
+        ? { id: update.id, ok: true }
+        : {
+            id: update.id,
+            ok: false,
+            error: update.workerId ? "Lease not held" : "Task not found",
+          }
+    );
+
+    return NextResponse.json({ results });
+  } catch (error) {
+    console.error("Error applying agent task status updates:", error);
+    return NextResponse.json(
+      { error: "Failed to apply agent task status updates" },
+      { status: 500 }
+    );
+  }
+}
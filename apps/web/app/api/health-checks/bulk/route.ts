@@ -0,0 +1,113 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+
+const MAX_CHECKS_PER_REQUEST = 1000;
+const STATUSES = ["up", "slow", "degraded", "down", "error", "unknown"];
+
+function parseDate(value: unknown): Date | null {
+  if (value === undefined || value === null) return null;
+  const date = new Date(value as string);
+  return isNaN(date.getTime()) ? null : date;
+}
+
+// Reason a check cannot be stored, or null if it is valid
+function checkError(check: any, websiteIds: Set<string>): string | null {
+  if (!check || typeof check.websiteId !== "string") return "websiteId is required";
+  if (!websiteIds.has(check.websiteId)) return "Website not found";
+  if (!STATUSES.includes(check.status)) return `Invalid status: ${check.status}`;
+  if (check.statusCode != null && !Number.isInteger(check.statusCode)) return "statusCode must be an integer";
+  if (check.responseTime != null && !Number.isFinite(check.responseTime)) return "responseTime must be a number";
+  if (check.checkedAt != null && !parseDate(check.checkedAt)) return "Invalid checkedAt";
+  if (check.sslExpiresAt != null && !parseDate(check.sslExpiresAt)) return "Invalid sslExpiresAt";
+  return null;
+}
+
+// POST - Store a batch of health check results (for the monitoring agent)
+// Each check is { websiteId, status, statusCode?, responseTime?, timings?,
+// errorMessage?, sslValid?, sslExpiresAt?, checkedAt? }. Valid checks go in
+// with one multi-row insert and each website's latest status is updated in
+// one statement; invalid checks are reported per row and skipped.
+export async function POST(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const body = await request.json();
+    const checks: any[] = Array.isArray(body?.checks) ? body.checks : [];
+
+    if (checks.length > MAX_CHECKS_PER_REQUEST) {
+      return NextResponse.json(
+        { error: `At most ${MAX_CHECKS_PER_REQUEST} checks per request` },
+        { status: 400 }
+      );
+    }
+
+    const requestedIds = Array.from(
+      new Set(checks.map((check) => check?.websiteId).filter((id) => typeof id === "string"))
+    );
+    const websites = await prisma.website.findMany({
+      where: { id: { in: requestedIds } },
+      select: { id: true },
+    });
+    const websiteIds = new Set(websites.map((website) => website.id));
+
+    const rows: any[] = [];
+    const results = checks.map((check, index) => {
+      const error = checkError(check, websiteIds);
+      if (error) {
+        return { index, websiteId: check?.websiteId ?? null, ok: false, error };
+      }
+      rows.push({
+        websiteId: check.websiteId,
+        status: check.status,
+        statusCode: check.statusCode ?? null,
+        responseTime: check.responseTime != null ? Math.round(check.responseTime) : null,
+        timings: check.timings ?? undefined,
+        errorMessage: check.errorMessage ?? null,
+        sslValid: check.sslValid ?? null,
+        sslExpiresAt: parseDate(check.sslExpiresAt),
+        checkedAt: parseDate(check.checkedAt) ?? new Date(),
+      });
+      return { index, websiteId: check.websiteId, ok: true };
+    });
+
+    if (rows.length > 0) {
+      // Latest check per website
+      const latest = new Map<string, any>();
+      for (const row of rows) {
+        const current = latest.get(row.websiteId);
+        if (!current || row.checkedAt >= current.checkedAt) latest.set(row.websiteId, row);
+      }
+      const updates = Array.from(latest.values());
+
+      await prisma.$transaction([
+        prisma.healthCheck.createMany({ data: rows }),
+        prisma.$executeRaw`
+          UPDATE "websites" AS w
+          SET "healthStatus" = v."status",
+              "lastHealthCheck" = v."checkedAt",
+              "avgResponseTime" = COALESCE(v."responseTime", w."avgResponseTime"),
+              "updatedAt" = NOW()
+          FROM unnest(
+            ${updates.map((row) => row.websiteId)}::text[],
+            ${updates.map((row) => row.status)}::text[],
+            ${updates.map((row) => row.checkedAt.toISOString())}::timestamp[],
+            ${updates.map((row) => row.responseTime)}::int[]
+          ) AS v("id", "status", "checkedAt", "responseTime")
+          WHERE w."id" = v."id"
+            AND (w."lastHealthCheck" IS NULL OR w."lastHealthCheck" <= v."checkedAt")
+        `,
+      ]);
+    }
+
+    return NextResponse.json({ created: rows.length, results });
+  } catch (error) {
+    console.error("Error storing health checks:", error);
+    return NextResponse.json(
+      { error: "Failed to store health checks" },
+      { status: 500 }
+    );
+  }
+}
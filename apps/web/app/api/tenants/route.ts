@@ -0,0 +1,59 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/db";
+import { requireInternalAuth } from "@/lib/internal-auth";
+
+export const dynamic = "force-dynamic";
+
+const MAX_PAGE_SIZE = 1000;
+
+// GET - Page through active tenants with their schedule settings (for scheduler)
+// A tenant is active when it has at least one verified website that is not
+// paused; only those websites are listed, as in the cron health check.
+// Pages are keyed by tenant id; pass the returned `nextCursor` as `cursor`.
+export async function GET(request: Request) {
+  try {
+    // Internal route for the scheduler: no session, cron secret instead
+    const unauthorized = requireInternalAuth(request);
+    if (unauthorized) return unauthorized;
+
+    const { searchParams } = new URL(request.url);
+    const cursor = searchParams.get("cursor");
+    const limit = Math.min(
+      parseInt(searchParams.get("limit") || "500"),
+      MAX_PAGE_SIZE
+    );
+
+    const activeWebsite = { verified: true, status: { not: "PAUSED" as const } };
+
+    const tenants = await prisma.tenant.findMany({
+      where: {
+        websites: { some: activeWebsite },
+        ...(cursor ? { id: { gt: cursor } } : {}),
+      },
+      select: {
+        id: true,
+        slug: true,
+        plan: true,
+        monitoringInterval: true,
+        incidentInterval: true,
+        websites: {
+          where: activeWebsite,
+          select: { id: true, name: true, url: true, checkInterval: true },
+        },
+      },
+      orderBy: { id: "asc" },
+      take: limit,
+    });
+
+    const nextCursor =
+      tenants.length === limit ? tenants[tenants.length - 1].id : null;
+
+    return NextResponse.json({ tenants, nextCursor });
+  } catch (error) {
+    console.error("Error listing tenants:", error);
+    return NextResponse.json(
+      { error: "Failed to list tenants" },
+      { status: 500 }
+    );
+  }
+}
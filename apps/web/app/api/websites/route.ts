@@ -3,6 +3,8 @@ import { auth } from "@/lib/auth";
 import { prisma } from "@/lib/db";
 import crypto from "crypto";
 
+const MIN_CHECK_INTERVAL = 10;
+
 // GET - List all websites for the tenant
 export async function GET(request: Request) {
   try {
@@ -40,7 +42,7 @@ export async function POST(request: Request) {
       return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
     }
 
-    const { name, url } = await request.json();
+    const { name, url, checkInterval } = await request.json();
 
     if (!name || !url) {
       return NextResponse.json(
@@ -49,6 +51,16 @@ export async function POST(request: Request) {
       );
     }
 
+    if (
+      checkInterval != null &&
+      (!Number.isInteger(checkInterval) || checkInterval < MIN_CHECK_INTERVAL)
+    ) {
+      return NextResponse.json(
+        { error: `checkInterval must be a whole number of seconds, at least ${MIN_CHECK_INTERVAL}` },
+        { status: 400 }
+      );
+    }
+
     // Parse domain from URL
     let domain: string;
     try {
@@ -86,6 +98,7 @@ export async function POST(request: Request) {
         domain,
         verificationToken,
         verificationMethod: "dns",
+        checkInterval: checkInterval ?? null,
         tenantId: session.user.tenantId,
       },
     });
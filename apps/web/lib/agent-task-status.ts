@@ -0,0 +1,47 @@
+import { prisma } from "@/lib/db";
+
+const TERMINAL_STATUSES = ["COMPLETED", "FAILED", "CANCELLED"];
+
+export interface TaskStatusUpdate {
+  status?: string;
+  output?: unknown;
+  errorMessage?: string;
+  startedAt?: string;
+  completedAt?: string;
+  workerId?: string;
+}
+
+// Prisma update data for a status transition sent by the scheduler
+export function buildTaskUpdate(body: TaskStatusUpdate) {
+  const { status, output, errorMessage, startedAt, completedAt } = body;
+
+  const updateData: any = {};
+  if (status) updateData.status = status.toUpperCase();
+  if (output !== undefined) updateData.output = output;
+  if (errorMessage !== undefined) updateData.errorMessage = errorMessage;
+  if (startedAt) updateData.startedAt = new Date(startedAt);
+  if (completedAt) updateData.completedAt = new Date(completedAt);
+
+  // Set startedAt if moving to RUNNING
+  if (status === "RUNNING" && !startedAt) {
+    updateData.startedAt = new Date();
+  }
+
+  // Finished tasks no longer hold a scheduler lease
+  if (status && TERMINAL_STATUSES.includes(status.toUpperCase())) {
+    updateData.leaseOwner = null;
+    updateData.leaseExpiresAt = null;
+  }
+
+  return updateData;
+}
+
+// Apply an update, fenced by lease when the scheduler sends its workerId.
+// Returns the number of rows changed (0 when the lease is held elsewhere).
+export async function applyTaskUpdate(id: string, body: TaskStatusUpdate) {
+  const result = await prisma.agentTask.updateMany({
+    where: body.workerId ? { id, leaseOwner: body.workerId } : { id },
+    data: buildTaskUpdate(body),
+  });
+  return result.count;
+}
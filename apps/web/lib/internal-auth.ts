@@ -0,0 +1,15 @@
+import { NextResponse } from "next/server";
+
+// Internal routes called by the agent scheduler have no user session. They
+// use the same bearer check as the cron endpoints: when CRON_SECRET is set,
+// requests must send `Authorization: Bearer <CRON_SECRET>`.
+// Returns a 401 response to send back, or null when the caller is allowed.
+export function requireInternalAuth(request: Request): NextResponse | null {
+  const authHeader = request.headers.get("authorization");
+  const cronSecret = process.env.CRON_SECRET;
+
+  if (cronSecret && authHeader !== `Bearer ${cronSecret}`) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+  return null;
+}
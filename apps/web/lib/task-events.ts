@@ -0,0 +1,83 @@
+import { EventEmitter } from "events";
+import { prisma } from "@/lib/db";
+
+// In-process notifications for newly created agent tasks.
+// Long-poll requests from the scheduler wait on these instead of
+// re-querying the database on a timer.
+//
+// The emitter only reaches long-polls on the same Next.js instance. With
+// more than one web replica, set AGENT_TASK_WATCH_MS (e.g. 50): while a
+// long-poll is waiting, each replica then runs one query per interval for
+// pending tasks newer than the last one it saw, so tasks created on another
+// replica wake its waiters within that interval. Without it, those tasks
+// are picked up when the long-poll times out (up to its `wait`).
+const WATCH_MS = parseInt(process.env.AGENT_TASK_WATCH_MS || "0");
+
+const globalForTaskEvents = globalThis as unknown as {
+  taskEvents: EventEmitter | undefined;
+  taskWatch: { timer: NodeJS.Timeout | null; lastSeen: Date } | undefined;
+};
+
+export const taskEvents = globalForTaskEvents.taskEvents ?? new EventEmitter();
+taskEvents.setMaxListeners(0);
+
+const taskWatch = globalForTaskEvents.taskWatch ?? { timer: null, lastSeen: new Date() };
+
+if (process.env.NODE_ENV !== "production") {
+  globalForTaskEvents.taskEvents = taskEvents;
+  globalForTaskEvents.taskWatch = taskWatch;
+}
+
+export function notifyTaskCreated(task: { id: string; tenantId: string; agentType: string }) {
+  taskEvents.emit("task.created", task);
+}
+
+async function checkForNewTasks() {
+  try {
+    const newest = await prisma.agentTask.findFirst({
+      where: { status: "PENDING" },
+      orderBy: { createdAt: "desc" },
+      select: { id: true, tenantId: true, agentType: true, createdAt: true },
+    });
+    if (newest && newest.createdAt > taskWatch.lastSeen) {
+      taskWatch.lastSeen = newest.createdAt;
+      notifyTaskCreated(newest);
+    }
+  } catch (error) {
+    console.error("Error watching for new agent tasks:", error);
+  }
+}
+
+// Runs the cross-replica watch only while someone is waiting
+function updateWatch() {
+  const waiting = taskEvents.listenerCount("task.created") > 0;
+  if (waiting && WATCH_MS > 0 && !taskWatch.timer) {
+    // Waiters query pending tasks right after subscribing, so only tasks
+    // created from now on need a wake-up
+    taskWatch.lastSeen = new Date();
+    taskWatch.timer = setInterval(checkForNewTasks, WATCH_MS);
+  } else if (!waiting && taskWatch.timer) {
+    clearInterval(taskWatch.timer);
+    taskWatch.timer = null;
+  }
+}
+
+// Resolves true when a task is created, false on timeout or abort
+export function waitForTaskCreated(timeoutMs: number, signal?: AbortSignal): Promise<boolean> {
+  return new Promise((resolve) => {
+    const finish = (created: boolean) => {
+      clearTimeout(timer);
+      taskEvents.off("task.created", onCreated);
+      signal?.removeEventListener("abort", onAbort);
+      updateWatch();
+      resolve(created);
+    };
+    const onCreated = () => finish(true);
+    const onAbort = () => finish(false);
+    const timer = setTimeout(() => finish(false), timeoutMs);
+
+    taskEvents.on("task.created", onCreated);
+    signal?.addEventListener("abort", onAbort);
+    updateWatch();
+  });
+}
@@ -0,0 +1,7 @@
+-- AlterTable
+ALTER TABLE "agent_tasks" ADD COLUMN     "attempts" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN     "leaseExpiresAt" TIMESTAMP(3),
+ADD COLUMN     "leaseOwner" TEXT;
+
+-- CreateIndex
+CREATE INDEX "agent_tasks_status_leaseExpiresAt_idx" ON "agent_tasks"("status", "leaseExpiresAt");
@@ -0,0 +1,6 @@
+-- AlterTable
+ALTER TABLE "tenants" ADD COLUMN     "incidentInterval" INTEGER,
+ADD COLUMN     "monitoringInterval" INTEGER;
+
+-- AlterTable
+ALTER TABLE "websites" ADD COLUMN     "checkInterval" INTEGER;
@@ -0,0 +1,5 @@
+-- CreateEnum
+CREATE TYPE "TenantPlan" AS ENUM ('STARTER', 'PRO', 'ENTERPRISE');
+
+-- AlterTable
+ALTER TABLE "tenants" ADD COLUMN     "plan" "TenantPlan" NOT NULL DEFAULT 'STARTER';
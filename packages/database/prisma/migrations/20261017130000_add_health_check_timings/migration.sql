@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "health_checks" ADD COLUMN     "timings" JSONB;